@@ -0,0 +1,242 @@
+"""薪资计算引擎的微基准测试：单方案延迟、曲线扫描 (10² ~ 10⁶ 点)、批量工资表吞吐 (1 万 ~ 1000 万行)
+
+结果以 JSON 保存 (机器可读)，并与保存的基线逐项比较：某项最短耗时超过基线的 (1 + 阈值) 倍即视为性能退化，
+有退化时退出码为 1，可直接放进提交前检查或 CI。
+
+    python salary_benchmark.py                      # 运行全部用例，与基线比较
+    python salary_benchmark.py --quick              # 跳过 10⁶ 点扫描和 1000 万行工资表
+    python salary_benchmark.py --save-baseline      # 把本次结果保存为新基线
+    python salary_benchmark.py --only sweep --threshold 0.1
+
+基线与机器相关，不随仓库提交，应在同一台机器上生成和比较：没有基线文件时先用 --save-baseline 生成，
+否则直接报错退出 (退出码 2)，不会把"没有比较"当作通过。
+"""
+import os
+
+# 基准测试只测计算本身：关闭磁盘缓存，避免读写缓存目录干扰计时
+os.environ.setdefault('SALARY_DISK_CACHE_MAX_MB', '0')
+
+import sys
+import json
+import time
+import timeit
+import argparse
+import itertools
+import platform
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from salary_core import (
+    CITY_RULES, ScenarioGraph, calculate_one_scenario, calculate_scenarios_frame, calculate_social_security,
+    calculate_tax_bonus, calculate_tax_salary, generate_comprehensive_data, rules_fingerprint
+)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESULTS_PATH = os.path.join(BENCH_DIR, 'benchmark_results.json')
+DEFAULT_BASELINE_PATH = os.path.join(BENCH_DIR, 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.2  # 耗时超过基线 20% 视为退化
+
+SWEEP_SIZES = [10**2, 10**3, 10**4, 10**5, 10**6]
+PAYROLL_SIZES = [10**4, 10**6, 10**7]
+PAYROLL_CHUNK_ROWS = 10**6  # 大工资表分块计算，控制结果和中间数组的内存峰值
+QUICK_SKIPPED_SIZES = {10**6: 'sweep', 10**7: 'payroll'}
+
+# 单方案用例使用的典型参数 (月薪 2 万 + 绩效 5 千，年终奖 1 个月、绩效系数 1.5)
+SCENARIO = dict(
+    base_salary=20000, performance_salary=5000, bonus_base_months=1, performance_multiplier=1.5,
+    ss_base=20000, hf_base=20000, additional_deductions=0, include_performance_in_bonus=True
+)
+
+# ---------------------- 用例 ----------------------
+def _sweep_salaries(rows):
+    """月薪 5000 ~ 100 万之间均匀分布的 rows 个点"""
+    return np.linspace(5000, 1_000_000, rows)
+
+def make_payroll_frame(rows, seed=0):
+    """生成 rows 行的模拟工资表 (固定随机种子，结果可复现)"""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(5000, 80000, rows).round(-1)
+    return pd.DataFrame({
+        'base_salary': base,
+        'performance_salary': (base * rng.uniform(0, 0.5, rows)).round(-1),
+        'bonus_base_months': rng.choice([0.0, 1.0, 2.0, 3.0], rows),
+        'performance_multiplier': rng.choice([1.0, 1.2, 1.5, 2.0], rows),
+        'ss_base': base,
+        'hf_base': base,
+        'additional_deductions': rng.choice([0.0, 1000.0, 2000.0, 3000.0], rows),
+        'city': rng.choice(np.array(CITY_RULES['names'], dtype=object), rows)
+    })
+
+def _payroll_case(rows):
+    frame = make_payroll_frame(rows)
+    
+    def run():
+        for start in range(0, rows, PAYROLL_CHUNK_ROWS):
+            calculate_scenarios_frame(frame.iloc[start:start + PAYROLL_CHUNK_ROWS])
+    return run
+
+def _incremental_scenario_case():
+    """同一个计算图上交替修改绩效系数 (模拟拖动控件)，每次只重算年终奖相关的节点"""
+    graph = ScenarioGraph(**SCENARIO)
+    multipliers = itertools.cycle((1.4, 1.5))
+    return lambda: graph.update(performance_multiplier=next(multipliers)).result()
+
+def _sweep_case(kind, rows):
+    salaries = _sweep_salaries(rows)
+    if kind == 'tax_salary':
+        return lambda: calculate_tax_salary(salaries)
+    if kind == 'tax_bonus':
+        return lambda: calculate_tax_bonus(salaries)
+    if kind == 'social_security':
+        return lambda: calculate_social_security(salaries, salaries, salaries)
+    step = (1_000_000 - 5000) / (rows - 1)
+    return lambda: generate_comprehensive_data.uncached(
+        **SCENARIO, salary_min=5000, salary_max=1_000_000, step=step
+    )
+
+def build_cases(quick=False):
+    """全部用例：(名称, 分组, 每次调用处理的行数, 生成被测函数的 setup)；大输入在用例运行时才生成"""
+    cases = [
+        ('single.tax_salary', 'single', 1, lambda: lambda: calculate_tax_salary(150000.0)),
+        ('single.tax_bonus', 'single', 1, lambda: lambda: calculate_tax_bonus(60000.0)),
+        ('single.social_security', 'single', 1,
+         lambda: lambda: calculate_social_security(25000.0, 20000.0, 20000.0)),
+        ('single.one_scenario', 'single', 1, lambda: lambda: calculate_one_scenario(**SCENARIO)),
+        ('single.one_scenario_incremental', 'single', 1, _incremental_scenario_case),
+        ('single.comprehensive_grid', 'single', 1, lambda: lambda: generate_comprehensive_data.uncached(**SCENARIO)),
+        ('single.comprehensive_exact', 'single', 1,
+         lambda: lambda: generate_comprehensive_data.uncached(**SCENARIO, exact=True)),
+        ('single.comprehensive_cached', 'single', 1,
+         lambda: lambda: generate_comprehensive_data(**SCENARIO, exact=True)),
+    ]
+    for rows in SWEEP_SIZES:
+        if quick and QUICK_SKIPPED_SIZES.get(rows) == 'sweep':
+            continue
+        for kind in ('tax_salary', 'tax_bonus', 'social_security', 'comprehensive'):
+            cases.append((f'sweep.{kind}.{rows}', 'sweep', rows, lambda kind=kind, rows=rows: _sweep_case(kind, rows)))
+    for rows in PAYROLL_SIZES:
+        if quick and QUICK_SKIPPED_SIZES.get(rows) == 'payroll':
+            continue
+        cases.append((f'payroll.{rows}', 'payroll', rows, lambda rows=rows: _payroll_case(rows)))
+    return cases
+
+# ---------------------- 计时 ----------------------
+def measure(func, rows, repeat=5):
+    """先自动确定每轮循环次数 (每轮至少 0.2 秒，兼作预热，不计入结果)，再重复 repeat 轮，取每次调用的中位数和最小值"""
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    per_call = np.array(timer.repeat(repeat=repeat, number=loops)) / loops
+    median = float(np.median(per_call))
+    return {
+        'rows': rows,
+        'median_s': median,
+        'min_s': float(per_call.min()),
+        'loops': loops,
+        'repeat': repeat,
+        'rows_per_s': rows / median if median > 0 else None
+    }
+
+def run_benchmarks(cases, only=None, log=print):
+    """依次运行用例，返回 {用例名: 计时结果}；only 为名称子串过滤"""
+    results = {}
+    for name, group, rows, setup in cases:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        func = setup()
+        result = measure(func, rows, repeat=5 if rows < 10**6 else 3)
+        result['group'] = group
+        results[name] = result
+        del func
+        throughput = '' if rows == 1 else f"{result['rows_per_s']:>16,.0f} 行/秒"
+        log(f"{name:<40}{format_seconds(result['median_s']):>12}{throughput}")
+    return results
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds:.2f} s"
+
+# ---------------------- 结果与基线 ----------------------
+def environment_info():
+    """结果文件中记录的运行环境 (基线只应与同一环境的结果比较)"""
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'rules_fingerprint': rules_fingerprint()
+    }
+
+def save_results(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment_info(), 'results': results}, f, ensure_ascii=False, indent=2)
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+def compare_with_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """逐项比较每次调用的最短耗时 (受系统噪声影响最小)，返回 [(用例名, 基线秒数, 本次秒数, 比值, 状态)]
+    
+    只比较两边都有的用例。
+    """
+    rows = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['min_s'], result['min_s']
+        ratio = after / before
+        if ratio > 1 + threshold:
+            status = '退化'
+        elif ratio < 1 / (1 + threshold):
+            status = '提升'
+        else:
+            status = '持平'
+        rows.append((name, before, after, ratio, status))
+    return rows
+
+def print_comparison(rows, threshold, log=print):
+    log(f"\n与基线比较 (阈值 {threshold:.0%})：")
+    for name, before, after, ratio, status in rows:
+        log(f"{name:<40}{format_seconds(before):>12} -> {format_seconds(after):<12}{ratio:>7.2f}x  {status}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="薪资计算引擎微基准测试")
+    parser.add_argument('--quick', action='store_true', help="跳过 10⁶ 点扫描和 1000 万行工资表")
+    parser.add_argument('--only', nargs='+', help="只运行名称包含这些子串的用例 (如 single sweep.tax payroll)")
+    parser.add_argument('--output', default=DEFAULT_RESULTS_PATH, help="本次结果的保存路径 (JSON)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="基线文件路径 (JSON)")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线，不做比较")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="退化阈值：耗时超过基线的 (1 + 阈值) 倍视为退化 (默认 0.2)")
+    args = parser.parse_args(argv)
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"没有基线文件 {args.baseline}，先在本机用 --save-baseline 生成")
+    
+    started = time.perf_counter()
+    results = run_benchmarks(build_cases(quick=args.quick), only=args.only)
+    save_results(args.output, results)
+    print(f"\n共 {len(results)} 项，用时 {time.perf_counter() - started:.1f} 秒，结果已保存到 {args.output}")
+    
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f"已保存为基线: {args.baseline}")
+        return 0
+    comparison = compare_with_baseline(results, load_results(args.baseline), args.threshold)
+    print_comparison(comparison, args.threshold)
+    regressions = [row[0] for row in comparison if row[4] == '退化']
+    if regressions:
+        print(f"\n{len(regressions)} 项性能退化: {', '.join(regressions)}")
+        return 1
+    print("\n没有性能退化")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""salary_optimizer_v2.py 中 plotly 图表的 spec 构建
+
+图表直接组装为 plotly JSON 结构的 dict，不经过 graph_objects 的逐属性校验；
+各主题的模板只在第一次用到时经 plotly 校验并序列化，之后直接复用。
+
+下划线简写的拆分、数组编码和贯穿坐标轴的标注位置复用 plotly 自己的 (非公开) 辅助函数，
+这样输出与 go.Figure(...).to_dict() 一致；这些函数随 plotly 大版本可能变化，requirements.txt 中
+plotly 的版本上限与 tests/test_salary_chart_spec.py 的对照测试同步维护。
+"""
+import copy
+import functools
+
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.shapeannotation import axis_spanning_shape_annotation, split_dict_by_key_prefix
+from _plotly_utils.utils import is_homogeneous_array, is_skipped_key, to_typed_array_spec
+
+_SPANNING_SHAPE_REFS = {'vline': ('x', 'y domain'), 'vrect': ('x', 'y domain'), 'hline': ('x domain', 'y')}
+# 本身带下划线的属性名 (paper_bgcolor、error_x 等) 不按简写拆分，与 plotly 保持一致
+_UNDERSCORE_PROPERTIES = tuple(go.Figure._valid_underscore_properties)
+
+@functools.lru_cache(maxsize=None)
+def _layout_template(template_name):
+    """主题模板序列化后的 dict (多个图表共用，只读，不要原地修改)"""
+    fig = go.Figure()
+    fig.update_layout(template=template_name)
+    return fig.to_dict()['layout'].get('template', {})
+
+@functools.lru_cache(maxsize=None)
+def _property_path(key):
+    """属性名按下划线简写拆成路径，如 title_font -> ('title', 'font')"""
+    for prop in _UNDERSCORE_PROPERTIES:
+        key = key.replace(prop, prop.replace('_', '-'))
+    return tuple(part.replace('-', '_') for part in key.split('_'))
+
+def _merge_spec(target, updates):
+    """递归合并 spec：dict 逐层合并，其它值直接覆盖 (同 update_layout 的语义)"""
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge_spec(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+def _expand_spec(props):
+    """展开 plotly 的下划线简写 (line_dash、title_font 等) 为嵌套 dict
+
+    数组按 plotly 的方式编码为 base64 typed array，字符串标题转为 {'text': ...}，值为 None 的属性视为未设置，
+    与 to_dict() 的结果一致。
+    """
+    expanded = {}
+    for key, value in props.items():
+        if value is None:
+            continue
+        path = _property_path(key)
+        if isinstance(value, dict):
+            value = _expand_spec(value)
+        elif path[-1] == 'title' and isinstance(value, str):
+            value = {'text': value}
+        elif is_homogeneous_array(value) and not is_skipped_key(path[-1]):
+            value = to_typed_array_spec(value)
+        for part in reversed(path[1:]):
+            value = {part: value}
+        _merge_spec(expanded, {path[0]: value})
+    return expanded
+
+def trace_spec(trace_type, **props):
+    """单条轨迹的 spec，参数与 go.Scatter/go.Bar 等对应的类相同 (支持下划线简写)"""
+    return {'type': trace_type, **_expand_spec(props)}
+
+class FigureSpec(go.Figure):
+    """直接以 dict 组装的图表，常用方法与 go.Figure 同名同参
+
+    st.plotly_chart 对 Figure 实例只调用 to_dict() 再序列化，这里直接返回组装好的 spec，
+    跳过 plotly 对每个属性的校验。除下列方法外不要调用其它 go.Figure 方法。
+    """
+    def __init__(self):
+        super().__init__()
+        self._spec = {'data': [], 'layout': {'template': _layout_template(pio.templates.default)}}
+
+    def __deepcopy__(self, memo):
+        # 主题模板较大且只读，副本之间共用
+        clone = FigureSpec()
+        layout = {k: v for k, v in self._spec['layout'].items() if k != 'template'}
+        clone._spec = {
+            'data': copy.deepcopy(self._spec['data'], memo),
+            'layout': {'template': self._spec['layout']['template'], **copy.deepcopy(layout, memo)}
+        }
+        return clone
+
+    def to_dict(self):
+        return self._spec
+
+    def to_plotly_json(self):
+        return self._spec
+
+    def add_trace(self, trace):
+        self._spec['data'].append(trace)
+        return self
+
+    def update_layout(self, **props):
+        if 'template' in props:
+            self._spec['layout']['template'] = _layout_template(props.pop('template'))
+        _merge_spec(self._spec['layout'], _expand_spec(props))
+        return self
+
+    def add_shape(self, **props):
+        self._spec['layout'].setdefault('shapes', []).append(_expand_spec(props))
+        return self
+
+    def add_annotation(self, **props):
+        self._spec['layout'].setdefault('annotations', []).append(_expand_spec(props))
+        return self
+
+    def _add_spanning_shape(self, shape_type, shape_args, kwargs):
+        """贯穿整个坐标轴的线/矩形，annotation_ 前缀参数按 plotly 的规则生成标注"""
+        shape_kwargs, annotation_kwargs = split_dict_by_key_prefix(kwargs, 'annotation_')
+        annotation = axis_spanning_shape_annotation(None, shape_type, shape_args, annotation_kwargs)
+        xref, yref = _SPANNING_SHAPE_REFS[shape_type]
+        self.add_shape(**shape_args, **shape_kwargs, xref=xref, yref=yref)
+        if annotation is not None:
+            self.add_annotation(**annotation, xref=xref, yref=yref)
+        return self
+
+    def add_vline(self, x, **kwargs):
+        return self._add_spanning_shape('vline', dict(type='line', x0=x, x1=x, y0=0, y1=1), kwargs)
+
+    def add_hline(self, y, **kwargs):
+        return self._add_spanning_shape('hline', dict(type='line', x0=0, x1=1, y0=y, y1=y), kwargs)
+
+    def add_vrect(self, x0, x1, **kwargs):
+        return self._add_spanning_shape('vrect', dict(type='rect', x0=x0, x1=x1, y0=0, y1=1), kwargs)
@@ -0,0 +1,2212 @@
+"""薪资计算核心：个税、社保公积金、单方案/批量方案计算、曲线、反推求解和结果缓存
+
+不依赖 Streamlit 和 Plotly，批处理脚本、进程池 worker 和基准测试可以直接导入；
+两个 Streamlit 应用 (salary_optimizer_v2.py、salary_app.py) 都从这里取计算函数。
+"""
+import time
+_IMPORT_STARTED = time.perf_counter()
+import numpy as np
+import json
+import os
+import sys
+import atexit
+import bisect
+import importlib
+import zlib
+import pickle
+import hashlib
+import tempfile
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+from collections import Counter as TallyCounter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, zip_longest
+
+# ---------------------- 延迟导入 ----------------------
+# 较重的第三方模块 (pandas、plotly.express、matplotlib.pyplot) 在第一次用到时才导入，
+# 应用冷启动时页面先渲染出来；设置 SALARY_IMPORT_REPORT=1 时在启动日志中打印各模块导入耗时
+IMPORT_REPORT_ENABLED = os.environ.get('SALARY_IMPORT_REPORT', '') not in ('', '0')
+IMPORT_TIMES = OrderedDict()  # 模块名 -> 导入耗时 (毫秒)，按导入先后排列
+_import_report_printed = False
+
+def timed_import(name):
+    """导入模块并记录耗时；已被其他代码导入过的模块直接返回，不计时"""
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES[name] = (time.perf_counter() - started) * 1000
+    if IMPORT_REPORT_ENABLED:
+        print(f"[导入] {name}: {IMPORT_TIMES[name]:.1f} ms", file=sys.stderr)
+    return module
+
+class LazyModule:
+    """延迟导入的模块代理：第一次访问属性时才真正导入，用法与 import ... as ... 得到的模块相同"""
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = timed_import(self._name)
+        return getattr(self._module, attr)
+    
+    def __repr__(self):
+        return f"<LazyModule {self._name} ({'已导入' if self._module is not None else '未导入'})>"
+
+def import_time_report():
+    """各模块导入耗时报告 (毫秒，按耗时从高到低)，未用到的延迟模块不出现在报告中"""
+    rows = sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True)
+    width = max((len(name) for name, _ in rows), default=0)
+    lines = [f"  {name:<{width}}  {elapsed:8.1f} ms" for name, elapsed in rows]
+    return '\n'.join([f"模块导入耗时 (共 {sum(IMPORT_TIMES.values()):.1f} ms):"] + lines)
+
+def print_import_report():
+    """开启 SALARY_IMPORT_REPORT 时把导入耗时报告打印到标准错误 (每个进程只打印一次，在首次页面运行结束时调用)"""
+    global _import_report_printed
+    if IMPORT_REPORT_ENABLED and not _import_report_printed:
+        _import_report_printed = True
+        print(import_time_report(), file=sys.stderr)
+
+pd = LazyModule('pandas')
+
+def _is_dataframe(value):
+    """判断是否为 DataFrame；pandas 尚未导入时不可能有 DataFrame，不为这个判断触发导入"""
+    return 'pandas' in sys.modules and isinstance(value, pd.DataFrame)
+
+# ---------------------- 进程级资源 ----------------------
+_RESOURCE_LOCK = threading.RLock()
+
+def cache_resource(factory):
+    """进程级资源缓存 (规则表、缓存句柄等)：按参数只创建一次，所有线程和会话共享
+    
+    首次创建时加锁，多个会话线程同时访问也只会创建一份；可重入，资源的创建过程中可以再取其他资源。
+    """
+    cached = functools.lru_cache(maxsize=None)(factory)
+    
+    @functools.wraps(factory)
+    def wrapper(*args, **kwargs):
+        with _RESOURCE_LOCK:
+            return cached(*args, **kwargs)
+    return wrapper
+
+# ---------------------- 性能指标 ----------------------
+# 计数器和直方图以 Prometheus 文本格式导出，供监控抓取：设置 SALARY_METRICS_FILE 时写入该文件
+# (批处理进程退出时、应用每次页面运行结束时)，设置 SALARY_METRICS_PORT 时在 127.0.0.1 上提供 /metrics
+METRICS_FILE = os.environ.get('SALARY_METRICS_FILE', '')
+METRICS_PORT = int(os.environ.get('SALARY_METRICS_PORT', 0))
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_sample(name, labels, value):
+    """一行样本：name{label="value",...} value"""
+    label_text = ','.join(f'{key}="{_escape_label_value(val)}"' for key, val in labels)
+    value_text = '+Inf' if value == np.inf else repr(float(value)) if isinstance(value, float) else str(value)
+    return f"{name}{{{label_text}}} {value_text}" if label_text else f"{name} {value_text}"
+
+class Metric:
+    """带标签的指标，按标签组合分别累计；由 MetricsRegistry 创建"""
+    
+    kind = 'untyped'
+    
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+    
+    def samples(self):
+        """[(样本名, 标签, 值)]"""
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+class Counter(Metric):
+    """只增不减的计数器"""
+    
+    kind = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """记录当前值的指标"""
+    
+    kind = 'gauge'
+    
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(Metric):
+    """直方图：按桶上限累计观测次数，另记总和与总次数"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name, help_text, buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+    
+    @contextmanager
+    def time(self, **labels):
+        """统计 with 块的耗时 (秒)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def samples(self):
+        rows = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = np.cumsum(counts)
+                for upper, count in zip(self.buckets + (np.inf,), cumulative):
+                    rows.append((f"{self.name}_bucket", key + (('le', '+Inf' if upper == np.inf else repr(upper)),),
+                                 int(count)))
+                rows.append((f"{self.name}_sum", key, total))
+                rows.append((f"{self.name}_count", key, int(cumulative[-1])))
+        return rows
+
+class MetricsRegistry:
+    """进程内的指标表：同名指标只创建一次；collector 在导出时现取的指标 (如缓存命中统计) 也一并输出"""
+    
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._collectors = []
+        self._lock = threading.Lock()
+    
+    def _get_or_create(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help_text, **kwargs)
+            return self._metrics[name]
+    
+    def counter(self, name, help_text):
+        return self._get_or_create(Counter, name, help_text)
+    
+    def gauge(self, name, help_text):
+        return self._get_or_create(Gauge, name, help_text)
+    
+    def histogram(self, name, help_text, buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+    
+    def register_collector(self, collect):
+        """collect() 返回 [(指标名, 类型, 说明, [(标签 dict, 值)])]，同名指标的样本合并输出"""
+        with self._lock:
+            self._collectors.append(collect)
+    
+    def render(self):
+        """Prometheus 文本格式 (text/plain; version=0.0.4)"""
+        families = OrderedDict()
+        with self._lock:
+            metrics, collectors = list(self._metrics.values()), list(self._collectors)
+        for metric in metrics:
+            families[metric.name] = (metric.kind, metric.help_text, metric.samples())
+        for collect in collectors:
+            for name, kind, help_text, samples in collect():
+                rows = [(name, Metric._key(labels), value) for labels, value in samples]
+                families.setdefault(name, (kind, help_text, []))[2].extend(rows)
+        
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_format_sample(*sample) for sample in samples)
+        return '\n'.join(lines) + '\n'
+    
+    def write(self, path):
+        """原子地写入文件 (先写临时文件再替换)，抓取方不会读到写了一半的内容"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+@cache_resource
+def get_metrics_registry():
+    return MetricsRegistry()
+
+METRICS = get_metrics_registry()
+
+# 计算引擎的指标；页面运行和图表构建的直方图由两个应用记录
+SCENARIOS_COMPUTED = METRICS.counter(
+    'salary_scenarios_computed_total', "实际计算的薪资方案数 (缓存命中不计)，path=single 为单方案，batch 为批量")
+SWEEP_POINTS = METRICS.counter(
+    'salary_sweep_points_total', "曲线扫描计算的月薪点数，mode=grid 为等步长，breakpoint 为解析断点")
+BATCH_ROWS = METRICS.counter('salary_batch_rows_total', "批量计算的总行数")
+BATCH_SECONDS = METRICS.counter('salary_batch_seconds_total', "批量计算的总耗时 (秒)")
+BATCH_ROWS_PER_SECOND = METRICS.gauge('salary_batch_rows_per_second', "最近一次批量计算的吞吐 (行/秒)")
+RERUN_SECONDS = METRICS.histogram('salary_rerun_seconds', "页面整页运行耗时 (秒)")
+FIGURE_BUILD_SECONDS = METRICS.histogram('salary_figure_build_seconds', "图表构建耗时 (秒)")
+PREFETCH_TASKS = METRICS.counter(
+    'salary_prefetch_tasks_total', "相邻参数预取任务数，outcome=completed/cancelled/failed")
+
+def cache_metrics_collector(cache_name, cache):
+    """把缓存对象 stats() 中的命中/未命中次数导出为计数器 (cache 标签区分各级缓存)"""
+    def collect():
+        stats = cache.stats()
+        labels = {'cache': cache_name}
+        return [
+            ('salary_cache_hits_total', 'counter', "缓存命中次数", [(labels, stats['命中'])]),
+            ('salary_cache_misses_total', 'counter', "缓存未命中次数", [(labels, stats['未命中'])])
+        ]
+    return collect
+
+def write_metrics(path=None):
+    """把当前指标写入文件 (默认 SALARY_METRICS_FILE，未设置时不写)"""
+    path = path or METRICS_FILE
+    if path:
+        METRICS.write(path)
+
+@cache_resource
+def start_metrics_server(port=METRICS_PORT, host='127.0.0.1'):
+    """在本地端口提供 /metrics (每个进程只启动一次，后台线程服务)；未设置端口时不导入 http.server"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = METRICS.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='salary-metrics', daemon=True).start()
+    return server
+
+def export_metrics():
+    """按环境变量导出指标：写文件、启动本地端点 (都未设置时什么也不做)"""
+    if METRICS_FILE:
+        write_metrics(METRICS_FILE)
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+
+# 批处理进程退出时写一次最终结果
+if METRICS_FILE:
+    atexit.register(write_metrics, METRICS_FILE)
+
+# ---------------------- 税务规则 ----------------------
+# 按税年组织的规则文件 (税率表、基本减除费用、社保公积金个人缴费比例)
+TAX_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tax_rules.json')
+
+# 社保公积金明细项与规则文件中缴费比例字段的对应关系
+CONTRIBUTION_ITEMS = {
+    '养老保险': 'pension',
+    '医疗保险': 'medical',
+    '失业保险': 'unemployment',
+    '公积金': 'housing_fund'
+}
+
+def _make_bracket_table(rows):
+    """将 (上限, 税率, 速算扣除数) 行构造成按上限升序排列的列式税率表，上限为 None 表示无上限
+    
+    另存一份 Python float 元组 (scalar)，供标量快速路径用 bisect 查档，不经过 NumPy。
+    """
+    upper, rate, deduction = (np.array(col, dtype=float) for col in zip(*rows))
+    upper = np.nan_to_num(upper, nan=np.inf)
+    return {
+        'upper': upper, 'rate': rate, 'deduction': deduction,
+        'scalar': (tuple(upper.tolist()), tuple(rate.tolist()), tuple(deduction.tolist()))
+    }
+
+def _load_rules_file(path):
+    """读取 JSON 规则文件并展开 extends 继承关系 (子项只需写出与父项不同的字段)"""
+    with open(path, encoding='utf-8') as f:
+        raw_rules = json.load(f)
+    
+    resolved = {}
+    def resolve(key):
+        if key not in resolved:
+            rule = dict(raw_rules[key])
+            parent = rule.pop('extends', None)
+            resolved[key] = {**resolve(parent), **rule} if parent else rule
+        return resolved[key]
+    
+    return {key: resolve(key) for key in raw_rules}
+
+def load_tax_rules(path=TAX_RULES_PATH):
+    """读取税务规则文件，返回 {税年: 规则}"""
+    return {int(year): rule for year, rule in _load_rules_file(path).items()}
+
+def compile_tax_rules(rules):
+    """把各税年规则编译为引擎直接读取的数组表：单年税率表，以及按税年堆叠的多年表"""
+    years = sorted(rules)
+    by_year = {
+        year: {
+            'year': year,
+            'salary': _make_bracket_table(rules[year]['salary_brackets']),
+            'bonus': _make_bracket_table(rules[year]['bonus_brackets']),
+            'basic_deduction': float(rules[year]['basic_deduction']),
+            'contribution_rates': {
+                item: float(rules[year]['contribution_rates'][key]) for item, key in CONTRIBUTION_ITEMS.items()
+            }
+        }
+        for year in years
+    }
+    
+    def stack(kind):
+        # 各年档数不同时，用最后一档补齐 (上限为无穷大，查找时不会越过)
+        width = max(len(by_year[y][kind]['upper']) for y in years)
+        return {
+            col: np.array([np.pad(by_year[y][kind][col], (0, width - len(by_year[y][kind][col])), mode='edge')
+                           for y in years])
+            for col in ('upper', 'rate', 'deduction')
+        }
+    
+    return {
+        'years': np.array(years),
+        'default_year': years[-1],
+        'by_year': by_year,
+        'salary': stack('salary'),
+        'bonus': stack('bonus'),
+        'basic_deduction': np.array([by_year[y]['basic_deduction'] for y in years]),
+        'contribution_rates': {
+            item: np.array([by_year[y]['contribution_rates'][item] for y in years]) for item in CONTRIBUTION_ITEMS
+        }
+    }
+
+@cache_resource
+def get_compiled_tax_rules(path=TAX_RULES_PATH):
+    """加载并编译规则文件，每个进程只执行一次"""
+    return compile_tax_rules(load_tax_rules(path))
+
+TAX_RULES = get_compiled_tax_rules()
+DEFAULT_TAX_YEAR = TAX_RULES['default_year']
+
+def get_tax_rules(tax_year=None):
+    """取单一税年的编译后规则，默认为最新税年"""
+    year = DEFAULT_TAX_YEAR if tax_year is None else int(tax_year)
+    if year not in TAX_RULES['by_year']:
+        raise ValueError(f"没有 {year} 年的税务规则，可选: {', '.join(map(str, TAX_RULES['years']))}")
+    return TAX_RULES['by_year'][year]
+
+# 单个数值 (含 NumPy 标量)：全部输入都是标量时走纯 Python 快速路径，只有数组才用 NumPy 向量化
+_SCALAR_TYPES = (int, float, np.integer, np.floating)
+
+def _is_scalar_year(tax_year):
+    return tax_year is None or isinstance(tax_year, _SCALAR_TYPES)
+
+def _is_multi_year(tax_year):
+    """税年是否为逐行指定的数组"""
+    return tax_year is not None and np.ndim(tax_year) > 0
+
+def _year_index(tax_year):
+    """把税年数组映射为多年表中的行号"""
+    years = np.asarray(tax_year, dtype=int)
+    idx = np.minimum(np.searchsorted(TAX_RULES['years'], years), len(TAX_RULES['years']) - 1)
+    unknown = np.unique(years[TAX_RULES['years'][idx] != years])
+    if len(unknown):
+        raise ValueError(f"没有 {', '.join(map(str, unknown))} 年的税务规则")
+    return idx
+
+def _rule_value(key, tax_year, item=None):
+    """取标量规则参数 (基本减除费用、缴费比例)；税年为数组时逐行返回"""
+    if not _is_multi_year(tax_year):
+        rules = get_tax_rules(tax_year)
+        return rules[key] if item is None else rules[key][item]
+    values = TAX_RULES[key] if item is None else TAX_RULES[key][item]
+    return values[_year_index(tax_year)]
+
+def lookup_bracket(table, values):
+    """在税率表中查找所属档位 (上限为闭区间)，支持标量和数组"""
+    return np.searchsorted(table['upper'], values, side='left')
+
+def _scalar_bracket_rates(kind, value, tax_year):
+    """标量快速路径：用 bisect 在 Python 元组上查档 (与 searchsorted side='left' 一致)，返回 (税率, 速算扣除数)"""
+    upper, rate, deduction = get_tax_rules(tax_year)[kind]['scalar']
+    idx = bisect.bisect_left(upper, value)
+    return rate[idx], deduction[idx]
+
+def _bracket_rates(kind, values, tax_year):
+    """查找所属档位的 (税率, 速算扣除数)；税年为数组时逐行使用对应年度的税率表"""
+    if not _is_multi_year(tax_year):
+        table = get_tax_rules(tax_year)[kind]
+        idx = lookup_bracket(table, values)
+        return table['rate'][idx], table['deduction'][idx]
+    
+    values, year_idx = np.broadcast_arrays(values, _year_index(tax_year))
+    stacked = TAX_RULES[kind]
+    idx = (stacked['upper'][year_idx] < values[..., None]).sum(axis=-1)
+    return stacked['rate'][year_idx, idx], stacked['deduction'][year_idx, idx]
+
+# ---------------------- 城市社保公积金规则 ----------------------
+# 各城市缴费基数上下限及个人缴费比例 (未列出的比例沿用税务规则中的全国默认值)
+CITY_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'city_rules.json')
+
+def load_city_rules(path=CITY_RULES_PATH):
+    """读取城市规则文件，返回 {城市: 规则}"""
+    return _load_rules_file(path)
+
+def compile_city_rules(rules):
+    """把城市规则编译为按城市索引的数组表，末尾追加一行"不限城市"：下限 0、上限无穷、比例沿用默认"""
+    names = list(rules)
+    by_city = {
+        name: {
+            'city': name,
+            'description': rules[name].get('description', ''),
+            'ss_floor': float(rules[name]['ss_floor']),
+            'ss_ceiling': float(rules[name]['ss_ceiling']),
+            'hf_floor': float(rules[name]['hf_floor']),
+            'hf_ceiling': float(rules[name]['hf_ceiling']),
+            'contribution_rates': {
+                item: rules[name].get('contribution_rates', {}).get(key) for item, key in CONTRIBUTION_ITEMS.items()
+            }
+        }
+        for name in names
+    }
+    for rule in by_city.values():
+        if rule['ss_floor'] > rule['ss_ceiling'] or rule['hf_floor'] > rule['hf_ceiling']:
+            raise ValueError(f"{rule['city']} 的缴费基数下限高于上限")
+    
+    def column(key, default):
+        return np.array([by_city[name][key] for name in names] + [default])
+    
+    return {
+        'names': names,
+        'position': {name: i for i, name in enumerate(names)},
+        'by_city': by_city,
+        'ss_floor': column('ss_floor', 0.0),
+        'ss_ceiling': column('ss_ceiling', np.inf),
+        'hf_floor': column('hf_floor', 0.0),
+        'hf_ceiling': column('hf_ceiling', np.inf),
+        'contribution_rates': {
+            item: np.array([np.nan if by_city[name]['contribution_rates'][item] is None
+                            else by_city[name]['contribution_rates'][item] for name in names] + [np.nan])
+            for item in CONTRIBUTION_ITEMS
+        }
+    }
+
+@cache_resource
+def get_compiled_city_rules(path=CITY_RULES_PATH):
+    """加载并编译城市规则文件，每个进程只执行一次，所有会话共享"""
+    return compile_city_rules(load_city_rules(path))
+
+CITY_RULES = get_compiled_city_rules()
+
+def get_city_rules(city):
+    """取单个城市的规则 (缴费基数上下限及个人缴费比例，None 表示沿用默认比例)"""
+    if city not in CITY_RULES['by_city']:
+        raise ValueError(f"没有城市 {city} 的社保公积金规则，可选: {', '.join(CITY_RULES['names'])}")
+    return CITY_RULES['by_city'][city]
+
+@cache_resource
+def _city_name_index():
+    """城市名索引 (批量映射城市名用，首次批量计算时才构建，避免启动时导入 pandas)"""
+    return pd.Index(CITY_RULES['names'], dtype=object)
+
+def _city_index(city):
+    """把城市名 (标量或数组) 映射为城市表中的行号，None 映射到末尾的"不限城市"行"""
+    if np.ndim(city) == 0:
+        if city is None or (not isinstance(city, str) and pd.isna(city)):
+            return len(CITY_RULES['names'])
+        if city not in CITY_RULES['position']:
+            raise ValueError(f"没有城市 {city} 的社保公积金规则")
+        return CITY_RULES['position'][city]
+    names = np.asarray(city, dtype=object)
+    idx = _city_name_index().get_indexer(names.ravel()).reshape(names.shape)
+    unset = pd.isna(names)
+    unknown = (idx < 0) & ~unset
+    if unknown.any():
+        raise ValueError(f"没有城市 {', '.join(map(str, np.unique(names[unknown])))} 的社保公积金规则")
+    return np.where(unset, len(CITY_RULES['names']), idx)
+
+def _city_value(key, city_idx, item=None):
+    """按 _city_index 得到的行号取城市规则参数，行号为数组时逐行返回"""
+    values = CITY_RULES[key] if item is None else CITY_RULES[key][item]
+    return values[city_idx]
+
+def resolve_contribution_rates(tax_year=None, city=None):
+    """个人缴费比例：城市规则中列出的比例优先，其余沿用税年默认值 (均支持逐行数组)"""
+    return _contribution_rates(tax_year, _city_index(city))
+
+def _contribution_rates(tax_year, city_idx):
+    """resolve_contribution_rates 的实现：城市已映射为行号，多年税年也只映射一次，各缴费项共用"""
+    if _is_multi_year(tax_year):
+        year_idx = _year_index(tax_year)
+        default_rates = {item: TAX_RULES['contribution_rates'][item][year_idx] for item in CONTRIBUTION_ITEMS}
+    else:
+        default_rates = get_tax_rules(tax_year)['contribution_rates']
+    rates = {}
+    for item in CONTRIBUTION_ITEMS:
+        city_rate = _city_value('contribution_rates', city_idx, item)
+        rates[item] = np.where(np.isnan(city_rate), default_rates[item], city_rate)
+    return rates
+
+# (税年, 城市) -> 标量快速路径用的缴费比例和基数上下限 (Python float)
+_SCALAR_CONTRIBUTION_RULES = {}
+
+def _scalar_contribution_rules(tax_year, city):
+    """单个税年、单个城市的 (缴费比例, 社保下限, 社保上限, 公积金下限, 公积金上限)，首次用到时由数组表取出"""
+    key = (tax_year, city)
+    rules = _SCALAR_CONTRIBUTION_RULES.get(key)
+    if rules is None:
+        idx = _city_index(city)
+        rates = {item: float(rate) for item, rate in _contribution_rates(tax_year, idx).items()}
+        rules = _SCALAR_CONTRIBUTION_RULES[key] = (rates,) + tuple(
+            float(CITY_RULES[column][idx]) for column in ('ss_floor', 'ss_ceiling', 'hf_floor', 'hf_ceiling')
+        )
+    return rules
+
+def resolve_contribution_bounds(ss_base, hf_base, city=None):
+    """实际缴费基数区间：缴费基数 = clip(月薪, 下限, 封顶)
+    
+    封顶取申报基数并夹在城市上下限之间；申报基数为 0 表示不缴纳，上下限均为 0。
+    未指定城市时下限为 0、上限无穷，即 min(申报基数, 月薪)。返回 (社保下限, 社保封顶, 公积金下限, 公积金封顶)。
+    """
+    return _contribution_bounds(ss_base, hf_base, _city_index(city))
+
+def _contribution_bounds(ss_base, hf_base, city_idx):
+    """resolve_contribution_bounds 的实现，城市已映射为行号"""
+    bounds = []
+    for base, prefix in ((ss_base, 'ss'), (hf_base, 'hf')):
+        enrolled = np.asarray(base, dtype=float) > 0
+        floor = np.where(enrolled, _city_value(f'{prefix}_floor', city_idx), 0.0)
+        cap = np.where(enrolled, np.clip(base, floor, _city_value(f'{prefix}_ceiling', city_idx)), 0.0)
+        bounds.extend([floor, cap])
+    return tuple(bounds)
+
+def _bonus_tax_limit(bonus, side, tax_year=None):
+    """年终奖个税在档位上限处的左/右极限：side='left' 取低档 (即实际税额)，side='right' 取高档"""
+    table = get_tax_rules(tax_year)['bonus']
+    idx = np.searchsorted(table['upper'], bonus / 12, side=side)
+    return np.where(bonus > 0, bonus * table['rate'][idx] - table['deduction'][idx], 0.0)
+
+def _as_scalar_if_needed(result):
+    """标量结果返回 float，数组结果原样返回"""
+    if np.ndim(result) == 0:
+        return float(result)
+    return result
+
+# ---------------------- 计算结果缓存 ----------------------
+# 每次操作控件都会重跑整个脚本，相同参数的计算结果在进程内缓存，所有会话共享
+# 容量和过期时间可通过环境变量调整
+RESULT_CACHE_MAX_MB = float(os.environ.get('SALARY_RESULT_CACHE_MAX_MB', 64))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get('SALARY_RESULT_CACHE_TTL', 3600))
+
+def _estimate_nbytes(value):
+    """估算缓存结果占用的内存 (DataFrame/ndarray 按实际数据量，容器递归累加)"""
+    if _is_dataframe(value):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_nbytes(k) + _estimate_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+def _detached(value):
+    """缓存结果交给调用方前的廉价隔离：dict/list 逐层浅拷贝 (明细等嵌套字典同样复制)，数组复制一份，
+    DataFrame 按写时复制语义浅拷贝；数值、字符串、元组等不可变对象直接共享
+    """
+    if isinstance(value, dict):
+        return {key: _detached(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_detached(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if _is_dataframe(value):
+        return value.copy(deep=not _copy_on_write())
+    return value
+
+def _copy_on_write():
+    """pandas 是否启用写时复制 (3.0 起始终启用)：启用时浅拷贝的 DataFrame 原地修改不会影响缓存中的原对象"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return bool(pd.options.mode.copy_on_write)
+
+class ResultCache:
+    """线程安全的 LRU + TTL 结果缓存，按估算内存占用淘汰最久未使用的条目，并记录命中/未命中次数"""
+    
+    def __init__(self, max_bytes, ttl_seconds):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (写入时间, 占用字节, 结果)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _pop(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self.total_bytes -= nbytes
+    
+    def get_or_compute(self, key, compute):
+        """命中时返回缓存结果的隔离副本 (见 _detached)，否则计算并写入；调用方修改返回值不会污染缓存"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl_seconds:
+                self._pop(key)
+                self.evictions += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _detached(entry[2])
+            self.misses += 1
+        
+        value = compute()
+        nbytes = _estimate_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            if nbytes <= self.max_bytes:
+                self._entries[key] = (now, nbytes, value)
+                self.total_bytes += nbytes
+                while self.total_bytes > self.max_bytes:
+                    self._pop(next(iter(self._entries)))
+                    self.evictions += 1
+        return _detached(value)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                '命中': self.hits,
+                '未命中': self.misses,
+                '命中率': self.hits / lookups if lookups else 0.0,
+                '淘汰': self.evictions,
+                '条目数': len(self._entries),
+                '占用(MB)': self.total_bytes / 2**20,
+                '上限(MB)': self.max_bytes / 2**20
+            }
+
+@cache_resource
+def get_result_cache(max_mb=RESULT_CACHE_MAX_MB, ttl_seconds=RESULT_CACHE_TTL_SECONDS):
+    """进程级结果缓存，所有会话共享"""
+    return ResultCache(int(max_mb * 2**20), ttl_seconds)
+
+RESULT_CACHE = get_result_cache()
+METRICS.register_collector(cache_metrics_collector('memory', RESULT_CACHE))
+
+# 磁盘缓存：部署重启后仍可直接读取的计算结果，多个服务进程共享同一目录
+# 只存放计算量大的曲线/批量结果 (见 cached_result 的 disk 参数)，默认放在用户缓存目录，不写进代码目录
+def _user_cache_dir():
+    """用户级缓存目录：Windows 为 %LOCALAPPDATA%，其他系统为 $XDG_CACHE_HOME 或 ~/.cache"""
+    base = os.environ.get('LOCALAPPDATA') if os.name == 'nt' else os.environ.get('XDG_CACHE_HOME')
+    return os.path.join(base or os.path.join(os.path.expanduser('~'), '.cache'), 'salary_optimizer')
+
+DISK_CACHE_DIR = os.environ.get('SALARY_DISK_CACHE_DIR') or _user_cache_dir()
+DISK_CACHE_MAX_MB = float(os.environ.get('SALARY_DISK_CACHE_MAX_MB', 256))  # 设为 0 关闭磁盘缓存
+
+def rules_fingerprint(paths=(TAX_RULES_PATH, CITY_RULES_PATH)):
+    """税务规则和城市规则文件内容的哈希"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def disk_cache_fingerprint():
+    """磁盘缓存键的指纹：规则文件和计算代码 (本文件) 的内容哈希，规则表或计算逻辑一改，旧缓存自动换一套键"""
+    return rules_fingerprint((TAX_RULES_PATH, CITY_RULES_PATH, os.path.abspath(__file__)))
+
+class DiskCache:
+    """按内容寻址的磁盘结果缓存 (pickle + zlib 压缩)，多进程安全
+    
+    文件名为 (规则指纹, 参数) 的 SHA-256；写入先落临时文件再原子替换，读到不完整或损坏的文件按未命中处理并删除。
+    命中时更新文件修改时间，总大小超过上限时按修改时间淘汰最久未用的文件。
+    读取时直接 unpickle 目录中的文件，目录必须只有当前用户可写：新建的目录权限为 0o700，
+    不要把 SALARY_DISK_CACHE_DIR 指向共享或其他用户可写的目录。
+    """
+    
+    SUFFIX = '.bin'
+    
+    def __init__(self, directory, max_bytes, fingerprint):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint
+        self.enabled = max_bytes > 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        self._approx_bytes = 0
+        if self.enabled:
+            try:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+                self._approx_bytes = sum(size for _, size, _ in self._scan())
+            except OSError:
+                self.enabled = False
+    
+    def _path(self, key):
+        name = hashlib.sha256(repr((self.fingerprint, key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name[:2], name + self.SUFFIX)
+    
+    def _scan(self):
+        """列出缓存文件的 (路径, 大小, 修改时间)，其他进程并发删除的文件直接跳过"""
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+    
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def get(self, key):
+        """返回 (是否命中, 结果)"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            self._count('misses')
+            return False, None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            self._count('errors')
+            self._count('misses')
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return False, None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count('hits')
+        return True, value
+    
+    def put(self, key, value):
+        path = self._path(key)
+        payload = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._count('errors')
+            return
+        with self._lock:
+            self.writes += 1
+            self._approx_bytes += len(payload)
+            over_budget = self._approx_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+    
+    def evict(self):
+        """按修改时间淘汰最久未用的文件，直到总大小降到上限的 90%"""
+        try:
+            entries = sorted(self._scan(), key=lambda e: e[2])
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                self._count('evictions')
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._approx_bytes = total
+    
+    def get_or_compute(self, key, compute):
+        if not self.enabled:
+            return compute()
+        hit, value = self.get(key)
+        if hit:
+            return value
+        value = compute()
+        self.put(key, value)
+        return value
+    
+    def stats(self):
+        with self._lock:
+            return {
+                '启用': self.enabled,
+                '命中': self.hits,
+                '未命中': self.misses,
+                '写入': self.writes,
+                '淘汰': self.evictions,
+                '错误': self.errors,
+                '占用(MB)': self._approx_bytes / 2**20,
+                '上限(MB)': self.max_bytes / 2**20
+            }
+
+@cache_resource
+def get_disk_cache(directory=DISK_CACHE_DIR, max_mb=DISK_CACHE_MAX_MB):
+    """进程级磁盘缓存句柄，键中带规则文件和计算代码的指纹 (首次使用时才扫描缓存目录)"""
+    cache = DiskCache(directory, int(max_mb * 2**20), disk_cache_fingerprint())
+    METRICS.register_collector(cache_metrics_collector('disk', cache))
+    return cache
+
+
+def _canonical_param(value):
+    """把参数规范化为可哈希的键：数值统一为 float (5000 与 5000.0 命中同一条目)，数组按内容"""
+    if type(value) is float or value is None:
+        return value
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    if _is_dataframe(value):
+        return (tuple(value.columns), pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical_param(v) for v in value)
+    return value
+
+def cached_result(func=None, *, disk=False):
+    """用进程级结果缓存包装纯计算函数，键为函数名加规范化后的完整参数 (含默认值)
+    
+    disk=True 时内存未命中再查磁盘缓存，两级都未命中才计算；磁盘读写是同步的，只给计算量大的曲线/批量函数打开。
+    参数按位置展开、默认值在装饰时取好，每次调用不再走 inspect 的 bind；命中也有几微秒开销，比这更便宜的函数不要加缓存。
+    """
+    if func is None:
+        return functools.partial(cached_result, disk=disk)
+    parameters = tuple(inspect.signature(func).parameters.values())
+    defaults = tuple(p.default for p in parameters)
+    position = {p.name: i for i, p in enumerate(parameters)}
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        values = list(args) + list(defaults[len(args):])
+        for name, value in kwargs.items():
+            i = position.get(name)
+            if i is None or i < len(args):
+                return func(*args, **kwargs)  # 参数不合法，由原函数抛出 TypeError
+            values[i] = value
+        if len(values) > len(parameters) or any(v is inspect.Parameter.empty for v in values):
+            return func(*args, **kwargs)
+        key = (func.__qualname__,) + tuple(_canonical_param(v) for v in values)
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+        if not disk:
+            return RESULT_CACHE.get_or_compute(key, lambda: func(*args, **kwargs))
+        return RESULT_CACHE.get_or_compute(
+            key, lambda: get_disk_cache().get_or_compute(key, lambda: func(*args, **kwargs))
+        )
+    
+    wrapper.uncached = func
+    return wrapper
+
+# ---------------------- 核心计算函数 ----------------------
+def calculate_tax_salary(taxable_income, tax_year=None):
+    """计算综合所得个税 (支持标量和 NumPy 数组，tax_year 可逐行指定税年)"""
+    if isinstance(taxable_income, _SCALAR_TYPES) and _is_scalar_year(tax_year):
+        income = float(taxable_income)
+        rate, deduction = _scalar_bracket_rates('salary', income, tax_year)
+        return income * rate - deduction
+    income = np.asarray(taxable_income, dtype=float)
+    rate, deduction = _bracket_rates('salary', income, tax_year)
+    return _as_scalar_if_needed(income * rate - deduction)
+
+def calculate_tax_bonus(bonus, tax_year=None):
+    """计算年终奖个税 (单独计税，支持标量和 NumPy 数组，tax_year 可逐行指定税年)"""
+    if isinstance(bonus, _SCALAR_TYPES) and _is_scalar_year(tax_year):
+        bonus = float(bonus)
+        rate, deduction = _scalar_bracket_rates('bonus', bonus / 12, tax_year)
+        return bonus * rate - deduction
+    bonus_arr = np.asarray(bonus, dtype=float)
+    rate, deduction = _bracket_rates('bonus', bonus_arr / 12, tax_year)
+    return _as_scalar_if_needed(bonus_arr * rate - deduction)
+
+def calculate_marginal_rate(taxable_income, tax_year=None):
+    """计算综合所得边际税率 (支持标量和 NumPy 数组，tax_year 可逐行指定税年)"""
+    if isinstance(taxable_income, _SCALAR_TYPES) and _is_scalar_year(tax_year):
+        return _scalar_bracket_rates('salary', float(taxable_income), tax_year)[0]
+    rate, _ = _bracket_rates('salary', np.asarray(taxable_income, dtype=float), tax_year)
+    return _as_scalar_if_needed(rate)
+
+def next_salary_bracket(taxable_income, tax_year=None):
+    """距离下一个综合所得税率档位还差多少应纳税所得额，返回 (下一档税率, 差额)；已在最高档时返回 None
+
+    档位上限为闭区间，恰好等于上限时差额为 0。
+    """
+    upper, rate, _ = get_tax_rules(tax_year)['salary']['scalar']
+    idx = bisect.bisect_left(upper, float(taxable_income))
+    if idx >= len(rate) - 1:
+        return None
+    return rate[idx + 1], upper[idx] - float(taxable_income)
+
+def calculate_social_security(monthly_salary, ss_base, hf_base, tax_year=None, city=None):
+    """计算社保公积金 (支持标量和 NumPy 数组)
+    
+    指定 city 时缴费基数按该城市的上下限夹取、缴费比例按城市规则，city 可为逐行的城市数组；
+    不指定时按 min(申报基数, 月薪) 缴纳，比例取自税务规则。
+    """
+    if (isinstance(monthly_salary, _SCALAR_TYPES) and isinstance(ss_base, _SCALAR_TYPES)
+            and isinstance(hf_base, _SCALAR_TYPES) and _is_scalar_year(tax_year)
+            and (city is None or isinstance(city, str))):
+        return _social_security_scalar(float(monthly_salary), float(ss_base), float(hf_base), tax_year, city)
+    
+    items = _contribution_items(monthly_salary, ss_base, hf_base, tax_year, _city_index(city))
+    if all(np.ndim(v) == 0 for v in (monthly_salary, ss_base, hf_base, tax_year, city)):
+        items = tuple(float(v) for v in items)
+    return _social_security_totals(*items)
+
+def _contribution_items(monthly_salary, ss_base, hf_base, tax_year, city_idx):
+    """各项月缴费额 (养老、医疗、失业、公积金) 的向量化计算，城市已映射为行号 (批量计算中只映射一次)"""
+    rates = _contribution_rates(tax_year, city_idx)
+    ss_floor, ss_cap, hf_floor, hf_cap = _contribution_bounds(ss_base, hf_base, city_idx)
+    ss_capped = np.clip(monthly_salary, ss_floor, ss_cap)
+    pension = ss_capped * rates['养老保险']
+    medical = ss_capped * rates['医疗保险']
+    unemployment = ss_capped * rates['失业保险']
+    
+    # 如果公积金基数为0，则不计入公积金 (上下限均为 0)
+    housing_fund = np.clip(monthly_salary, hf_floor, hf_cap) * rates['公积金']
+    return pension, medical, unemployment, housing_fund
+
+def _annual_social_security(monthly_salary, ss_base, hf_base, tax_year, city_idx):
+    """年度社保公积金合计，供反复求值的批量求解使用 (城市在求解开始时映射一次)"""
+    return _social_security_totals(*_contribution_items(monthly_salary, ss_base, hf_base, tax_year, city_idx))[1]
+
+def _social_security_scalar(monthly_salary, ss_base, hf_base, tax_year, city):
+    """calculate_social_security 的标量快速路径，夹取规则与 resolve_contribution_bounds 相同"""
+    rates, ss_floor, ss_ceiling, hf_floor, hf_ceiling = _scalar_contribution_rules(tax_year, city)
+    if ss_base > 0:
+        ss_capped = min(max(monthly_salary, ss_floor), min(max(ss_base, ss_floor), ss_ceiling))
+    else:
+        ss_capped = 0.0
+    if hf_base > 0:
+        hf_capped = min(max(monthly_salary, hf_floor), min(max(hf_base, hf_floor), hf_ceiling))
+    else:
+        hf_capped = 0.0
+    return _social_security_totals(
+        ss_capped * rates['养老保险'], ss_capped * rates['医疗保险'], ss_capped * rates['失业保险'],
+        hf_capped * rates['公积金']
+    )
+
+def _social_security_totals(pension, medical, unemployment, housing_fund):
+    """由各项月缴费额汇总 (月合计, 年合计, 明细)"""
+    monthly_ss = pension + medical + unemployment + housing_fund
+    annual_ss = monthly_ss * 12
+    
+    return monthly_ss, annual_ss, {
+        '养老保险': pension,
+        '医疗保险': medical,
+        '失业保险': unemployment,
+        '公积金': housing_fund
+    }
+
+def calculate_one_scenario(base_salary, performance_salary, bonus_base_months, 
+                          performance_multiplier, ss_base, hf_base, 
+                          additional_deductions=0, include_performance_in_bonus=True, tax_year=None, city=None):
+    """计算单一薪资方案的结果 (tax_year 默认为最新税年，city 指定时按该城市的缴费基数上下限和比例)
+    
+    标量计算只需几微秒，比查一次结果缓存还便宜，因此不加 cached_result。
+    """
+    SCENARIOS_COMPUTED.inc(path='single')
+    
+    # 1. 计算月度和年度薪资
+    monthly_salary = base_salary + performance_salary
+    annual_salary = monthly_salary * 12
+    
+    # 2. 计算年终奖基数（根据选择决定是否包含绩效工资）
+    if include_performance_in_bonus:
+        bonus_base = base_salary + performance_salary  # 包含绩效工资
+        bonus_calculation_method = "基本工资 + 绩效工资"
+    else:
+        bonus_base = base_salary  # 只包含基本工资
+        bonus_calculation_method = "仅基本工资"
+    
+    # 计算年终奖 (基本月数 × 绩效系数 × 年终奖基数)
+    bonus = bonus_base * bonus_base_months * performance_multiplier
+    
+    # 3. 计算社保公积金
+    monthly_ss, annual_ss, ss_breakdown = calculate_social_security(monthly_salary, ss_base, hf_base, tax_year, city)
+    
+    # 4. 计算年收入和应纳税所得额
+    total_income = annual_salary + bonus
+    basic_deduction = get_tax_rules(tax_year)['basic_deduction']
+    taxable_income = max(0, annual_salary - basic_deduction - annual_ss - additional_deductions*12)
+    
+    # 5. 计算个税
+    salary_tax = calculate_tax_salary(taxable_income, tax_year)
+    bonus_tax = calculate_tax_bonus(bonus, tax_year) if bonus > 0 else 0
+    total_tax = salary_tax + bonus_tax
+    
+    # 6. 计算税后收入及关键指标
+    after_tax_income = total_income - annual_ss - total_tax
+    conversion_rate = after_tax_income / total_income if total_income > 0 else 0
+    
+    # 7. 确定边际税率
+    marginal_rate = calculate_marginal_rate(taxable_income, tax_year)
+    
+    # 8. 计算不同口径的月均收入
+    monthly_without_bonus = (annual_salary - annual_ss - salary_tax) / 12
+    monthly_with_bonus = after_tax_income / 12
+    
+    return {
+        '基本工资': base_salary,
+        '绩效工资': performance_salary,
+        '月度总工资': monthly_salary,
+        '年终奖月数': bonus_base_months,
+        '绩效系数': performance_multiplier,
+        '年终奖基数': bonus_base,
+        '年终奖金额': bonus,
+        '税前年收入': total_income,
+        '社保公积金(年)': annual_ss,
+        '社保公积金详情': ss_breakdown,
+        '应纳税所得额': taxable_income,
+        '个人所得税': total_tax,
+        '税后年收入': after_tax_income,
+        '收入转化率': conversion_rate,
+        '边际税率': marginal_rate,
+        '月均到手(不含年终奖)': monthly_without_bonus,
+        '月均到手(含年终奖)': monthly_with_bonus,
+        '年度社保公积金': annual_ss,
+        '年度个税': total_tax,
+        '年终奖计算方式': bonus_calculation_method,
+        '年终奖包含绩效工资': include_performance_in_bonus
+    }
+
+# 批量计算的输入列 (与 calculate_one_scenario 的参数一一对应)
+SCENARIO_INPUT_COLUMNS = [
+    'base_salary', 'performance_salary', 'bonus_base_months', 'performance_multiplier',
+    'ss_base', 'hf_base', 'additional_deductions', 'include_performance_in_bonus', 'tax_year', 'city'
+]
+
+# ---------------------- 增量计算图 ----------------------
+# 方案计算拆成小节点，每个节点声明依赖的输入或上游节点 (按拓扑顺序排列)。修改某个输入时只把它下游的节点
+# 标为待重算：改专项附加扣除不会重算社保和年终奖个税，改绩效系数不会重算社保和工资个税
+def _safe_ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=float)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=np.asarray(denominator) > 0)
+
+SCENARIO_GRAPH = [
+    # (节点, 依赖, 计算)
+    ('monthly_salary', ('base_salary', 'performance_salary'), lambda base, perf: base + perf),
+    ('annual_salary', ('monthly_salary',), lambda monthly: monthly * 12),
+    ('bonus_base', ('base_salary', 'performance_salary', 'include_performance_in_bonus'),
+     lambda base, perf, include_perf: np.where(include_perf, base + perf, base)),
+    ('bonus_calculation_method', ('include_performance_in_bonus',),
+     lambda include_perf: np.where(include_perf, "基本工资 + 绩效工资", "仅基本工资")),
+    ('bonus', ('bonus_base', 'bonus_base_months', 'performance_multiplier'),
+     lambda bonus_base, months, multiplier: bonus_base * months * multiplier),
+    ('social_security', ('monthly_salary', 'ss_base', 'hf_base', 'tax_year', 'city'), calculate_social_security),
+    ('annual_ss', ('social_security',), lambda social_security: social_security[1]),
+    ('total_income', ('annual_salary', 'bonus'), lambda annual, bonus: annual + bonus),
+    ('basic_deduction', ('tax_year',), lambda tax_year: _rule_value('basic_deduction', tax_year)),
+    ('taxable_income', ('annual_salary', 'basic_deduction', 'annual_ss', 'additional_deductions'),
+     lambda annual, basic, annual_ss, deductions: np.maximum(0, annual - basic - annual_ss - deductions * 12)),
+    ('salary_tax', ('taxable_income', 'tax_year'), calculate_tax_salary),
+    ('bonus_tax', ('bonus', 'tax_year'),
+     lambda bonus, tax_year: np.where(bonus > 0, calculate_tax_bonus(bonus, tax_year), 0.0)),
+    ('total_tax', ('salary_tax', 'bonus_tax'), lambda salary_tax, bonus_tax: salary_tax + bonus_tax),
+    ('after_tax_income', ('total_income', 'annual_ss', 'total_tax'),
+     lambda total, annual_ss, total_tax: total - annual_ss - total_tax),
+    ('conversion_rate', ('after_tax_income', 'total_income'), _safe_ratio),
+    ('marginal_rate', ('taxable_income', 'tax_year'), calculate_marginal_rate),
+    ('monthly_without_bonus', ('annual_salary', 'annual_ss', 'salary_tax'),
+     lambda annual, annual_ss, salary_tax: (annual - annual_ss - salary_tax) / 12),
+    ('monthly_with_bonus', ('after_tax_income',), lambda after_tax: after_tax / 12),
+]
+
+def _graph_downstream():
+    """每个输入/节点 -> 直接或间接依赖它的全部节点"""
+    downstream = {name: set() for name in SCENARIO_INPUT_COLUMNS}
+    for node, deps, _ in SCENARIO_GRAPH:
+        downstream[node] = set()
+        for dep in deps:
+            for name, affected in downstream.items():
+                if name == dep or dep in affected:
+                    affected.add(node)
+    return downstream
+
+SCENARIO_GRAPH_DOWNSTREAM = _graph_downstream()
+
+def _same_input(old, new):
+    """输入是否未变：数组按内容比较 (比重算便宜)；标量要求类型也相同，5000 与 5000.0、True 与 1.0 视为已改，
+    否则结果中会残留旧输入的类型"""
+    if old is new:
+        return True
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        return (isinstance(old, np.ndarray) and isinstance(new, np.ndarray) and old.dtype == new.dtype
+                and old.shape == new.shape and bool(np.array_equal(old, new)))
+    return type(old) is type(new) and bool(old == new)
+
+def _scalar(value):
+    """0 维数组转为 Python 标量，其余原样返回"""
+    if isinstance(value, np.ndarray) and value.ndim == 0:
+        return value.item()
+    return value
+
+class ScenarioGraph:
+    """一个方案 (或一批方案) 的增量计算图：update 只标记下游节点，取结果时按拓扑顺序重算被标记的节点
+    
+    输入与 calculate_one_scenario 的参数相同，可为标量或可广播的数组；适合拖动控件时反复修改同一个方案，
+    以及对一整批员工逐个试算某一参数的不同取值 (见 what_if)。由需要增量重算的调用方自行持有，
+    一次性的单方案和批量计算仍走 calculate_one_scenario / calculate_scenarios_batch 的直接计算。
+    """
+    
+    def __init__(self, base_salary, performance_salary, bonus_base_months, performance_multiplier, ss_base, hf_base,
+                 additional_deductions=0, include_performance_in_bonus=True, tax_year=None, city=None):
+        self._values = dict(zip(SCENARIO_INPUT_COLUMNS, (
+            base_salary, performance_salary, bonus_base_months, performance_multiplier, ss_base, hf_base,
+            additional_deductions, include_performance_in_bonus, tax_year, city
+        )))
+        self._dirty = {node for node, _, _ in SCENARIO_GRAPH}
+        self.evaluations = TallyCounter()  # 各节点累计计算次数
+        self.last_recomputed = []
+    
+    def update(self, **changes):
+        """修改输入，值未变的忽略；返回自身以便链式调用"""
+        unknown = set(changes) - set(SCENARIO_INPUT_COLUMNS)
+        if unknown:
+            raise TypeError(f"未知的方案输入: {', '.join(sorted(unknown))}")
+        for name, value in changes.items():
+            if not _same_input(self._values[name], value):
+                self._values[name] = value
+                self._dirty |= SCENARIO_GRAPH_DOWNSTREAM[name]
+        return self
+    
+    def dirty_nodes(self):
+        """待重算的节点 (按计算顺序)"""
+        return [node for node, _, _ in SCENARIO_GRAPH if node in self._dirty]
+    
+    def _evaluate(self):
+        if not self._dirty:
+            return self._values
+        recomputed = self.dirty_nodes()
+        for node, deps, compute in SCENARIO_GRAPH:
+            if node in self._dirty:
+                self._values[node] = compute(*(self._values[dep] for dep in deps))
+        self._dirty.clear()
+        self.evaluations.update(recomputed)
+        self.last_recomputed = recomputed
+        return self._values
+    
+    def value(self, name):
+        """取某个输入或节点的当前值 (需要时先重算)"""
+        return self._evaluate()[name]
+    
+    def result(self):
+        """与 calculate_one_scenario 相同结构的结果字典 (输入为数组时各项为数组)"""
+        v = self._evaluate()
+        _, annual_ss, ss_breakdown = v['social_security']
+        return {key: _scalar(value) for key, value in {
+            '基本工资': v['base_salary'],
+            '绩效工资': v['performance_salary'],
+            '月度总工资': v['monthly_salary'],
+            '年终奖月数': v['bonus_base_months'],
+            '绩效系数': v['performance_multiplier'],
+            '年终奖基数': v['bonus_base'],
+            '年终奖金额': v['bonus'],
+            '税前年收入': v['total_income'],
+            '社保公积金(年)': annual_ss,
+            '社保公积金详情': dict(ss_breakdown),
+            '应纳税所得额': v['taxable_income'],
+            '个人所得税': v['total_tax'],
+            '税后年收入': v['after_tax_income'],
+            '收入转化率': v['conversion_rate'],
+            '边际税率': v['marginal_rate'],
+            '月均到手(不含年终奖)': v['monthly_without_bonus'],
+            '月均到手(含年终奖)': v['monthly_with_bonus'],
+            '年度社保公积金': annual_ss,
+            '年度个税': v['total_tax'],
+            '年终奖计算方式': v['bonus_calculation_method'],
+            '年终奖包含绩效工资': v['include_performance_in_bonus']
+        }.items()}
+    
+    def frame(self):
+        """与 calculate_scenarios_batch 相同列的 DataFrame (标量输入广播到批量的行数)"""
+        v = self._evaluate()
+        shape = np.broadcast_shapes((1,), *(np.shape(v[name]) for name in SCENARIO_INPUT_COLUMNS))
+        _, annual_ss, ss_breakdown = v['social_security']
+        tax_year = v['tax_year']
+        columns = {
+            '基本工资': v['base_salary'],
+            '绩效工资': v['performance_salary'],
+            '月度总工资': v['monthly_salary'],
+            '年终奖月数': v['bonus_base_months'],
+            '绩效系数': v['performance_multiplier'],
+            '年终奖基数': v['bonus_base'],
+            '年终奖金额': v['bonus'],
+            '税前年收入': v['total_income'],
+            '社保公积金(年)': annual_ss,
+            '养老保险(月)': ss_breakdown['养老保险'],
+            '医疗保险(月)': ss_breakdown['医疗保险'],
+            '失业保险(月)': ss_breakdown['失业保险'],
+            '公积金(月)': ss_breakdown['公积金'],
+            '应纳税所得额': v['taxable_income'],
+            '工资个税': v['salary_tax'],
+            '年终奖个税': v['bonus_tax'],
+            '个人所得税': v['total_tax'],
+            '税后年收入': v['after_tax_income'],
+            '收入转化率': v['conversion_rate'],
+            '边际税率': v['marginal_rate'],
+            '月均到手(不含年终奖)': v['monthly_without_bonus'],
+            '月均到手(含年终奖)': v['monthly_with_bonus'],
+            '年终奖包含绩效工资': np.asarray(v['include_performance_in_bonus'], dtype=bool),
+            '税年': np.asarray(DEFAULT_TAX_YEAR if tax_year is None else tax_year).astype(int),
+            '城市': np.asarray(v['city'], dtype=object)
+        }
+        return pd.DataFrame({name: np.broadcast_to(value, shape) for name, value in columns.items()})
+    
+    def what_if(self, parameter, values, columns=None):
+        """依次把 parameter 设为 values 中的每个取值 (只重算受它影响的节点)，结果纵向拼接，外层索引为取值
+        
+        columns 指定只保留哪些结果列 (人数多、取值多时控制内存)；试算完恢复原来的取值。
+        """
+        original = self._values[parameter]
+        frames = []
+        try:
+            for value in values:
+                frame = self.update(**{parameter: value}).frame()
+                frames.append(frame if columns is None else frame[list(columns)])
+        finally:
+            self.update(**{parameter: original})
+        return pd.concat(frames, keys=list(values), names=[parameter, None])
+
+def calculate_scenarios_batch(base_salary, performance_salary, bonus_base_months,
+                              performance_multiplier, ss_base, hf_base,
+                              additional_deductions=0, include_performance_in_bonus=True, tax_year=None,
+                              city=None):
+    """批量计算薪资方案：参数为等长数组 (或可广播的标量)，返回每个指标一列的 DataFrame
+    
+    tax_year 可为数组，逐行按对应税年的规则计算，多个税年的工资表一次算完；
+    city 同样可为逐行的城市数组，多城市工资表的缴费基数夹取一次完成 (None 表示不限城市)。
+    """
+    started = time.perf_counter()
+    result = pd.DataFrame(_scenario_columns(
+        base_salary, performance_salary, bonus_base_months, performance_multiplier, ss_base, hf_base,
+        additional_deductions, include_performance_in_bonus, tax_year, city
+    ))
+    _record_batch_metrics(len(result), time.perf_counter() - started)
+    return result
+
+def _scenario_columns(base_salary, performance_salary, bonus_base_months, performance_multiplier, ss_base, hf_base,
+                      additional_deductions, include_performance_in_bonus, tax_year, city):
+    """calculate_scenarios_batch 的计算部分，返回 {列名: 数组}；曲线只取其中几列，不必先构造完整的 DataFrame"""
+    numeric = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (
+        base_salary, performance_salary, bonus_base_months, performance_multiplier,
+        ss_base, hf_base, additional_deductions, include_performance_in_bonus,
+        DEFAULT_TAX_YEAR if tax_year is None else tax_year, np.zeros(np.shape(city))
+    )))
+    base, perf, months, multiplier, ss, hf, deductions, include_perf, years, _ = (np.atleast_1d(v) for v in numeric)
+    include_perf = include_perf.astype(bool)
+    if not _is_multi_year(tax_year):
+        years = tax_year
+    cities = np.broadcast_to(np.asarray(city, dtype=object), base.shape)
+    
+    # 1. 月度和年度薪资
+    monthly_salary = base + perf
+    annual_salary = monthly_salary * 12
+    
+    # 2. 年终奖
+    bonus_base = np.where(include_perf, base + perf, base)
+    bonus = bonus_base * months * multiplier
+    
+    # 3. 社保公积金
+    monthly_ss, annual_ss, ss_breakdown = calculate_social_security(
+        monthly_salary, ss, hf, years, cities if np.ndim(city) > 0 else city
+    )
+    
+    # 4. 年收入和应纳税所得额
+    total_income = annual_salary + bonus
+    taxable_income = np.maximum(0, annual_salary - _rule_value('basic_deduction', years) - annual_ss - deductions * 12)
+    
+    # 5. 个税
+    salary_tax = calculate_tax_salary(taxable_income, years)
+    bonus_tax = np.where(bonus > 0, calculate_tax_bonus(bonus, years), 0.0)
+    total_tax = salary_tax + bonus_tax
+    
+    # 6. 税后收入及关键指标
+    after_tax_income = total_income - annual_ss - total_tax
+    conversion_rate = np.divide(after_tax_income, total_income,
+                                out=np.zeros_like(after_tax_income), where=total_income > 0)
+    
+    return {
+        '基本工资': base,
+        '绩效工资': perf,
+        '月度总工资': monthly_salary,
+        '年终奖月数': months,
+        '绩效系数': multiplier,
+        '年终奖基数': bonus_base,
+        '年终奖金额': bonus,
+        '税前年收入': total_income,
+        '社保公积金(年)': annual_ss,
+        '养老保险(月)': ss_breakdown['养老保险'],
+        '医疗保险(月)': ss_breakdown['医疗保险'],
+        '失业保险(月)': ss_breakdown['失业保险'],
+        '公积金(月)': ss_breakdown['公积金'],
+        '应纳税所得额': taxable_income,
+        '工资个税': salary_tax,
+        '年终奖个税': bonus_tax,
+        '个人所得税': total_tax,
+        '税后年收入': after_tax_income,
+        '收入转化率': conversion_rate,
+        '边际税率': calculate_marginal_rate(taxable_income, years),
+        '月均到手(不含年终奖)': (annual_salary - annual_ss - salary_tax) / 12,
+        '月均到手(含年终奖)': after_tax_income / 12,
+        '年终奖包含绩效工资': include_perf,
+        '税年': np.broadcast_to(DEFAULT_TAX_YEAR if years is None else years, base.shape).astype(int),
+        '城市': cities
+    }
+
+def _record_batch_metrics(rows, elapsed):
+    SCENARIOS_COMPUTED.inc(rows, path='batch')
+    BATCH_ROWS.inc(rows)
+    BATCH_SECONDS.inc(elapsed)
+    if elapsed > 0:
+        BATCH_ROWS_PER_SECOND.set(rows / elapsed)
+
+def calculate_scenarios_frame(params_df):
+    """按 DataFrame 批量计算薪资方案，列名见 SCENARIO_INPUT_COLUMNS，缺省列使用默认值"""
+    missing = [c for c in SCENARIO_INPUT_COLUMNS[:6] if c not in params_df.columns]
+    if missing:
+        raise ValueError(f"缺少必需的参数列: {', '.join(missing)}")
+    
+    kwargs = {c: params_df[c].to_numpy() for c in SCENARIO_INPUT_COLUMNS if c in params_df.columns}
+    result = calculate_scenarios_batch(**kwargs)
+    result.index = params_df.index
+    return result
+
+def _split_monthly_salary(base_salary, performance_salary, monthly_salary):
+    """保持绩效工资比例不变，把月度总工资拆分为基本工资和绩效工资"""
+    total = base_salary + performance_salary
+    if total > 0:
+        return base_salary * (monthly_salary / total), performance_salary * (monthly_salary / total)
+    return monthly_salary / 2, monthly_salary / 2
+
+@cached_result(disk=True)
+def generate_comprehensive_data(base_salary, performance_salary, bonus_base_months, 
+                               performance_multiplier, ss_base, hf_base, 
+                               additional_deductions=0, include_performance_in_bonus=True,
+                               salary_min=5000, salary_max=100000, step=500, exact=False, tax_year=None,
+                               city=None):
+    """生成综合对比数据 (exact=True 时按解析断点生成精确曲线，step 不再生效)"""
+    if exact:
+        return generate_breakpoint_data(
+            base_salary, performance_salary, bonus_base_months,
+            performance_multiplier, ss_base, hf_base, additional_deductions,
+            include_performance_in_bonus, salary_min, salary_max, tax_year, city
+        )
+    
+    salary_range = np.arange(salary_min, salary_max + 1, step)
+    SWEEP_POINTS.inc(len(salary_range), mode='grid')
+    current_base, current_perf = _split_monthly_salary(base_salary, performance_salary, salary_range)
+    
+    result = _scenario_columns(
+        current_base, current_perf, bonus_base_months,
+        performance_multiplier, ss_base, hf_base, additional_deductions,
+        include_performance_in_bonus, tax_year, city
+    )
+    
+    return pd.DataFrame({
+        '月薪': salary_range,
+        '税后年收入': result['税后年收入'],
+        '收入转化率': result['收入转化率'],
+        '边际税率': result['边际税率'],
+        '月度个税': result['个人所得税'] / 12,
+        '月度社保公积金': result['社保公积金(年)'] / 12,
+        '税前月收入': salary_range
+    })
+
+def _salary_breakpoint_arrays(base_salary, performance_salary, bonus_base_months,
+                              performance_multiplier, ss_base, hf_base,
+                              additional_deductions, include_performance_in_bonus,
+                              salary_min, salary_max, tax_year=None, city=None):
+    """返回区间内断点的 (月薪, 类型, 应纳税所得额, 年终奖金额) 数组，按月薪排序"""
+    rules = get_tax_rules(tax_year)
+    salary, kinds, taxable, bonus = [], [], [], []
+    
+    # 1. 社保、公积金缴费基数保底点和封顶点
+    ss_floor, ss_cap, hf_floor, hf_cap = (float(v) for v in resolve_contribution_bounds(ss_base, hf_base, city))
+    for point, kind in ((ss_floor, '社保基数保底'), (ss_cap, '社保基数封顶'),
+                        (hf_floor, '公积金基数保底'), (hf_cap, '公积金基数封顶')):
+        if point > 0:
+            salary.append(point); kinds.append(kind); taxable.append(np.nan); bonus.append(np.nan)
+    
+    # 2. 应纳税所得额在相邻保底/封顶点之间线性变化，按分段线性反解各档位上限
+    knots = np.unique(np.clip([salary_min, salary_max] + salary, salary_min, salary_max))
+    _, annual_ss, _ = calculate_social_security(knots, ss_base, hf_base, tax_year, city)
+    raw_taxable = knots * 12 - rules['basic_deduction'] - annual_ss - additional_deductions * 12
+    thresholds = np.concatenate([[0.0], rules['salary']['upper'][:-1]])
+    thresholds = thresholds[(thresholds >= raw_taxable[0]) & (thresholds <= raw_taxable[-1])]
+    salary.extend(np.interp(thresholds, raw_taxable, knots))
+    kinds.extend('应纳税所得额归零' if t == 0 else '综合所得跳档' for t in thresholds)
+    taxable.extend(thresholds)
+    bonus.extend([np.nan] * len(thresholds))
+    
+    # 3. 年终奖与月薪成正比，按比例反解年终奖各档位上限
+    unit_base, unit_perf = _split_monthly_salary(base_salary, performance_salary, 1.0)
+    unit_bonus_base = unit_base + unit_perf if include_performance_in_bonus else unit_base
+    bonus_per_salary = unit_bonus_base * bonus_base_months * performance_multiplier
+    if bonus_per_salary > 0:
+        thresholds = rules['bonus']['upper'][:-1] * 12
+        salary.extend(thresholds / bonus_per_salary)
+        kinds.extend(['年终奖跳档'] * len(thresholds))
+        taxable.extend([np.nan] * len(thresholds))
+        bonus.extend(thresholds)
+    
+    salary = np.array(salary, dtype=float)
+    order = np.argsort(salary, kind='stable')
+    order = order[(salary[order] >= salary_min) & (salary[order] <= salary_max)]
+    return salary[order], np.array(kinds, dtype=object)[order], np.array(taxable)[order], np.array(bonus)[order]
+
+def find_salary_breakpoints(base_salary, performance_salary, bonus_base_months,
+                            performance_multiplier, ss_base, hf_base,
+                            additional_deductions=0, include_performance_in_bonus=True,
+                            salary_min=5000, salary_max=100000, tax_year=None, city=None):
+    """解析求出月薪区间内税后收入曲线的全部断点
+    
+    税后收入关于月度总工资分段线性，断点只来自：社保/公积金基数封顶、应纳税所得额归零及
+    跨越综合所得税率档位 (边际税率跳变)、年终奖跨越单独计税档位 (税后收入跳变)。
+    返回按月薪排序的 DataFrame，列为 月薪、类型、应纳税所得额、年终奖金额，
+    后两列仅在对应的跳档点上有值，为精确的档位上限。
+    """
+    salary, kinds, taxable, bonus = _salary_breakpoint_arrays(
+        base_salary, performance_salary, bonus_base_months,
+        performance_multiplier, ss_base, hf_base, additional_deductions,
+        include_performance_in_bonus, salary_min, salary_max, tax_year, city
+    )
+    return pd.DataFrame({'月薪': salary, '类型': kinds, '应纳税所得额': taxable, '年终奖金额': bonus})
+
+def generate_breakpoint_data(base_salary, performance_salary, bonus_base_months,
+                             performance_multiplier, ss_base, hf_base,
+                             additional_deductions=0, include_performance_in_bonus=True,
+                             salary_min=5000, salary_max=100000, tax_year=None, city=None):
+    """按解析断点生成精确曲线数据
+    
+    只返回分段线性曲线的顶点：区间端点和 find_salary_breakpoints 求出的断点。
+    在边际税率或年终奖个税跳变处，同一月薪返回两行，先左极限 (跳档前) 后右极限 (跳档后)，
+    因此计算量只取决于断点个数，与月薪范围和精度无关。列与 generate_comprehensive_data 一致。
+    """
+    bp_salary, _, bp_taxable, bp_bonus = _salary_breakpoint_arrays(
+        base_salary, performance_salary, bonus_base_months,
+        performance_multiplier, ss_base, hf_base, additional_deductions,
+        include_performance_in_bonus, salary_min, salary_max, tax_year, city
+    )
+    
+    # 合并重合的顶点，保留各自的跳档值
+    salary, inverse = np.unique(np.concatenate([[salary_min, salary_max], bp_salary]), return_inverse=True)
+    snap_taxable = np.full(len(salary), np.nan)
+    snap_bonus = np.full(len(salary), np.nan)
+    np.fmax.at(snap_taxable, inverse[2:], bp_taxable)
+    np.fmax.at(snap_bonus, inverse[2:], bp_bonus)
+    
+    current_base, current_perf = _split_monthly_salary(base_salary, performance_salary, salary)
+    result = _scenario_columns(
+        current_base, current_perf, bonus_base_months,
+        performance_multiplier, ss_base, hf_base, additional_deductions,
+        include_performance_in_bonus, tax_year, city
+    )
+    
+    # 跳档点上用精确的档位上限代替浮点反解结果
+    taxable = np.where(np.isnan(snap_taxable), result['应纳税所得额'], snap_taxable)
+    bonus = np.where(np.isnan(snap_bonus), result['年终奖金额'], snap_bonus)
+    annual_ss = result['社保公积金(年)']
+    total_income = salary * 12 + bonus
+    salary_tax = calculate_tax_salary(taxable, tax_year)
+    salary_table = get_tax_rules(tax_year)['salary']
+    
+    def limit_values(side):
+        """按档位上限的左/右极限计算税后收入、个税和边际税率"""
+        rate_idx = np.searchsorted(salary_table['upper'], taxable, side=side)
+        total_tax = salary_tax + _bonus_tax_limit(bonus, side, tax_year)
+        return total_income - annual_ss - total_tax, total_tax, salary_table['rate'][rate_idx]
+    
+    left, right = limit_values('left'), limit_values('right')
+    jumps = ((left[0] != right[0]) | (left[2] != right[2])) & (salary < salary_max)
+    
+    # 左极限与右极限交错排列，同一月薪上左极限在前
+    rows = np.concatenate([np.arange(len(salary)), np.flatnonzero(jumps)])
+    order = np.argsort(rows, kind='stable')
+    is_right = order >= len(salary)
+    rows = rows[order]
+    after_tax_income, total_tax, marginal_rate = (
+        np.where(is_right, r[rows], l[rows]) for l, r in zip(left, right)
+    )
+    total_income = total_income[rows]
+    SWEEP_POINTS.inc(len(rows), mode='breakpoint')
+    
+    return pd.DataFrame({
+        '月薪': salary[rows],
+        '税后年收入': after_tax_income,
+        '收入转化率': np.divide(after_tax_income, total_income,
+                               out=np.zeros_like(after_tax_income), where=total_income > 0),
+        '边际税率': marginal_rate,
+        '月度个税': total_tax / 12,
+        '月度社保公积金': annual_ss[rows] / 12,
+        '税前月收入': salary[rows]
+    })
+
+# ---------------------- 年终奖死区分析 ----------------------
+def calculate_bonus_dead_zones(tax_year=None):
+    """解析求出年终奖单独计税的全部死区 (多发反而少拿的区间)
+    
+    年终奖刚越过档位上限 T 时整笔适用更高税率，税后金额骤降；直到税后金额回到 T 处的水平，
+    即 B*(1-r') - d' = T*(1-r) - d 的解 D 为止。死区为开区间 (T, D)，两端税后金额相等。
+    """
+    table = get_tax_rules(tax_year)['bonus']
+    upper = table['upper'][:-1] * 12
+    rate, deduction = table['rate'], table['deduction']
+    net_at_threshold = upper * (1 - rate[:-1]) + deduction[:-1]
+    zone_end = (net_at_threshold - deduction[1:]) / (1 - rate[1:])
+    
+    return pd.DataFrame({
+        '税率变化': [f"{a*100:.0f}%→{b*100:.0f}%" for a, b in zip(rate[:-1], rate[1:])],
+        '死区起点': upper,
+        '死区终点': zone_end,
+        '最大税后损失': upper * (rate[1:] - rate[:-1]) - (deduction[1:] - deduction[:-1])
+    })
+
+def bonus_dead_zones_for_base(bonus_base, tax_year=None):
+    """把死区换算为给定年终奖基数下的 基本月数×绩效系数 区间"""
+    zones = calculate_bonus_dead_zones(tax_year)
+    if bonus_base > 0:
+        zones['系数起点'] = zones['死区起点'] / bonus_base
+        zones['系数终点'] = zones['死区终点'] / bonus_base
+    else:
+        zones['系数起点'] = zones['系数终点'] = np.nan
+    return zones
+
+def check_bonus_dead_zone(bonus_base, bonus_base_months, performance_multiplier, tax_year=None):
+    """批量判断年终奖是否落入死区 (参数支持等长数组，适合整张工资表)
+    
+    返回每人一行的 DataFrame：处于死区时给出所在死区、可少发的金额、由此多拿的税后金额，
+    以及死区起点对应的 基本月数×绩效系数，即不落入该死区的最大系数。
+    """
+    base, months, multiplier = (
+        np.atleast_1d(v) for v in np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (
+            bonus_base, bonus_base_months, performance_multiplier
+        )))
+    )
+    bonus = base * months * multiplier
+    
+    zones = calculate_bonus_dead_zones(tax_year)
+    zone_start = zones['死区起点'].to_numpy()
+    zone_end = zones['死区终点'].to_numpy()
+    
+    # 死区互不重叠且按起点升序，起点严格小于年终奖的最后一个死区即为候选
+    idx = np.searchsorted(zone_start, bonus, side='left') - 1
+    in_zone = (idx >= 0) & (bonus < zone_end[np.maximum(idx, 0)])
+    start = np.where(in_zone, zone_start[np.maximum(idx, 0)], np.nan)
+    end = np.where(in_zone, zone_end[np.maximum(idx, 0)], np.nan)
+    
+    net_bonus = bonus - _bonus_tax_limit(bonus, 'left', tax_year)
+    net_at_start = np.where(in_zone, start - calculate_tax_bonus(np.nan_to_num(start), tax_year), np.nan)
+    factor_start = np.divide(start, base, out=np.full_like(start, np.nan), where=base > 0)
+    factor_end = np.divide(end, base, out=np.full_like(end, np.nan), where=base > 0)
+    
+    return pd.DataFrame({
+        '年终奖金额': bonus,
+        '处于死区': in_zone,
+        '死区起点': start,
+        '死区终点': end,
+        '可少发金额': bonus - start,
+        '税后损失': net_at_start - net_bonus,
+        '系数起点': factor_start,
+        '系数终点': factor_end
+    })
+
+# ---------------------- 月薪/年终奖最优拆分 ----------------------
+def _invert_piecewise_linear(knots, values, targets):
+    """逐行反解分段线性不减函数：knots/values 为 (n, m) 的顶点，返回 (n, len(targets)) 的解，无解为 NaN"""
+    k0, k1 = knots[:, :-1, None], knots[:, 1:, None]
+    v0, v1 = values[:, :-1, None], values[:, 1:, None]
+    valid = (v0 <= targets) & (targets <= v1) & (v1 > v0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        solved = np.where(valid, k0 + (targets - v0) * (k1 - k0) / (v1 - v0), np.inf)
+    solved = solved.min(axis=1)
+    return np.where(np.isinf(solved), np.nan, solved)
+
+def _package_split_candidates(annual_package, ss_base, hf_base, additional_deductions, min_monthly_salary,
+                              tax_year=None, city=None):
+    """列出每个年薪总包全部可能的最优月薪 (分段线性的顶点)，返回 (月薪, 税后, 左极限税后) 矩阵
+    
+    固定年薪总包 P，月薪 m 与年终奖 P-12m 此消彼长，税后收入关于 m 分段线性，
+    断点只有：月薪上下限、社保/公积金基数保底和封顶、应纳税所得额跨档、年终奖恰好等于档位上限。
+    年终奖在档位上限处取低档税率，因此税后收入在每个断点右连续，最大值必在断点处取得。
+    """
+    package, ss, hf, deductions, min_salary, _ = (
+        np.atleast_1d(v)[:, None] for v in np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (
+            annual_package, ss_base, hf_base, additional_deductions, min_monthly_salary, np.zeros(np.shape(city))
+        )))
+    )
+    if city is not None:
+        city = np.broadcast_to(np.asarray(city, dtype=object), package.shape[:1])[:, None]
+    city_idx = _city_index(city)
+    max_salary = package / 12
+    min_salary = np.minimum(min_salary, max_salary)
+    rules = get_tax_rules(tax_year)
+    
+    def taxable_at(salary):
+        annual_ss = _annual_social_security(salary, ss, hf, tax_year, city_idx)
+        return salary * 12 - rules['basic_deduction'] - annual_ss - deductions * 12
+    
+    # 1. 区间端点与社保/公积金保底、封顶点
+    bounds = np.broadcast_arrays(*_contribution_bounds(ss, hf, city_idx))
+    knots = np.sort(np.clip(np.hstack([min_salary, *bounds, max_salary]), min_salary, max_salary), axis=1)
+    
+    # 2. 应纳税所得额为 0 及各档位上限处：在封顶点之间线性反解
+    thresholds = np.concatenate([[0.0], rules['salary']['upper'][:-1]])
+    taxable_points = _invert_piecewise_linear(knots, taxable_at(knots), thresholds)
+    
+    # 3. 年终奖恰好等于各档位上限 (舍入误差使年终奖超出上限时，月薪上调一个浮点单位)
+    bonus_thresholds = rules['bonus']['upper'][:-1] * 12
+    bonus_points = (package - bonus_thresholds) / 12
+    bonus_points = np.where(package - 12 * bonus_points > bonus_thresholds,
+                            np.nextafter(bonus_points, np.inf), bonus_points)
+    bonus_points = np.where((bonus_points >= min_salary) & (bonus_points <= max_salary), bonus_points, np.nan)
+    
+    salary = np.hstack([knots, taxable_points, bonus_points])
+    
+    # 4. 在全部候选点上一次性计算税后收入及其左极限 (年终奖取高档税率)
+    salary_safe = np.nan_to_num(salary)
+    annual_ss = _annual_social_security(salary_safe, ss, hf, tax_year, city_idx)
+    salary_tax = calculate_tax_salary(np.maximum(0, taxable_at(salary_safe)), tax_year)
+    base_income = package - annual_ss - salary_tax
+    bonus_safe = package - 12 * salary_safe
+    
+    value = np.where(np.isnan(salary), -np.inf, base_income - _bonus_tax_limit(bonus_safe, 'left', tax_year))
+    left_value = np.where(np.isnan(salary), -np.inf, base_income - _bonus_tax_limit(bonus_safe, 'right', tax_year))
+    
+    order = np.argsort(np.where(np.isnan(salary), np.inf, salary), axis=1, kind='stable')
+    return tuple(np.take_along_axis(v, order, axis=1) for v in (salary, value, left_value))
+
+def optimize_package_split_batch(annual_package, ss_base, hf_base, additional_deductions=0,
+                                 min_monthly_salary=0, tolerance=1e-6, tax_year=None, city=None):
+    """批量求固定年薪总包下税后收入最大的月薪/年终奖拆分 (参数支持等长数组)
+    
+    每个总包只需计算 O(税率档数) 个候选点。存在并列最优时，返回最优月薪的最小值和最大值，
+    推荐方案取月薪最高的一个；完整的并列最优区间见 optimize_package_split。
+    """
+    salary, value, _ = _package_split_candidates(
+        annual_package, ss_base, hf_base, additional_deductions, min_monthly_salary, tax_year, city
+    )
+    best = value.max(axis=1, keepdims=True)
+    optimal = value >= best - tolerance
+    best_salary = np.where(optimal, salary, -np.inf).max(axis=1)
+    package = np.broadcast_to(np.asarray(annual_package, dtype=float), best_salary.shape)
+    
+    return pd.DataFrame({
+        '年薪总包': package,
+        '最优月薪': best_salary,
+        '最优年终奖': package - 12 * best_salary,
+        '最优税后年收入': best[:, 0],
+        '最优月薪(最小)': np.where(optimal, salary, np.inf).min(axis=1),
+        '最优月薪(最大)': best_salary
+    })
+
+@cached_result
+def optimize_package_split(annual_package, ss_base, hf_base, additional_deductions=0,
+                           min_monthly_salary=0, tolerance=1e-6, tax_year=None, city=None):
+    """求固定年薪总包下税后收入最大的月薪/年终奖拆分，返回推荐方案及全部并列最优区间
+    
+    并列最优以 [(月薪下限, 月薪上限), ...] 给出，单点最优时上下限相等。
+    """
+    salary, value, left_value = (v[0] for v in _package_split_candidates(
+        annual_package, ss_base, hf_base, additional_deductions, min_monthly_salary, tax_year, city
+    ))
+    best = value.max()
+    
+    # 相邻两个候选点之间线性：左端取值与右端左极限都达到最优，则整段并列最优
+    intervals = []
+    for i in np.flatnonzero(value >= best - tolerance):
+        lo = hi = salary[i]
+        j = i + 1
+        while j < len(salary) and np.isfinite(salary[j]) and left_value[j] >= best - tolerance:
+            hi = salary[j]
+            j += 1
+        if intervals and lo <= intervals[-1][1]:
+            intervals[-1] = (intervals[-1][0], max(hi, intervals[-1][1]))
+        else:
+            intervals.append((float(lo), float(hi)))
+    
+    best_salary = intervals[-1][1]
+    return {
+        '年薪总包': annual_package,
+        '最优月薪': best_salary,
+        '最优年终奖': annual_package - 12 * best_salary,
+        '最优税后年收入': float(best),
+        '并列最优区间': intervals
+    }
+
+# ---------------------- 目标到手反推税前工资 ----------------------
+# 可作为反推目标的指标及其换算到税后年收入的倍数
+TARGET_METRICS = {
+    '月均到手(含年终奖)': 12,
+    '税后年收入': 1
+}
+
+def solve_base_salary_batch(target, performance_ratio, bonus_base_months, performance_multiplier,
+                            ss_base, hf_base, additional_deductions=0, include_performance_in_bonus=True,
+                            target_metric='月均到手(含年终奖)', tax_year=None, city=None):
+    """批量反推达到目标到手收入所需的最低基本工资 (参数支持等长数组)
+    
+    绩效工资按 performance_ratio (绩效工资/基本工资) 随基本工资同比例变化，年终奖月数、绩效系数和
+    社保公积金基数保持不变。税后年收入关于月度总工资分段线性，断点与 find_salary_breakpoints 相同；
+    逐段解析求解第一个达到目标的月薪，年终奖死区内的跳降也会正确跳过。
+    """
+    if target_metric not in TARGET_METRICS:
+        raise ValueError(f"不支持的目标指标: {target_metric}，可选: {', '.join(TARGET_METRICS)}")
+    
+    target_annual, ratio, months, multiplier, ss, hf, deductions, include_perf, _ = (
+        np.atleast_1d(v)[:, None] for v in np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (
+            target, performance_ratio, bonus_base_months, performance_multiplier,
+            ss_base, hf_base, additional_deductions, include_performance_in_bonus, np.zeros(np.shape(city))
+        )))
+    )
+    if city is not None:
+        city = np.broadcast_to(np.asarray(city, dtype=object), target_annual.shape[:1])[:, None]
+    city_idx = _city_index(city)
+    target_annual = target_annual * TARGET_METRICS[target_metric]
+    
+    # 年终奖与月度总工资成正比
+    bonus_per_salary = np.where(include_perf > 0, 1, 1 / (1 + ratio)) * months * multiplier
+    
+    rules = get_tax_rules(tax_year)
+    
+    def taxable_at(salary):
+        annual_ss = _annual_social_security(salary, ss, hf, tax_year, city_idx)
+        return salary * 12 - rules['basic_deduction'] - annual_ss - deductions * 12
+    
+    # 1. 断点：0、上界、社保/公积金保底和封顶点、应纳税所得额跨档点、年终奖跳档点
+    # 年终奖税后非负；月薪不低于缴费基数下限时，工资部分税后不低于 12×(1-最高税率-社保公积金比例)×月薪，
+    # 上界处必然达标
+    bounds = np.broadcast_arrays(*_contribution_bounds(ss, hf, city_idx))
+    rates = sum(_contribution_rates(tax_year, city_idx).values())
+    net_share = 12 * (1 - rules['salary']['rate'].max() - rates)
+    max_salary = np.maximum(np.maximum(target_annual / net_share, bounds[0]), np.maximum(bounds[2], 1))
+    knots = np.sort(np.clip(np.hstack([np.zeros_like(ss), *bounds, max_salary]), 0, max_salary), axis=1)
+    thresholds = np.concatenate([[0.0], rules['salary']['upper'][:-1]])
+    taxable_points = _invert_piecewise_linear(knots, taxable_at(knots), thresholds)
+    # 舍入误差使年终奖超出档位上限时，月薪下调一个浮点单位；没有年终奖的行跳档点为无穷大 (0 × inf 为 NaN，不下调)
+    bonus_thresholds = rules['bonus']['upper'][:-1] * 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bonus_points = bonus_thresholds / bonus_per_salary
+        bonus_points = np.where(bonus_per_salary * bonus_points > bonus_thresholds,
+                                np.nextafter(bonus_points, 0), bonus_points)
+    bonus_points = np.where(bonus_points <= max_salary, bonus_points, np.nan)
+    
+    salary = np.hstack([knots, taxable_points, bonus_points])
+    salary = np.sort(np.where(np.isnan(salary), max_salary, salary), axis=1)
+    
+    # 2. 在全部断点上一次性计算税后年收入及其右极限 (年终奖取高档税率)
+    annual_ss = _annual_social_security(salary, ss, hf, tax_year, city_idx)
+    salary_tax = calculate_tax_salary(np.maximum(0, taxable_at(salary)), tax_year)
+    bonus = bonus_per_salary * salary
+    base_income = salary * 12 + bonus - annual_ss - salary_tax
+    value = base_income - _bonus_tax_limit(bonus, 'left', tax_year)
+    right_value = base_income - _bonus_tax_limit(bonus, 'right', tax_year)
+    
+    # 3. 每段从右极限线性变化到下一断点的取值，取第一个达到目标的位置
+    s0, s1 = salary[:, :-1], salary[:, 1:]
+    r0, v1 = right_value[:, :-1], value[:, 1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing = np.where(
+            r0 >= target_annual, s0,
+            np.where((v1 >= target_annual) & (v1 > r0), s0 + (target_annual - r0) * (s1 - s0) / (v1 - r0), np.inf)
+        )
+    at_vertex = np.where(value >= target_annual, salary, np.inf)
+    monthly_salary = np.minimum(crossing.min(axis=1), at_vertex.min(axis=1))
+    
+    base_salary = monthly_salary / (1 + ratio[:, 0])
+    performance_salary = base_salary * ratio[:, 0]
+    check = calculate_scenarios_batch(
+        base_salary, performance_salary, months[:, 0], multiplier[:, 0],
+        ss[:, 0], hf[:, 0], deductions[:, 0], include_perf[:, 0], tax_year,
+        None if city is None else city[:, 0]
+    )
+    
+    return pd.DataFrame({
+        '目标指标': target_metric,
+        '目标值': target_annual[:, 0] / TARGET_METRICS[target_metric],
+        '所需基本工资': base_salary,
+        '所需绩效工资': performance_salary,
+        '所需月度总工资': monthly_salary,
+        '年终奖金额': check['年终奖金额'],
+        '税后年收入': check['税后年收入'],
+        '月均到手(含年终奖)': check['月均到手(含年终奖)']
+    })
+
+@cached_result
+def solve_base_salary(target, performance_ratio, bonus_base_months, performance_multiplier,
+                      ss_base, hf_base, additional_deductions=0, include_performance_in_bonus=True,
+                      target_metric='月均到手(含年终奖)', tax_year=None, city=None):
+    """反推达到目标到手收入所需的最低基本工资，返回单行结果字典"""
+    return solve_base_salary_batch(
+        target, performance_ratio, bonus_base_months, performance_multiplier,
+        ss_base, hf_base, additional_deductions, include_performance_in_bonus, target_metric, tax_year, city
+    ).iloc[0].to_dict()
+
+# ---------------------- 累计预扣法月度工资表 ----------------------
+WITHHOLDING_MONTHS = np.arange(1, 13)
+
+def calculate_withholding_batch(base_salary, performance_salary, ss_base, hf_base, additional_deductions=0,
+                                bonus=0, bonus_month=12, tax_year=None, city=None):
+    """按累计预扣法计算每个员工全年 12 个月的预扣个税和实发工资 (员工 × 月份 二维数组一次算完)
+    
+    performance_salary 可为 (员工数, 12) 的逐月绩效，或每人一个值表示每月相同；其余参数每人一个值 (或标量)。
+    当月累计应预扣税额 = 累计应纳税所得额 × 预扣率 - 速算扣除数 (与综合所得年度税率表相同)，
+    累计税额低于已预扣税额时当月不退税，多预扣部分在年度汇算时退还。年终奖在 bonus_month 当月发放并单独计税。
+    返回 {指标: (员工数, 12) 数组}，全年工资个税和汇算应退税额为 (员工数,) 数组。
+    """
+    perf = np.asarray(performance_salary, dtype=float)
+    if perf.ndim < 2:
+        perf = np.repeat(np.atleast_1d(perf)[:, None], len(WITHHOLDING_MONTHS), axis=1)
+    base, ss, hf, deductions, bonus, bonus_month, _ = (
+        np.atleast_1d(v)[:, None] for v in np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (
+            base_salary, ss_base, hf_base, additional_deductions, bonus, bonus_month, np.zeros(np.shape(city))
+        )))
+    )
+    years = np.asarray(tax_year)[:, None] if _is_multi_year(tax_year) else tax_year
+    if city is not None and np.ndim(city) > 0:
+        city = np.asarray(city, dtype=object)[:, None]
+    
+    # 1. 逐月税前工资和社保公积金
+    gross = base + perf
+    monthly_ss, _, _ = calculate_social_security(gross, ss, hf, years, city)
+    
+    # 2. 累计应纳税所得额及累计应预扣税额 (已预扣部分不退，取累计最大值)
+    monthly_deduction = _rule_value('basic_deduction', years) / 12 + deductions
+    cumulative_taxable = np.maximum(0, np.cumsum(gross - monthly_ss - monthly_deduction, axis=1))
+    cumulative_tax = calculate_tax_salary(cumulative_taxable, years)
+    withheld = np.maximum.accumulate(cumulative_tax, axis=1)
+    monthly_tax = np.diff(withheld, axis=1, prepend=0.0)
+    
+    # 3. 年终奖单独计税，在发放月份计入
+    paid = WITHHOLDING_MONTHS == bonus_month
+    bonus_tax = np.where(bonus > 0, calculate_tax_bonus(bonus, years), 0.0)
+    bonus_paid = np.where(paid, bonus, 0.0)
+    bonus_tax_paid = np.where(paid, bonus_tax, 0.0)
+    
+    return {
+        '税前工资': gross,
+        '社保公积金': monthly_ss,
+        '累计应纳税所得额': cumulative_taxable,
+        '预扣率': calculate_marginal_rate(cumulative_taxable, years),
+        '累计已预扣税额': withheld,
+        '当月预扣个税': monthly_tax,
+        '年终奖': bonus_paid,
+        '年终奖个税': bonus_tax_paid,
+        '实发工资': gross - monthly_ss - monthly_tax + bonus_paid - bonus_tax_paid,
+        '全年工资个税': cumulative_tax[:, -1],
+        '汇算应退税额': withheld[:, -1] - cumulative_tax[:, -1]
+    }
+
+@cached_result
+def calculate_withholding_schedule(base_salary, performance_salary, ss_base, hf_base, additional_deductions=0,
+                                   bonus=0, bonus_month=12, tax_year=None, city=None):
+    """单个员工的累计预扣月度工资表，performance_salary 可为 12 个月的逐月绩效，返回每月一行的 DataFrame"""
+    performance = np.broadcast_to(np.asarray(performance_salary, dtype=float), WITHHOLDING_MONTHS.shape)
+    schedule = calculate_withholding_batch(
+        base_salary, performance[None, :], ss_base, hf_base, additional_deductions,
+        bonus, bonus_month, tax_year, city
+    )
+    return pd.DataFrame({
+        '月份': WITHHOLDING_MONTHS,
+        **{k: v[0] for k, v in schedule.items() if np.ndim(v) == 2}
+    })
+
+# ---------------------- 跨会话共享的预计算曲线 ----------------------
+# 常见配置 (各城市预设 × 常见年终奖月数/绩效系数，默认曲线上限) 的精确曲线在启动时后台预热，所有会话只读共享
+CURVE_SALARY_MIN = 5000
+CURVE_SALARY_MAX_OPTIONS = [50000, 100000, 200000, 500000, 1000000]
+DEFAULT_CUSTOM_BASES = (4775, 2520)  # 自定义模式下社保、公积金基数的默认值
+SHARED_CURVE_BONUS_MONTHS = (0.0, 1.0, 2.0, 3.0)
+SHARED_CURVE_MULTIPLIERS = (1.0, 1.2, 1.5, 2.0)
+SHARED_CURVE_DEFAULT = {'bonus_months': 1.0, 'multiplier': 1.5, 'salary_max': 100000}
+
+def _shared_curve_key(base_salary, performance_salary, bonus_base_months, performance_multiplier,
+                      ss_base, hf_base, additional_deductions, include_performance_in_bonus,
+                      salary_min, salary_max, tax_year=None, city=None):
+    """曲线只通过"年终奖/月薪"比例依赖工资结构，按该比例而非具体工资建键，任意月薪都能命中"""
+    unit_base, _ = _split_monthly_salary(base_salary, performance_salary, 1.0)
+    bonus_per_salary = (1.0 if include_performance_in_bonus else unit_base) * bonus_base_months * performance_multiplier
+    return _canonical_param((
+        bonus_per_salary, ss_base, hf_base, additional_deductions, salary_min, salary_max,
+        DEFAULT_TAX_YEAR if tax_year is None else tax_year, city
+    ))
+
+def _shared_curve_configs():
+    """预热的配置列表，默认页面 (自定义基数、默认年终奖、默认曲线上限) 排在最前"""
+    bases = [(*DEFAULT_CUSTOM_BASES, None)]
+    for name, rule in CITY_RULES['by_city'].items():
+        bases.append((rule['ss_floor'], rule['hf_floor'], name))
+        bases.append((rule['ss_ceiling'], rule['hf_ceiling'], name))
+    bonus_per_salary = sorted({m * k for m in SHARED_CURVE_BONUS_MONTHS for k in SHARED_CURVE_MULTIPLIERS})
+    default_bonus = SHARED_CURVE_DEFAULT['bonus_months'] * SHARED_CURVE_DEFAULT['multiplier']
+    configs = [
+        (bonus, ss_base, hf_base, city, SHARED_CURVE_DEFAULT['salary_max'])
+        for ss_base, hf_base, city in bases
+        for bonus in bonus_per_salary
+    ]
+    configs.sort(key=lambda c: (c[0] != default_bonus, c[3] is not None))
+    return configs
+
+class SharedCurveStore:
+    """只读的预计算曲线库：后台线程逐个填充，读取时返回共享只读数组上的零拷贝 DataFrame
+    
+    某个配置计算失败时记入失败数并跳过，继续预热其余配置；查询该配置时退回精确曲线计算。
+    """
+    
+    def __init__(self, configs):
+        self._configs = configs
+        self._curves = {}  # key -> {列名: 只读数组}
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failed = 0
+        self.warm_seconds = None
+    
+    def _build(self, bonus_per_salary, ss_base, hf_base, city, salary_max):
+        key = _shared_curve_key(1.0, 0.0, bonus_per_salary, 1.0, ss_base, hf_base, 0, True,
+                                CURVE_SALARY_MIN, salary_max, None, city)
+        # 部署重启后从磁盘缓存读取，无需重新计算
+        data = get_disk_cache().get_or_compute(('SharedCurveStore',) + key, lambda: generate_comprehensive_data.uncached(
+            1.0, 0.0, bonus_per_salary, 1.0, ss_base, hf_base, 0, True,
+            salary_min=CURVE_SALARY_MIN, salary_max=salary_max, exact=True, city=city
+        ))
+        columns = {}
+        for name in data.columns:
+            values = data[name].to_numpy(copy=True)
+            values.flags.writeable = False
+            columns[name] = values
+        self.nbytes += sum(v.nbytes for v in columns.values())
+        self._curves[key] = columns  # 单次字典赋值，读线程看到的要么是完整曲线要么没有
+    
+    def _try_build(self, config):
+        try:
+            self._build(*config)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+    
+    def warm(self, background=True):
+        """同步算好默认页面的曲线，其余配置交给后台守护线程"""
+        started = time.perf_counter()
+        self._try_build(self._configs[0])
+        
+        def run():
+            for config in self._configs[1:]:
+                self._try_build(config)
+            self.warm_seconds = time.perf_counter() - started
+        
+        if background:
+            threading.Thread(target=run, name='shared-curve-warmup', daemon=True).start()
+        else:
+            run()
+        return self
+    
+    def get(self, key):
+        columns = self._curves.get(key)
+        with self._lock:
+            if columns is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pd.DataFrame(columns, copy=False)
+    
+    def stats(self):
+        return {
+            '已就绪': len(self._curves),
+            '总数': len(self._configs),
+            '占用(MB)': self.nbytes / 2**20,
+            '命中': self.hits,
+            '未命中': self.misses,
+            '失败': self.failed,
+            '预热耗时(秒)': self.warm_seconds
+        }
+
+@cache_resource
+def get_shared_curve_store():
+    """进程级预计算曲线库，首次访问时启动后台预热"""
+    store = SharedCurveStore(_shared_curve_configs())
+    METRICS.register_collector(cache_metrics_collector('shared_curve', store))
+    return store.warm()
+
+
+def lookup_comprehensive_data(base_salary, performance_salary, bonus_base_months, performance_multiplier,
+                              ss_base, hf_base, additional_deductions=0, include_performance_in_bonus=True,
+                              salary_min=CURVE_SALARY_MIN, salary_max=100000, tax_year=None, city=None):
+    """优先读取共享预计算曲线 (只读，不要原地修改)，未预热的配置退回到缓存的精确曲线计算"""
+    shared = get_shared_curve_store().get(_shared_curve_key(
+        base_salary, performance_salary, bonus_base_months, performance_multiplier,
+        ss_base, hf_base, additional_deductions, include_performance_in_bonus,
+        salary_min, salary_max, tax_year, city
+    ))
+    if shared is not None:
+        return shared
+    return generate_comprehensive_data(
+        base_salary, performance_salary, bonus_base_months, performance_multiplier,
+        ss_base, hf_base, additional_deductions, include_performance_in_bonus,
+        salary_min=salary_min, salary_max=salary_max, exact=True, tax_year=tax_year, city=city
+    )
+
+# ---------------------- 相邻参数预取 ----------------------
+# 用户通常一步一步地拖动控件：页面运行结束后，在后台线程池里把最近操作过的控件前后 1~2 步的综合曲线算好，
+# 写入结果缓存，下一次操作大多直接命中内存。每个会话排队的任务数有上限，新一轮预取会取消该会话上一轮还没开始的任务
+PREFETCH_WORKERS = int(os.environ.get('SALARY_PREFETCH_WORKERS', 2))  # 设为 0 关闭预取
+PREFETCH_MAX_TASKS = int(os.environ.get('SALARY_PREFETCH_MAX_TASKS', 8))
+PREFETCH_STEPS = 2
+
+def neighbour_values(value, step, lower, upper, steps=PREFETCH_STEPS):
+    """value 前后 1~steps 步的取值，近的在前，超出 [lower, upper] 的跳过
+
+    按步长的小数位数取整 (如 1.2 + 0.1 得 1.3 而不是 1.3000000000000003)，与控件返回的值命中同一缓存条目。
+    """
+    decimals = len(f'{step:.10f}'.rstrip('0').partition('.')[2])
+    values = []
+    for distance in range(1, steps + 1):
+        for sign in (1, -1):
+            candidate = round(value + sign * distance * step, decimals)
+            if lower <= candidate <= upper:
+                values.append(candidate)
+    return values
+
+def neighbour_scenarios(inputs, controls, recent_controls, steps=PREFETCH_STEPS):
+    """最近操作过的控件各自前后 1~steps 步的参数组合 (每次只改一个控件)
+
+    controls 为 {参数名: (步长, 下限, 上限)}，recent_controls 按最近操作在前排序；
+    各控件的邻近取值交替排列，距离当前值近的、最近操作的排在前面。
+    """
+    per_control = [
+        [{**inputs, name: value} for value in neighbour_values(inputs[name], *controls[name], steps=steps)]
+        for name in recent_controls
+    ]
+    return [scenario for scenario in chain.from_iterable(zip_longest(*per_control)) if scenario is not None]
+
+def prefetch_scenario(inputs, salary_min=CURVE_SALARY_MIN, salary_max=100000):
+    """计算一组参数的综合曲线，只为写入结果缓存 (单方案结果只需几微秒，不缓存也不预取)"""
+    lookup_comprehensive_data(**inputs, salary_min=salary_min, salary_max=salary_max)
+
+class Prefetcher:
+    """按会话管理的后台预取：任务只把结果写进缓存，不返回给页面
+
+    每个会话同时排队的任务不超过 max_tasks；同一会话提交新一轮时，上一轮还没开始的任务被取消，
+    正在执行的任务看到取消标志后不再开始。
+    """
+    
+    def __init__(self, workers=PREFETCH_WORKERS, max_tasks=PREFETCH_MAX_TASKS):
+        self.max_tasks = max_tasks
+        self._executor = (ThreadPoolExecutor(workers, thread_name_prefix='salary-prefetch')
+                          if workers > 0 else None)
+        self._lock = threading.Lock()
+        self._sessions = {}  # 会话 -> (取消标志, [future])
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+    
+    @property
+    def enabled(self):
+        return self._executor is not None
+    
+    def _run(self, cancel_event, func, args):
+        if cancel_event.is_set():
+            outcome = 'cancelled'
+        else:
+            try:
+                func(*args)
+                outcome = 'completed'
+            except Exception:
+                outcome = 'failed'
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+        PREFETCH_TASKS.inc(outcome=outcome)
+    
+    def schedule(self, session, func, args_list):
+        """取消该会话上一轮预取，再提交 func(*args) 任务 (按优先级排好序，超出上限的部分丢弃)，返回提交的任务数"""
+        self.cancel(session)
+        if self._executor is None or not args_list:
+            return 0
+        
+        cancel_event = threading.Event()
+        futures = [self._executor.submit(self._run, cancel_event, func, args) for args in args_list[:self.max_tasks]]
+        with self._lock:
+            # 顺带清理已全部完成的会话 (会话关闭后不会再来取消)
+            for finished in [key for key, (_, pending) in self._sessions.items() if all(f.done() for f in pending)]:
+                del self._sessions[finished]
+            self._sessions[session] = (cancel_event, futures)
+            self.submitted += len(futures)
+        return len(futures)
+    
+    def cancel(self, session):
+        """取消会话的预取：还没开始的任务直接取消，返回取消的任务数"""
+        with self._lock:
+            entry = self._sessions.pop(session, None)
+        if entry is None:
+            return 0
+        cancel_event, futures = entry
+        cancel_event.set()
+        cancelled = sum(future.cancel() for future in futures)
+        if cancelled:
+            with self._lock:
+                self.cancelled += cancelled
+            PREFETCH_TASKS.inc(cancelled, outcome='cancelled')
+        return cancelled
+    
+    def pending(self, session):
+        with self._lock:
+            entry = self._sessions.get(session)
+        return 0 if entry is None else sum(not future.done() for future in entry[1])
+    
+    def stats(self):
+        with self._lock:
+            return {
+                '启用': self.enabled,
+                '提交': self.submitted,
+                '完成': self.completed,
+                '取消': self.cancelled,
+                '失败': self.failed
+            }
+
+@cache_resource
+def get_prefetcher():
+    """进程级预取线程池，所有会话共享"""
+    return Prefetcher()
+
+IMPORT_TIMES['salary_core'] = (time.perf_counter() - _IMPORT_STARTED) * 1000
@@ -0,0 +1,295 @@
+"""salary_app.py 的收入分析图表 (2×2 matplotlib 图) 的服务端渲染与缓存
+
+三个曲线面板 (税后收入、收入转化率、边际税率) 只取决于年终奖月数、社保/公积金基数、专项附加扣除和城市，
+横轴固定覆盖整个月薪滑块范围，按这些参数渲染一次后缓存像素；每次页面运行只重画随当前月薪变化的部分：
+三条红色虚线直接画在缓存的像素上，收入构成饼图只在右下角大小的画布上渲染后贴进去。
+
+matplotlib 渲染在进程池中执行 (只用面向对象 API，不碰 pyplot 的全局状态)，多个用户同时操作时不会
+排队等同一个 matplotlib；SALARY_FIGURE_WORKERS=0 时在调用线程内渲染。
+"""
+import io
+import os
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from salary_core import cache_resource, calculate_scenarios_batch
+
+FIGURE_WORKERS = int(os.environ.get('SALARY_FIGURE_WORKERS', min(2, os.cpu_count() or 1)))
+FIGURE_CACHE_SIZE = int(os.environ.get('SALARY_FIGURE_CACHE_SIZE', 8))  # 缓存的静态面板数 (每个约 4 MB)
+FIGURE_DPI = int(os.environ.get('SALARY_FIGURE_DPI', 100))
+FIGURE_SIZE = (14, 10)
+CURVE_SALARY_RANGE = np.arange(5000, 100001, 1000)  # 与 salary_app 的月薪滑块范围一致，当前月薪总在横轴内
+CHART_FONTS = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
+
+# 当前月薪红色虚线的样式，与 axvline(color='r', linestyle='--', alpha=0.7) 的默认线宽和虚线间隔一致 (单位：磅)
+MARKER_COLOR = np.array([255, 0, 0])
+MARKER_ALPHA = 0.7
+MARKER_WIDTH_PT = 1.5
+MARKER_DASH_PT = (5.55, 2.4)
+
+PIE_LABELS = ['税后收入', '个人所得税', '社保公积金']
+PIE_COLORS = ['#4CAF50', '#F44336', '#2196F3']
+
+# ---------------------- 渲染 (在工作进程中执行) ----------------------
+def _init_worker():
+    """渲染进程的 initializer：启动后先导入 matplotlib，第一张图不用再等导入"""
+    import matplotlib.figure
+    import matplotlib.backends.backend_agg
+
+def _new_figure(dpi):
+    """新建不经过 pyplot 的 Figure (matplotlib 在这里才导入)，设置中文字体，防止图表乱码"""
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    matplotlib.rcParams['font.sans-serif'] = CHART_FONTS
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    fig = Figure(figsize=FIGURE_SIZE, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+def _canvas_rgb(fig):
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+
+def render_static_panels(bonus_months, ss_base, hf_base, additional_deductions, city, dpi=FIGURE_DPI):
+    """渲染不含当前月薪标记的三个曲线面板，右下角只留饼图标题
+
+    返回像素 (RGB) 以及叠加动态内容所需的几何信息：各面板的横轴范围和像素位置、饼图所在区域。
+    """
+    curves = calculate_scenarios_batch(
+        CURVE_SALARY_RANGE, 0, bonus_months, 1.0, ss_base, hf_base, additional_deductions, True, city=city
+    )
+    fig = _new_figure(dpi)
+    axes = fig.subplots(2, 2)
+
+    # 1. 税后收入曲线 (图例中的当前月薪用不画出来的代理线)
+    ax = axes[0, 0]
+    ax.plot(CURVE_SALARY_RANGE, curves['税后年收入'], 'b-', linewidth=2.5)
+    ax.plot([], [], color='r', linestyle='--', alpha=MARKER_ALPHA, label='当前月薪')
+    ax.set_xlabel('月薪 (元)', fontsize=12)
+    ax.set_ylabel('税后年收入 (元)', fontsize=12)
+    ax.set_title('税后收入 vs 月薪', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    # 2. 收入转化率曲线
+    ax = axes[0, 1]
+    ax.plot(CURVE_SALARY_RANGE, curves['收入转化率'], 'g-', linewidth=2.5)
+    ax.set_xlabel('月薪 (元)', fontsize=12)
+    ax.set_ylabel('收入转化率 (税后/税前)', fontsize=12)
+    ax.set_title('收入转化率 vs 月薪', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    # 高月薪、多月年终奖时转化率可低于 0.7，下限按 0.05 取整放宽
+    ax.set_ylim(min(0.7, np.floor(curves['收入转化率'].min() * 20) / 20), 1.0)
+
+    # 3. 边际税率阶梯图
+    ax = axes[1, 0]
+    ax.step(CURVE_SALARY_RANGE, curves['边际税率'], where='post', linewidth=2.5)
+    ax.set_xlabel('月薪 (元)', fontsize=12)
+    ax.set_ylabel('边际税率', fontsize=12)
+    ax.set_title('边际税率阶梯变化', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    ax.set_ylim(0, 0.5)
+
+    curve_axes = [axes[0, 0], axes[0, 1], axes[1, 0]]
+
+    # 4. 收入构成饼图的位置 (饼图随当前月薪变化，每次单独渲染)
+    pie_ax = axes[1, 1]
+    pie_ax.set_title('年收入构成分析', fontsize=14, fontweight='bold')
+    pie_ax.axis('off')
+
+    fig.tight_layout()
+    image = _canvas_rgb(fig)
+    height = image.shape[0]
+    renderer = fig.canvas.get_renderer()
+    panels = [{
+        'xlim': ax.get_xlim(),
+        'cols': (ax.bbox.x0, ax.bbox.x1),
+        'rows': (height - ax.bbox.y1, height - ax.bbox.y0)
+    } for ax in curve_axes]
+    pie_region = (
+        int(np.ceil(height - pie_ax.title.get_window_extent(renderer).y0)),
+        int(np.ceil(axes[1, 0].get_tightbbox(renderer).x1))
+    )
+    return {
+        'image': image,
+        'panels': panels,
+        'pie_region': pie_region,
+        'pie_position': tuple(pie_ax.get_position().bounds)
+    }
+
+def render_pie_panel(sizes, pie_position, pie_region, dpi=FIGURE_DPI):
+    """在与静态面板相同的位置渲染收入构成饼图，返回右下角区域的像素 (RGB)
+
+    画布只取右下角区域的大小 (按整像素平移坐标轴)，不再绘制和拷贝整张图。
+    """
+    top, left = pie_region
+    width, height = FIGURE_SIZE[0] * dpi, FIGURE_SIZE[1] * dpi
+    region_width, region_height = width - left, height - top
+    fig = _new_figure(dpi)
+    fig.set_size_inches(region_width / dpi, region_height / dpi)
+    x0, y0, w, h = pie_position
+    ax = fig.add_axes((
+        (x0 * width - left) / region_width, y0 * height / region_height,
+        w * width / region_width, h * height / region_height
+    ))
+    # 只显示正值的部分
+    if sum(sizes) > 0:
+        ax.pie([s for s in sizes if s > 0],
+               labels=[PIE_LABELS[i] for i, s in enumerate(sizes) if s > 0],
+               colors=PIE_COLORS[:sum(1 for s in sizes if s > 0)],
+               autopct='%1.1f%%', startangle=90)
+    else:
+        ax.axis('off')
+        ax.text(0.5, 0.5, '无数据', ha='center', va='center', fontsize=16)
+    return _canvas_rgb(fig)
+
+# ---------------------- 合成 (在调用线程中执行) ----------------------
+def _draw_marker(image, panel, salary, dpi):
+    """在面板的像素上画当前月薪的红色竖虚线 (自下而上，与 axvline 的虚线起点一致)"""
+    (x0, x1), (col0, col1), (row_top, row_bottom) = panel['xlim'], panel['cols'], panel['rows']
+    col = col0 + (salary - x0) / (x1 - x0) * (col1 - col0)
+    if not col0 <= col <= col1:
+        return
+
+    px_per_pt = dpi / 72
+    width = max(1, round(MARKER_WIDTH_PT * px_per_pt))
+    dash_on, dash_off = (max(1, round(length * px_per_pt)) for length in MARKER_DASH_PT)
+    cols = slice(max(int(round(col - width / 2)), 0), min(int(round(col - width / 2)) + width, image.shape[1]))
+    rows = np.arange(int(round(row_bottom)) - 1, int(round(row_top)) - 1, -1)
+    rows = rows[np.arange(len(rows)) % (dash_on + dash_off) < dash_on]
+    blended = image[rows, cols] * (1 - MARKER_ALPHA) + MARKER_COLOR * MARKER_ALPHA
+    image[rows, cols] = blended.astype(np.uint8)
+
+def compose_figure(static, pie, monthly_salary, dpi=FIGURE_DPI):
+    """静态面板 + 当前月薪标记 + 饼图，编码为 PNG"""
+    from PIL import Image
+
+    image = static['image'].copy()
+    for panel in static['panels']:
+        _draw_marker(image, panel, monthly_salary, dpi)
+    top, left = static['pie_region']
+    image[top:, left:] = pie
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+# ---------------------- 渲染调度与缓存 ----------------------
+def start_render_pool(workers):
+    """启动 workers 个渲染进程 (spawn 方式，Windows/Linux/macOS 一致)
+
+    spawn 的子进程会以 __mp_main__ 的名字导入主脚本，页面脚本需把页面代码放在 if __name__ == '__main__' 下
+    (见 salary_app.main)。这里立即启动全部进程，之后提交任务都有空闲进程，不会在渲染时才等进程启动。
+    """
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker)
+    for _ in range(workers):
+        executor.submit(os.getpid)
+    return executor
+
+class FigureRenderer:
+    """进程级的图表渲染器：静态面板和饼图按参数缓存 (LRU)，未命中时提交到进程池渲染
+
+    多个会话同时请求同一张未缓存的面板时只渲染一次，其余等待同一个结果。
+    """
+
+    def __init__(self, workers=FIGURE_WORKERS, cache_size=FIGURE_CACHE_SIZE, dpi=FIGURE_DPI):
+        self.dpi = dpi
+        self.cache_size = cache_size
+        self.workers = workers
+        self._executor = start_render_pool(workers) if workers > 0 else None
+        self._inline_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._static = OrderedDict()
+        self._pies = OrderedDict()
+        self._pending = {}
+        self.hits = 0
+        self.renders = 0
+        self.pool_restarts = 0
+
+    def _run(self, func, *args):
+        """在进程池中渲染；进程池不可用 (某个渲染进程意外退出) 时重建进程池，本次在当前进程内渲染"""
+        executor = self._executor
+        if executor is not None:
+            try:
+                return executor.submit(func, *args).result()
+            except BrokenProcessPool:
+                self._restart_pool(executor)
+        with self._inline_lock:
+            return func(*args)
+
+    def _restart_pool(self, broken):
+        # 多个会话同时发现同一个进程池损坏时只重建一次
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self.pool_restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        executor = start_render_pool(self.workers)
+        with self._lock:
+            self._executor = executor
+
+    def _cached(self, cache, capacity, key, func, *args):
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                self.hits += 1
+                return cache[key]
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+                self.renders += 1
+        if not owner:
+            return future.result()
+
+        try:
+            value = self._run(func, *args)
+        except BaseException as exc:
+            with self._lock:
+                self._pending.pop(key, None)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            cache[key] = value
+            while len(cache) > capacity:
+                cache.popitem(last=False)
+            self._pending.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def render(self, monthly_salary, bonus_months, ss_base, hf_base, additional_deductions, city, pie_sizes):
+        """当前方案的 2×2 收入分析图 (PNG 字节)
+
+        静态面板的键不含月薪，拖动月薪滑块只重画标记和饼图；饼图按构成和所在位置缓存，与其他参数无关。
+        """
+        static_key = ('static', float(bonus_months), float(ss_base), float(hf_base), float(additional_deductions), city)
+        static = self._cached(self._static, self.cache_size, static_key, render_static_panels,
+                              bonus_months, ss_base, hf_base, additional_deductions, city, self.dpi)
+        pie_sizes = tuple(round(float(s), 2) for s in pie_sizes)
+        pie_key = ('pie', pie_sizes, static['pie_position'], static['pie_region'])
+        pie = self._cached(self._pies, 4 * self.cache_size, pie_key, render_pie_panel,
+                           pie_sizes, static['pie_position'], static['pie_region'], self.dpi)
+        return compose_figure(static, pie, monthly_salary, self.dpi)
+
+    def stats(self):
+        with self._lock:
+            return {
+                '命中': self.hits,
+                '渲染': self.renders,
+                '静态面板': len(self._static),
+                '进程数': self._executor._max_workers if self._executor is not None else 0,
+                '进程池重建': self.pool_restarts
+            }
+
+@cache_resource
+def get_figure_renderer():
+    """进程级图表渲染器 (所有会话共用进程池和缓存)"""
+    return FigureRenderer()
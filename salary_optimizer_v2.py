@@ -1,13 +1,34 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime
 import json
 import io
+import os
+import copy
+import time
+import uuid
+import pickle
+import inspect
+import functools
+import tracemalloc
+from contextlib import contextmanager
 from collections import deque
 
+from salary_core import (
+    CITY_RULES, CURVE_SALARY_MAX_OPTIONS, CURVE_SALARY_MIN, DEFAULT_CUSTOM_BASES, RESULT_CACHE,
+    SHARED_CURVE_DEFAULT, TARGET_METRICS, WITHHOLDING_MONTHS, FIGURE_BUILD_SECONDS, RERUN_SECONDS, LazyModule,
+    _canonical_param, _estimate_nbytes, calculate_bonus_dead_zones, calculate_one_scenario, calculate_tax_bonus,
+    calculate_withholding_schedule, check_bonus_dead_zone, export_metrics, get_city_rules, get_disk_cache,
+    get_prefetcher, get_shared_curve_store, lookup_comprehensive_data, neighbour_scenarios, optimize_package_split,
+    prefetch_scenario, print_import_report, resolve_contribution_rates, solve_base_salary
+)
+from salary_chart_spec import FigureSpec, trace_spec
+
+# pandas 和 plotly.express 导入较慢，第一次用到时才导入：标题和侧边栏先渲染，
+# plotly.express 只在收入构成、边际税率、月度明细这几个标签页打开时才需要
+pd = LazyModule('pandas')
+px = LazyModule('plotly.express')
+
 # 设置页面配置
 st.set_page_config(
     page_title="薪资结构优化分析系统 v2.0",
@@ -16,178 +37,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# ---------------------- 核心计算函数 ----------------------
-def calculate_tax_salary(taxable_income):
-    """计算综合所得个税"""
-    if taxable_income <= 36000:
-        return taxable_income * 0.03
-    elif taxable_income <= 144000:
-        return taxable_income * 0.10 - 2520
-    elif taxable_income <= 300000:
-        return taxable_income * 0.20 - 16920
-    elif taxable_income <= 420000:
-        return taxable_income * 0.25 - 31920
-    elif taxable_income <= 660000:
-        return taxable_income * 0.30 - 52920
-    elif taxable_income <= 960000:
-        return taxable_income * 0.35 - 85920
-    else:
-        return taxable_income * 0.45 - 181920
-
-def calculate_tax_bonus(bonus):
-    """计算年终奖个税 (单独计税)"""
-    avg_monthly = bonus / 12
-    if avg_monthly <= 3000:
-        return bonus * 0.03
-    elif avg_monthly <= 12000:
-        return bonus * 0.10 - 210
-    elif avg_monthly <= 25000:
-        return bonus * 0.20 - 1410
-    elif avg_monthly <= 35000:
-        return bonus * 0.25 - 2660
-    elif avg_monthly <= 55000:
-        return bonus * 0.30 - 4410
-    elif avg_monthly <= 80000:
-        return bonus * 0.35 - 7160
-    else:
-        return bonus * 0.45 - 15160
-
-def calculate_social_security(monthly_salary, ss_base, hf_base):
-    """计算社保公积金 (养老保险8%，医疗保险2%，失业保险0.2%，公积金5%)"""
-    pension = min(ss_base, monthly_salary) * 0.08
-    medical = min(ss_base, monthly_salary) * 0.02
-    unemployment = min(ss_base, monthly_salary) * 0.002
-    
-    # 如果公积金基数为0，则不计入公积金
-    if hf_base > 0:
-        housing_fund = min(hf_base, monthly_salary) * 0.05
-    else:
-        housing_fund = 0
-    
-    monthly_ss = pension + medical + unemployment + housing_fund
-    annual_ss = monthly_ss * 12
-    
-    return monthly_ss, annual_ss, {
-        '养老保险': pension,
-        '医疗保险': medical,
-        '失业保险': unemployment,
-        '公积金': housing_fund
-    }
-
-def calculate_one_scenario(base_salary, performance_salary, bonus_base_months, 
-                          performance_multiplier, ss_base, hf_base, 
-                          additional_deductions=0, include_performance_in_bonus=True):
-    """计算单一薪资方案的结果"""
-    # 1. 计算月度和年度薪资
-    monthly_salary = base_salary + performance_salary
-    annual_salary = monthly_salary * 12
-    
-    # 2. 计算年终奖基数（根据选择决定是否包含绩效工资）
-    if include_performance_in_bonus:
-        bonus_base = base_salary + performance_salary  # 包含绩效工资
-        bonus_calculation_method = "基本工资 + 绩效工资"
-    else:
-        bonus_base = base_salary  # 只包含基本工资
-        bonus_calculation_method = "仅基本工资"
-    
-    # 计算年终奖 (基本月数 × 绩效系数 × 年终奖基数)
-    bonus = bonus_base * bonus_base_months * performance_multiplier
-    
-    # 3. 计算社保公积金
-    monthly_ss, annual_ss, ss_breakdown = calculate_social_security(monthly_salary, ss_base, hf_base)
-    
-    # 4. 计算年收入和应纳税所得额
-    total_income = annual_salary + bonus
-    taxable_income = max(0, annual_salary - 60000 - annual_ss - additional_deductions*12)
-    
-    # 5. 计算个税
-    salary_tax = calculate_tax_salary(taxable_income)
-    bonus_tax = calculate_tax_bonus(bonus) if bonus > 0 else 0
-    total_tax = salary_tax + bonus_tax
-    
-    # 6. 计算税后收入及关键指标
-    after_tax_income = total_income - annual_ss - total_tax
-    conversion_rate = after_tax_income / total_income if total_income > 0 else 0
-    
-    # 7. 确定边际税率
-    marginal_rate = 0.03
-    if taxable_income > 960000:
-        marginal_rate = 0.45
-    elif taxable_income > 660000:
-        marginal_rate = 0.35
-    elif taxable_income > 420000:
-        marginal_rate = 0.30
-    elif taxable_income > 300000:
-        marginal_rate = 0.25
-    elif taxable_income > 144000:
-        marginal_rate = 0.20
-    elif taxable_income > 36000:
-        marginal_rate = 0.10
-    
-    # 8. 计算不同口径的月均收入
-    monthly_without_bonus = (annual_salary - annual_ss - salary_tax) / 12
-    monthly_with_bonus = after_tax_income / 12
-    
-    return {
-        '基本工资': base_salary,
-        '绩效工资': performance_salary,
-        '月度总工资': monthly_salary,
-        '年终奖月数': bonus_base_months,
-        '绩效系数': performance_multiplier,
-        '年终奖基数': bonus_base,
-        '年终奖金额': bonus,
-        '税前年收入': total_income,
-        '社保公积金(年)': annual_ss,
-        '社保公积金详情': ss_breakdown,
-        '个人所得税': total_tax,
-        '税后年收入': after_tax_income,
-        '收入转化率': conversion_rate,
-        '边际税率': marginal_rate,
-        '月均到手(不含年终奖)': monthly_without_bonus,
-        '月均到手(含年终奖)': monthly_with_bonus,
-        '年度社保公积金': annual_ss,
-        '年度个税': total_tax,
-        '年终奖计算方式': bonus_calculation_method,
-        '年终奖包含绩效工资': include_performance_in_bonus
-    }
-
-def generate_comprehensive_data(base_salary, performance_salary, bonus_base_months, 
-                               performance_multiplier, ss_base, hf_base, 
-                               additional_deductions=0, include_performance_in_bonus=True):
-    """生成综合对比数据"""
-    salary_range = np.arange(5000, 100001, 500)
-    
-    data = {
-        '月薪': [],
-        '税后年收入': [],
-        '收入转化率': [],
-        '边际税率': [],
-        '月度个税': [],
-        '月度社保公积金': [],
-        '税前月收入': []
-    }
-    
-    for s in salary_range:
-        # 保持绩效工资比例不变，调整基本工资
-        current_base = base_salary * (s / (base_salary + performance_salary)) if (base_salary + performance_salary) > 0 else s/2
-        current_perf = performance_salary * (s / (base_salary + performance_salary)) if (base_salary + performance_salary) > 0 else s/2
-        
-        result = calculate_one_scenario(
-            current_base, current_perf, bonus_base_months, 
-            performance_multiplier, ss_base, hf_base, additional_deductions,
-            include_performance_in_bonus
-        )
-        
-        data['月薪'].append(s)
-        data['税后年收入'].append(result['税后年收入'])
-        data['收入转化率'].append(result['收入转化率'])
-        data['边际税率'].append(result['边际税率'])
-        data['月度个税'].append(result['个人所得税'] / 12)
-        data['月度社保公积金'].append(result['社保公积金(年)'] / 12)
-        data['税前月收入'].append(s)
-    
-    return pd.DataFrame(data)
-
 # ---------------------- 图表主题配置 ----------------------
 def get_chart_theme(theme_name):
     """获取图表主题配置"""
@@ -327,6 +176,26 @@ def rgba_from_hex(hex_color, alpha=0.1):
     except:
         return f"rgba(0, 0, 0, {alpha})"
 
+# ---------------------- 轻量图表 ----------------------
+# 轻量模式下曲线用 WebGL 绘制，并按每个图的点数预算抽稀，减少每次交互传给浏览器的数据和绘制时间
+FIGURE_POINT_BUDGET = int(os.environ.get('SALARY_FIGURE_POINT_BUDGET', 2000))
+
+def downsample_curve(data, columns, budget=FIGURE_POINT_BUDGET):
+    """按点数预算抽稀曲线：每个分桶保留各列的最大/最小值点，首尾点始终保留，跳档和峰谷不会丢失"""
+    if len(data) <= budget:
+        return data
+    
+    values = data[list(columns)].to_numpy(dtype=float)
+    keep = {0, len(data) - 1}
+    for bucket in np.array_split(np.arange(len(data)), max(budget // (2 * len(columns)), 1)):
+        keep.update(bucket[np.nanargmin(values[bucket], axis=0)])
+        keep.update(bucket[np.nanargmax(values[bucket], axis=0)])
+    return data.iloc[sorted(keep)]
+
+def scatter_trace(lightweight, **kwargs):
+    """折线轨迹：轻量模式用 WebGL (scattergl)，否则用 SVG (scatter)"""
+    return trace_spec('scattergl' if lightweight else 'scatter', **kwargs)
+
 # ---------------------- 初始化session state ----------------------
 if 'salary_history' not in st.session_state:
     st.session_state.salary_history = []
@@ -358,6 +227,173 @@ def calculate_change_rate(current_value, previous_value):
         return 0
     return ((current_value - previous_value) / previous_value) * 100
 
+def build_history_frames(salary_history):
+    """由历史记录生成趋势数据表和相邻两次的变化率表"""
+    history_df = pd.DataFrame([
+        {
+            '调整序号': f"第{item['id']}次",
+            '记录时间': item['timestamp'],
+            '月度总工资(元)': item['results']['月度总工资'],
+            '年度总工资(元)': item['results']['税前年收入'],
+            '税前月均工资(元)': item['results']['月度总工资'],
+            '税后月均工资(元)': item['results']['月均到手(含年终奖)'],
+            '收入转化率(%)': item['results']['收入转化率'] * 100,
+            '年终奖计算方式': item['results']['年终奖计算方式'],
+            '年终奖包含绩效工资': item['results']['年终奖包含绩效工资']
+        }
+        for item in salary_history
+    ])
+    
+    # 计算变化率 (记录不足2次时为 None)
+    change_df = None
+    if len(history_df) > 1:
+        change_rates = []
+        for i in range(len(history_df)):
+            if i == 0:
+                change_rates.append({
+                    '调整序号': f"第{i+1}次",
+                    '月度总工资变化率(%)': 0,
+                    '年度总工资变化率(%)': 0,
+                    '税前月均变化率(%)': 0,
+                    '税后月均变化率(%)': 0,
+                    '收入转化率变化(百分点)': 0
+                })
+            else:
+                prev_row = history_df.iloc[i-1]
+                curr_row = history_df.iloc[i]
+                
+                change_rates.append({
+                    '调整序号': f"第{i+1}次",
+                    '月度总工资变化率(%)': calculate_change_rate(curr_row['月度总工资(元)'], prev_row['月度总工资(元)']),
+                    '年度总工资变化率(%)': calculate_change_rate(curr_row['年度总工资(元)'], prev_row['年度总工资(元)']),
+                    '税前月均变化率(%)': calculate_change_rate(curr_row['税前月均工资(元)'], prev_row['税前月均工资(元)']),
+                    '税后月均变化率(%)': calculate_change_rate(curr_row['税后月均工资(元)'], prev_row['税后月均工资(元)']),
+                    '收入转化率变化(百分点)': curr_row['收入转化率(%)'] - prev_row['收入转化率(%)']
+                })
+        
+        change_df = pd.DataFrame(change_rates)
+    
+    return history_df, change_df
+
+# ---------------------- 性能诊断 ----------------------
+# 可选的诊断面板：URL 加 ?perf=1 或打开侧边栏"显示性能诊断"后，页面底部列出本次运行各部分的用时、
+# tracemalloc 内存峰值和 session_state 大小，用户反馈"页面卡"时不用挂 profiler 就能找到热点
+PERF_QUERY_PARAM = 'perf'
+QUERY_PARAMS_SUPPORTED = hasattr(st, 'query_params')
+
+perf_panel_enabled = bool(
+    st.session_state.get('show_perf_panel')
+    or (QUERY_PARAMS_SUPPORTED and st.query_params.get(PERF_QUERY_PARAM) in ('1', 'true', 'on'))
+)
+perf_run_started = time.perf_counter()
+st.session_state.perf_log = []
+_perf_depth = 0
+# tracemalloc 是进程级的：已在跟踪 (其他会话打开了诊断) 时只重置峰值，由本次运行开启的在面板显示后关闭
+_perf_started_tracing = perf_panel_enabled and not tracemalloc.is_tracing()
+if _perf_started_tracing:
+    tracemalloc.start()
+elif perf_panel_enabled:
+    tracemalloc.reset_peak()
+
+def _record_perf(section, elapsed, note=''):
+    """把一段代码的用时记入诊断日志 (诊断面板关闭时不记录)"""
+    if perf_panel_enabled:
+        st.session_state.perf_log.append({
+            '部分': '\u3000' * _perf_depth + section,
+            '用时(ms)': elapsed * 1000,
+            '说明': note
+        })
+
+@contextmanager
+def perf_section(section, note=''):
+    """统计 with 块的用时；块内再记录的部分在面板中缩进显示在它下面"""
+    global _perf_depth
+    if not perf_panel_enabled:
+        yield
+        return
+    
+    entry_index = len(st.session_state.perf_log)
+    _record_perf(section, 0.0, note)
+    _perf_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _perf_depth -= 1
+        st.session_state.perf_log[entry_index]['用时(ms)'] = (time.perf_counter() - start) * 1000
+
+def session_state_sizes():
+    """session_state 各键的大小 (字节)：能序列化的按 pickle 长度，否则按内存估算"""
+    sizes = {}
+    for key in list(st.session_state.keys()):
+        value = st.session_state[key]
+        try:
+            sizes[key] = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            sizes[key] = _estimate_nbytes(value)
+    return sizes
+
+# ---------------------- 页面片段 (局部重跑) ----------------------
+# 计算片段声明自己依赖的输入，输入不变时直接复用 session_state 中的上次结果，
+# 所以只改图表主题/高度时只重新绘图；带控件的展示片段用 st.fragment 包装，
+# 片段内的控件变化只重跑该片段。旧版 Streamlit 没有 st.fragment 时退化为整页重跑
+FRAGMENTS_SUPPORTED = hasattr(st, 'fragment')
+
+st.session_state.page_run_id = st.session_state.get('page_run_id', 0) + 1
+st.session_state.fragment_log = []
+if 'fragment_state' not in st.session_state:
+    st.session_state.fragment_state = {}
+
+def _record_fragment(name, mode, elapsed, changed=()):
+    """记录片段在本次交互中的执行情况，供调试面板显示"""
+    entry = {
+        '片段': name,
+        '方式': mode,
+        '用时(ms)': elapsed * 1000,
+        '变化的输入': '、'.join(changed)
+    }
+    st.session_state.fragment_log.append(entry)
+    return entry
+
+def run_fragment(name, compute, **inputs):
+    """执行声明了输入的计算片段：compute(**inputs) 的结果按输入缓存在会话中，输入不变时直接复用"""
+    signature = {key: _canonical_param(value) for key, value in inputs.items()}
+    previous = st.session_state.fragment_state.get(name)
+    if previous is not None and previous['signature'] == signature:
+        _record_fragment(name, '复用', 0.0)
+        _record_perf(name, 0.0, f"{compute.__name__} · 复用上次结果")
+        return previous['value']
+    
+    changed = [key for key in signature
+               if previous is None or previous['signature'].get(key) != signature[key]]
+    start = time.perf_counter()
+    value = compute(**inputs)
+    elapsed = time.perf_counter() - start
+    # 签名深拷贝一份，避免调用方原地修改输入 (如历史记录列表) 后误判为未变化
+    st.session_state.fragment_state[name] = {'signature': copy.deepcopy(signature), 'value': value}
+    _record_fragment(name, '执行', elapsed, changed)
+    _record_perf(name, elapsed, f"{compute.__name__} · 执行")
+    return value
+
+def page_fragment(name):
+    """把带控件的展示片段包装为 st.fragment：片段内控件变化时只重跑该片段"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # 同一次整页运行中再次执行，说明是片段自身的局部重跑
+            last_runs = st.session_state.setdefault('fragment_runs', {})
+            mode = '局部重跑' if last_runs.get(name) == st.session_state.page_run_id else '执行'
+            last_runs[name] = st.session_state.page_run_id
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            entry = _record_fragment(name, mode, time.perf_counter() - start)
+            _record_perf(name, entry['用时(ms)'] / 1000, f"页面片段 · {mode}")
+            if st.session_state.get('show_fragment_debug') or perf_panel_enabled:
+                st.caption(f"🧩 片段「{name}」{entry['方式']}，用时 {entry['用时(ms)']:.1f} ms")
+            return result
+        return st.fragment(wrapper) if FRAGMENTS_SUPPORTED else wrapper
+    return decorator
+
 # ---------------------- 页面标题和说明 ----------------------
 st.title("💰 薪资结构优化分析系统 v2.0")
 st.markdown("""
@@ -378,6 +414,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ---------------------- 侧边栏：参数设置 ----------------------
+sidebar_started = time.perf_counter()
 with st.sidebar:
     st.header("🎛️ 参数设置")
     
@@ -418,13 +455,13 @@ with st.sidebar:
     with col1:
         bonus_base_months = st.slider(
             "基本月数", 
-            0.0, 12.0, 1.0, 0.5,
+            0.0, 12.0, SHARED_CURVE_DEFAULT['bonus_months'], 0.5,
             help="年终奖基数（月数）"
         )
     with col2:
         performance_multiplier = st.slider(
             "绩效系数", 
-            0.0, 5.0, 1.5, 0.1,
+            0.0, 5.0, SHARED_CURVE_DEFAULT['multiplier'], 0.1,
             help="绩效系数（1.0为标准）"
         )
     
@@ -433,30 +470,34 @@ with st.sidebar:
     
     city_preset = st.selectbox(
         "选择城市预设",
-        ["自定义", "深圳", "北京", "上海", "广州", "杭州", "成都", "不缴纳公积金"]
+        ["自定义"] + CITY_RULES['names']
     )
     
-    if city_preset == "深圳":
-        ss_base, hf_base = 4775, 2520
-    elif city_preset == "北京":
-        ss_base, hf_base = 6326, 2770
-    elif city_preset == "上海":
-        ss_base, hf_base = 5975, 2590
-    elif city_preset == "广州":
-        ss_base, hf_base = 4588, 2300
-    elif city_preset == "杭州":
-        ss_base, hf_base = 3957, 2010
-    elif city_preset == "成都":
-        ss_base, hf_base = 3726, 1780
-    elif city_preset == "不缴纳公积金":
-        ss_base, hf_base = 4775, 0  # 公积金基数为0，表示不缴纳公积金
+    if city_preset != "自定义":
+        city = city_preset
+        city_rules = get_city_rules(city)
+        base_mode = st.radio(
+            "缴费基数",
+            ["按最低基数", "按实际工资"],
+            horizontal=True,
+            help="按实际工资时，缴费基数为月薪并按当地上下限封顶/保底"
+        )
+        if base_mode == "按最低基数":
+            ss_base, hf_base = city_rules['ss_floor'], city_rules['hf_floor']
+        else:
+            ss_base, hf_base = city_rules['ss_ceiling'], city_rules['hf_ceiling']
+        hf_range = (f"{city_rules['hf_floor']:,.0f}-{city_rules['hf_ceiling']:,.0f}元"
+                    if city_rules['hf_ceiling'] > 0 else "不缴纳")
+        st.caption(f"社保基数 {city_rules['ss_floor']:,.0f}-{city_rules['ss_ceiling']:,.0f}元，公积金基数 {hf_range}"
+                   + (f"（{city_rules['description']}）" if city_rules['description'] else ""))
     else:
+        city = None
         col1, col2 = st.columns(2)
         with col1:
-            ss_base = st.number_input("社保基数 (元)", min_value=0, max_value=50000, value=4775, step=100,
+            ss_base = st.number_input("社保基数 (元)", min_value=0, max_value=50000, value=DEFAULT_CUSTOM_BASES[0], step=100,
                                      help="社保缴纳基数，设为0表示不缴纳社保")
         with col2:
-            hf_base = st.number_input("公积金基数 (元)", min_value=0, max_value=50000, value=2520, step=100,
+            hf_base = st.number_input("公积金基数 (元)", min_value=0, max_value=50000, value=DEFAULT_CUSTOM_BASES[1], step=100,
                                      help="公积金缴纳基数，设为0表示不缴纳公积金")
     
     # 显示当前公积金设置状态
@@ -497,7 +538,7 @@ with st.sidebar:
         current_result = calculate_one_scenario(
             base_salary, performance_salary, bonus_base_months,
             performance_multiplier, ss_base, hf_base, additional_deductions,
-            include_performance_in_bonus
+            include_performance_in_bonus, city=city
         )
         
         # 添加到历史记录
@@ -526,6 +567,47 @@ with st.sidebar:
     
     chart_height = st.slider("图表高度", 300, 800, 500, 50)
     
+    lightweight_figures = st.toggle(
+        "轻量图表模式",
+        value=False,
+        help=f"曲线改用 WebGL 绘制，每个图最多 {FIGURE_POINT_BUDGET:,} 个数据点；适合远程访问或网络较慢时使用"
+    )
+    
+    curve_salary_max = st.select_slider(
+        "曲线月薪上限 (元)",
+        options=CURVE_SALARY_MAX_OPTIONS,
+        value=SHARED_CURVE_DEFAULT['salary_max'],
+        format_func=lambda x: f"{x:,}",
+        help="曲线按解析断点精确计算，上限不影响计算量"
+    )
+    
+    lazy_tab_rendering = st.toggle(
+        "按需渲染分析标签页",
+        value=True,
+        help="只计算和绘制当前打开的标签页，其余标签页在切换过去时才渲染；关闭后每次刷新都渲染全部标签页"
+    )
+    
+    prefetch_neighbours = st.toggle(
+        "预取相邻参数",
+        value=get_prefetcher().enabled,
+        disabled=not get_prefetcher().enabled,
+        help="拖动基本工资、年终奖月数、绩效系数后，在后台把前后 1~2 步的结果提前算好，下一步操作直接读取缓存"
+    )
+    
+    show_fragment_debug = st.toggle(
+        "显示片段执行情况",
+        value=False,
+        key="show_fragment_debug",
+        help="调试用：列出每次交互中各页面片段是重新执行、复用上次结果还是局部重跑，以及用时和变化的输入"
+    )
+    
+    st.toggle(
+        "显示性能诊断",
+        value=False,
+        key="show_perf_panel",
+        help=f"页面底部列出本次运行各部分的用时、内存峰值和会话状态大小；也可以在网址后加 ?{PERF_QUERY_PARAM}=1 打开"
+    )
+    
     # 对比方案设置
     st.subheader("🔁 对比方案设置")
     
@@ -548,6 +630,8 @@ with st.sidebar:
             help="原工作的年终奖计算方式"
         )
 
+_record_perf("侧边栏控件", time.perf_counter() - sidebar_started)
+
 # 获取当前主题配置
 theme_config = get_chart_theme(st.session_state.current_theme)
 chart_template = theme_config["template"]
@@ -557,20 +641,39 @@ theme_colors = theme_config["colors"]
 text_color = get_text_color(theme_config)
 background_color = get_background_color(theme_config)
 
+# 计算引擎在 salary_core.py 中 (不依赖 Streamlit)；侧边栏渲染后再打开磁盘缓存并预热共享曲线
+with perf_section("磁盘缓存与共享曲线", "进程首次运行时打开缓存、预热曲线"):
+    DISK_CACHE = get_disk_cache()
+    SHARED_CURVES = get_shared_curve_store()
+
 # ---------------------- 主显示区域 ----------------------
-# 计算当前方案结果
-current_result = calculate_one_scenario(
-    base_salary, performance_salary, bonus_base_months,
-    performance_multiplier, ss_base, hf_base, additional_deductions,
-    include_performance_in_bonus
+# 调试面板占位，页面末尾填入本次交互的片段执行情况
+fragment_debug_panel = st.empty()
+
+# 当前方案的薪资参数，各计算片段按需声明依赖其中哪些
+scenario_inputs = dict(
+    base_salary=base_salary,
+    performance_salary=performance_salary,
+    bonus_base_months=bonus_base_months,
+    performance_multiplier=performance_multiplier,
+    ss_base=ss_base,
+    hf_base=hf_base,
+    additional_deductions=additional_deductions,
+    include_performance_in_bonus=include_performance_in_bonus,
+    city=city
 )
 
-# 生成综合数据
-comprehensive_data = generate_comprehensive_data(
-    base_salary, performance_salary, bonus_base_months,
-    performance_multiplier, ss_base, hf_base, additional_deductions,
-    include_performance_in_bonus
+# 计算当前方案结果
+current_result = run_fragment("当前方案", calculate_one_scenario, **scenario_inputs)
+
+# 生成综合数据 (解析断点，跳档处精确)
+# 常见配置直接读取启动时预热的共享曲线
+curve_salary_min = CURVE_SALARY_MIN
+comprehensive_data = run_fragment(
+    "综合曲线", lookup_comprehensive_data,
+    salary_min=curve_salary_min, salary_max=curve_salary_max, **scenario_inputs
 )
+curve_range_label = f"月薪范围: {curve_salary_min:,}-{curve_salary_max:,}元"
 
 # 关键指标显示
 st.header("📊 关键指标概览")
@@ -603,11 +706,91 @@ with col4:
         "综合所得税率"
     )
 
+# 月薪/年终奖最优拆分建议 (年薪总包不变，月薪不低于社保基数；选了城市时为当地社保基数下限)
+ss_min_base = get_city_rules(city)['ss_floor'] if city else ss_base
+package_split = run_fragment(
+    "最优拆分", optimize_package_split,
+    annual_package=current_result['税前年收入'], ss_base=ss_base, hf_base=hf_base,
+    additional_deductions=additional_deductions,
+    min_monthly_salary=min(ss_min_base, current_result['税前年收入'] / 12), city=city
+)
+split_gain = package_split['最优税后年收入'] - current_result['税后年收入']
+
+with st.expander("💡 月薪/年终奖最优拆分建议", expanded=split_gain >= 1):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(
+            "建议月度总工资",
+            f"{package_split['最优月薪']:,.0f}元",
+            f"{package_split['最优月薪'] - current_result['月度总工资']:+,.0f}元"
+        )
+    with col2:
+        split_bonus_months = package_split['最优年终奖'] / package_split['最优月薪'] if package_split['最优月薪'] > 0 else 0
+        st.metric(
+            "建议年终奖",
+            f"{package_split['最优年终奖']:,.0f}元",
+            f"约{split_bonus_months:.2f}个月"
+        )
+    with col3:
+        st.metric(
+            "税后年收入",
+            f"{package_split['最优税后年收入']:,.0f}元",
+            f"{split_gain:+,.0f}元"
+        )
+    
+    if split_gain < 1:
+        st.success("✅ 当前拆分已是税后最优方案")
+    tie_ranges = [f"{lo:,.0f}-{hi:,.0f}元" if hi > lo else f"{lo:,.0f}元" for lo, hi in package_split['并列最优区间']]
+    st.caption(f"年薪总包 {current_result['税前年收入']:,.0f}元 保持不变；税后同样最优的月度总工资：{'、'.join(tie_ranges)}")
+
+# 目标到手反推税前工资 (绩效比例、年终奖月数、绩效系数和社保公积金基数保持不变)
+# 只改目标时局部重跑本片段
+@page_fragment("目标反推")
+def render_target_solver():
+    with st.expander("🎯 目标到手反推税前工资", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            target_metric = st.radio("目标指标", list(TARGET_METRICS), horizontal=True)
+        with col2:
+            target_value = st.number_input(
+                "目标金额 (元)",
+                min_value=0,
+                max_value=20000000,
+                value=int(round(current_result[target_metric] / 1000) * 1000),
+                step=1000
+            )
+        
+        performance_ratio = performance_salary / base_salary if base_salary > 0 else 0
+        required = solve_base_salary(
+            target_value, performance_ratio, bonus_base_months, performance_multiplier,
+            ss_base, hf_base, additional_deductions, include_performance_in_bonus, target_metric, city=city
+        )
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric(
+                "所需基本工资",
+                f"{required['所需基本工资']:,.0f}元",
+                f"{required['所需基本工资'] - base_salary:+,.0f}元"
+            )
+        with col2:
+            st.metric("所需绩效工资", f"{required['所需绩效工资']:,.0f}元")
+        with col3:
+            st.metric("对应年终奖", f"{required['年终奖金额']:,.0f}元")
+        
+        st.caption(f"按当前绩效比例 {performance_ratio:.2f}、{bonus_base_months}月×{performance_multiplier}倍年终奖反推，"
+                   f"达到目标的最低基本工资（税后年收入 {required['税后年收入']:,.0f}元）")
+
+render_target_solver()
+
 # 显示公积金缴纳状态
 if hf_base == 0:
     st.success("💰 **当前设置: 不缴纳公积金** - 薪资计算中不考虑公积金扣除")
 else:
-    st.info(f"💰 **公积金设置**: 基数{hf_base:,.0f}元，个人缴纳比例5%，月缴{hf_base*0.05:,.0f}元")
+    hf_rate = float(resolve_contribution_rates(city=city)['公积金'])
+    hf_monthly = current_result['社保公积金详情']['公积金']
+    hf_effective = hf_monthly / hf_rate if hf_rate > 0 else 0
+    st.info(f"💰 **公积金设置**: 基数{hf_effective:,.0f}元，个人缴纳比例{hf_rate*100:g}%，月缴{hf_monthly:,.0f}元")
 
 # 月均收入对比
 st.subheader("📅 月均收入分析")
@@ -632,28 +815,30 @@ st.info(f"📝 **年终奖计算方式**: {current_result['年终奖计算方式
 # ---------------------- 图表区域 ----------------------
 st.header("📈 可视化分析")
 
-# 创建标签页 - 新增历史趋势分析标签
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["综合曲线图", "收入构成", "边际税率分析", "工资结构分解", "历史趋势分析"])
+# 当前月薪对应的数据点 (曲线只含断点顶点，直接取当前方案的精确值)
+current_monthly = current_result['月度总工资']
+current_conversion_rate = current_result['收入转化率'] * 100
+current_after_tax = current_result['税后年收入']
 
-with tab1:
-    # 综合曲线图 - 优化版本
-    st.subheader("薪资分析曲线图 (月薪范围: 5,000-100,000元)")
-    
-    # 获取当前月薪对应的数据点索引
-    current_monthly = current_result['月度总工资']
-    
-    # 找到最接近当前月薪的数据点
-    salary_range = comprehensive_data['月薪'].values
-    idx = np.argmin(np.abs(salary_range - current_monthly))
-    current_conversion_rate = comprehensive_data['收入转化率'].iloc[idx] * 100
-    current_after_tax = comprehensive_data['税后年收入'].iloc[idx]
-    
-    fig_comprehensive = go.Figure()
+# 每个标签页的内容封装为渲染函数，按需渲染时只调用当前打开的那个
+def build_curve_base_figure(curve_data, bonus_per_salary, curve_salary_min, curve_salary_max,
+                            curve_range_label, theme_name, chart_height, lightweight):
+    """综合曲线图中不随当前薪资点移动的部分 (曲线、参考线、死区和布局)，输入不变时整图复用"""
+    theme_config = get_chart_theme(theme_name)
+    chart_template = theme_config["template"]
+    theme_colors = theme_config["colors"]
+    text_color = get_text_color(theme_config)
+    background_color = get_background_color(theme_config)
+    if lightweight:
+        curve_data = downsample_curve(curve_data, ['收入转化率', '税后年收入', '边际税率'])
+    
+    fig_comprehensive = FigureSpec()
     
     # 1. 添加收入转化率曲线 - 使用面积图
-    fig_comprehensive.add_trace(go.Scatter(
-        x=comprehensive_data['月薪'],
-        y=comprehensive_data['收入转化率'] * 100,
+    fig_comprehensive.add_trace(scatter_trace(
+        lightweight,
+        x=curve_data['月薪'],
+        y=curve_data['收入转化率'] * 100,
         mode='lines',
         name='收入转化率',
         line=dict(color=theme_colors['primary'], width=4),
@@ -663,9 +848,10 @@ with tab1:
     ))
     
     # 2. 添加税后年收入曲线（使用次坐标轴）
-    fig_comprehensive.add_trace(go.Scatter(
-        x=comprehensive_data['月薪'],
-        y=comprehensive_data['税后年收入'] / 10000,  # 转换为万元
+    fig_comprehensive.add_trace(scatter_trace(
+        lightweight,
+        x=curve_data['月薪'],
+        y=curve_data['税后年收入'] / 10000,  # 转换为万元
         mode='lines',
         name='税后年收入(万元)',
         line=dict(color=theme_colors['secondary'], width=3, dash='dash'),
@@ -674,9 +860,10 @@ with tab1:
     ))
     
     # 3. 添加边际税率曲线（使用次坐标轴）
-    fig_comprehensive.add_trace(go.Scatter(
-        x=comprehensive_data['月薪'],
-        y=comprehensive_data['边际税率'] * 100,
+    fig_comprehensive.add_trace(scatter_trace(
+        lightweight,
+        x=curve_data['月薪'],
+        y=curve_data['边际税率'] * 100,
         mode='lines',
         name='边际税率(%)',
         line=dict(color=theme_colors['tertiary'], width=3, dash='dot'),
@@ -684,37 +871,7 @@ with tab1:
         hovertemplate='<b>边际税率</b><br>月薪: %{x:,.0f}元<br>税率: %{y:.1f}%<extra></extra>'
     ))
     
-    # 4. 添加当前月薪的强化标记点
-    fig_comprehensive.add_trace(go.Scatter(
-        x=[current_monthly],
-        y=[current_conversion_rate],
-        mode='markers+text',
-        name='当前薪资点',
-        marker=dict(
-            size=16,
-            color=theme_colors['danger'],
-            symbol='star',
-            line=dict(width=2, color='white')
-        ),
-        text=[f'{current_conversion_rate:.1f}%'],
-        textposition='top center',
-        textfont=dict(size=14, color=theme_colors['danger'], family="Arial Black"),
-        hovertemplate='<b>当前薪资点</b><br>月薪: %{x:,.0f}元<br>转化率: %{y:.1f}%<br>税后年收入: %{text}<extra></extra>'
-    ))
-    
-    # 5. 添加当前月薪的垂直线
-    fig_comprehensive.add_vline(
-        x=current_monthly, 
-        line_dash="solid", 
-        line_color=rgba_from_hex(theme_colors['danger'], 0.7),
-        line_width=2,
-        annotation_text=f"当前月薪: {current_monthly:,.0f}元",
-        annotation_position="top right",
-        annotation_font=dict(color=theme_colors['danger'], size=12),
-        annotation_bgcolor="rgba(255, 255, 255, 0.8)"
-    )
-    
-    # 6. 添加收入转化率参考线（70%, 80%, 90%）
+    # 4. 添加收入转化率参考线（70%, 80%, 90%）
     for rate, name in [(70, '70%参考线'), (80, '80%参考线'), (90, '90%参考线')]:
         fig_comprehensive.add_hline(
             y=rate,
@@ -726,10 +883,28 @@ with tab1:
             annotation_font=dict(size=10, color=text_color)
         )
     
+    # 5. 标出年终奖死区 (年终奖与月薪成正比，死区直接按比例换算到月薪轴)
+    if bonus_per_salary > 0:
+        for _, zone in calculate_bonus_dead_zones().iterrows():
+            zone_start = zone['死区起点'] / bonus_per_salary
+            zone_end = zone['死区终点'] / bonus_per_salary
+            if zone_end < curve_salary_min or zone_start > curve_salary_max:
+                continue
+            fig_comprehensive.add_vrect(
+                x0=zone_start,
+                x1=zone_end,
+                fillcolor=rgba_from_hex(theme_colors['danger'], 0.12),
+                line_width=0,
+                layer="below",
+                annotation_text="年终奖死区",
+                annotation_position="bottom left",
+                annotation_font=dict(size=10, color=theme_colors['danger'])
+            )
+    
     # 更新布局
     fig_comprehensive.update_layout(
         title=dict(
-            text='薪资综合分析曲线 - 以收入转化率为核心指标 (月薪范围: 5,000-100,000元)',
+            text=f'薪资综合分析曲线 - 以收入转化率为核心指标 ({curve_range_label})',
             font=dict(size=20, color=text_color),
             x=0.5,
             xanchor='center'
@@ -742,7 +917,7 @@ with tab1:
             gridcolor='rgba(128, 128, 128, 0.1)',
             showgrid=True,
             tickformat=',.0f',
-            range=[5000, 100000],  # 设置x轴显示范围
+            range=[curve_salary_min, curve_salary_max],  # 设置x轴显示范围
             tickfont=dict(color=text_color)
         ),
         yaxis=dict(
@@ -814,6 +989,60 @@ with tab1:
         borderpad=4
     )
     
+    return fig_comprehensive
+
+def render_curve_tab():
+    # 综合曲线图 - 优化版本
+    st.subheader(f"薪资分析曲线图 ({curve_range_label})")
+    
+    # 年终奖与月薪成正比，死区按比例换算到月薪轴
+    bonus_per_salary = current_result['年终奖金额'] / current_monthly if current_monthly > 0 else 0
+    base_figure = run_fragment(
+        "综合曲线图", build_curve_base_figure,
+        curve_data=comprehensive_data,
+        bonus_per_salary=bonus_per_salary,
+        curve_salary_min=curve_salary_min,
+        curve_salary_max=curve_salary_max,
+        curve_range_label=curve_range_label,
+        theme_name=st.session_state.current_theme,
+        chart_height=chart_height,
+        lightweight=lightweight_figures
+    )
+    
+    # 只重建随当前薪资点变化的标记点和竖线，曲线部分直接复制缓存的底图
+    fig_comprehensive = copy.deepcopy(base_figure)
+    
+    # 添加当前月薪的强化标记点
+    fig_comprehensive.add_trace(trace_spec(
+        'scatter',
+        x=[current_monthly],
+        y=[current_conversion_rate],
+        mode='markers+text',
+        name='当前薪资点',
+        marker=dict(
+            size=16,
+            color=theme_colors['danger'],
+            symbol='star',
+            line=dict(width=2, color='white')
+        ),
+        text=[f'{current_conversion_rate:.1f}%'],
+        textposition='top center',
+        textfont=dict(size=14, color=theme_colors['danger'], family="Arial Black"),
+        hovertemplate='<b>当前薪资点</b><br>月薪: %{x:,.0f}元<br>转化率: %{y:.1f}%<br>税后年收入: %{text}<extra></extra>'
+    ))
+    
+    # 添加当前月薪的垂直线
+    fig_comprehensive.add_vline(
+        x=current_monthly, 
+        line_dash="solid", 
+        line_color=rgba_from_hex(theme_colors['danger'], 0.7),
+        line_width=2,
+        annotation_text=f"当前月薪: {current_monthly:,.0f}元",
+        annotation_position="top right",
+        annotation_font=dict(color=theme_colors['danger'], size=12),
+        annotation_bgcolor="rgba(255, 255, 255, 0.8)"
+    )
+    
     st.plotly_chart(fig_comprehensive, use_container_width=True)
     
     # 添加当前点的详细数据
@@ -826,7 +1055,7 @@ with tab1:
     - 💼 **公积金状态**: {'不缴纳公积金' if hf_base == 0 else f'缴纳基数: {hf_base:,.0f}元'}
     """)
 
-with tab2:
+def render_income_tab():
     # 收入构成分析
     st.subheader("收入构成分析")
     
@@ -867,29 +1096,36 @@ with tab2:
     
     st.plotly_chart(fig_pie, use_container_width=True)
 
-with tab3:
+def render_marginal_tab():
     # 边际税率分析
-    st.subheader("边际税率阶梯分析 (月薪范围: 5,000-100,000元)")
+    st.subheader(f"边际税率阶梯分析 ({curve_range_label})")
     
-    fig_marginal = px.area(
-        comprehensive_data, 
+    # 跳档处同一月薪有左右两个点，用非堆叠的填充折线保证阶梯垂直
+    fig_marginal = px.line(
+        downsample_curve(comprehensive_data, ['边际税率']) if lightweight_figures else comprehensive_data, 
         x='月薪', 
         y='边际税率',
         title='边际税率变化曲线',
-        labels={'边际税率': '边际税率', '月薪': '月度总工资 (元)'}
+        labels={'边际税率': '边际税率', '月薪': '月度总工资 (元)'},
+        render_mode='webgl' if lightweight_figures else 'auto'
+    )
+    fig_marginal.update_traces(fill='tozeroy')
+    
+    # 添加税率区间标注 (取曲线中边际税率跳变的精确月薪)
+    rate_change = comprehensive_data['边际税率'].diff() > 0
+    rate_steps = zip(
+        comprehensive_data['月薪'][rate_change],
+        comprehensive_data['边际税率'].shift()[rate_change],
+        comprehensive_data['边际税率'][rate_change]
     )
     
-    # 添加税率区间标注
-    tax_thresholds = [36000/12, 144000/12, 300000/12, 420000/12, 660000/12, 960000/12]
-    tax_rates = ['3%', '10%', '20%', '25%', '30%', '35%', '45%']
-    
-    for i, threshold in enumerate(tax_thresholds):
+    for threshold, prev_rate, next_rate in rate_steps:
         fig_marginal.add_vline(
             x=threshold,
             line_dash="dot",
             line_color="rgba(128, 128, 128, 0.5)",
             opacity=0.5,
-            annotation_text=f"{tax_rates[i]}→{tax_rates[i+1]}",
+            annotation_text=f"{prev_rate*100:.0f}%→{next_rate*100:.0f}%",
             annotation_position="top",
             annotation_font=dict(color=text_color)
         )
@@ -908,7 +1144,7 @@ with tab3:
         template=chart_template,
         height=chart_height,
         xaxis=dict(
-            range=[5000, 100000],  # 设置x轴显示范围
+            range=[curve_salary_min, curve_salary_max],  # 设置x轴显示范围
             tickformat=',.0f',
             tickfont=dict(color=text_color),
             title_font=dict(color=text_color)
@@ -926,7 +1162,7 @@ with tab3:
     
     st.plotly_chart(fig_marginal, use_container_width=True)
 
-with tab4:
+def render_structure_tab():
     # 工资结构分解
     st.subheader("工资结构分解")
     
@@ -980,7 +1216,7 @@ with tab4:
     
     st.plotly_chart(fig_monthly, use_container_width=True)
 
-with tab5:
+def render_history_tab():
     # 新增：薪资调整历史趋势分析
     st.subheader("📈 薪资调整历史趋势分析")
     
@@ -990,49 +1226,10 @@ with tab5:
         # 显示历史记录概览
         st.success(f"📊 已记录 {len(st.session_state.salary_history)} 次薪资调整方案")
         
-        # 准备历史数据
-        history_df = pd.DataFrame([
-            {
-                '调整序号': f"第{item['id']}次",
-                '记录时间': item['timestamp'],
-                '月度总工资(元)': item['results']['月度总工资'],
-                '年度总工资(元)': item['results']['税前年收入'],
-                '税前月均工资(元)': item['results']['月度总工资'],
-                '税后月均工资(元)': item['results']['月均到手(含年终奖)'],
-                '收入转化率(%)': item['results']['收入转化率'] * 100,
-                '年终奖计算方式': item['results']['年终奖计算方式'],
-                '年终奖包含绩效工资': item['results']['年终奖包含绩效工资']
-            }
-            for item in st.session_state.salary_history
-        ])
-        
-        # 计算变化率
-        if len(history_df) > 1:
-            change_rates = []
-            for i in range(len(history_df)):
-                if i == 0:
-                    change_rates.append({
-                        '调整序号': f"第{i+1}次",
-                        '月度总工资变化率(%)': 0,
-                        '年度总工资变化率(%)': 0,
-                        '税前月均变化率(%)': 0,
-                        '税后月均变化率(%)': 0,
-                        '收入转化率变化(百分点)': 0
-                    })
-                else:
-                    prev_row = history_df.iloc[i-1]
-                    curr_row = history_df.iloc[i]
-                    
-                    change_rates.append({
-                        '调整序号': f"第{i+1}次",
-                        '月度总工资变化率(%)': calculate_change_rate(curr_row['月度总工资(元)'], prev_row['月度总工资(元)']),
-                        '年度总工资变化率(%)': calculate_change_rate(curr_row['年度总工资(元)'], prev_row['年度总工资(元)']),
-                        '税前月均变化率(%)': calculate_change_rate(curr_row['税前月均工资(元)'], prev_row['税前月均工资(元)']),
-                        '税后月均变化率(%)': calculate_change_rate(curr_row['税后月均工资(元)'], prev_row['税后月均工资(元)']),
-                        '收入转化率变化(百分点)': curr_row['收入转化率(%)'] - prev_row['收入转化率(%)']
-                    })
-            
-            change_df = pd.DataFrame(change_rates)
+        # 准备历史数据 (只依赖历史记录，记录不变时复用上次结果)
+        history_df, change_df = run_fragment(
+            "历史数据", build_history_frames, salary_history=st.session_state.salary_history
+        )
         
         # 创建多图表显示
         col1, col2 = st.columns(2)
@@ -1091,7 +1288,7 @@ with tab5:
         after_tax_ticks = np.linspace(min_monthly_after_tax, max_monthly_after_tax, tick_count)
         conversion_ticks = np.linspace(min_conversion, max_conversion, tick_count)
         
-        fig_history = go.Figure()
+        fig_history = FigureSpec()
         
         # 定义曲线颜色（与主题一致）
         trace_colors = [
@@ -1110,7 +1307,8 @@ with tab5:
         ]
         
         for i, (name, col, yaxis, dash) in enumerate(traces_data):
-            fig_history.add_trace(go.Scatter(
+            fig_history.add_trace(trace_spec(
+                'scatter',
                 x=history_df['调整序号'],
                 y=history_df[col],
                 mode='lines+markers',
@@ -1281,7 +1479,7 @@ with tab5:
             change_ticks = np.linspace(overall_min, overall_max, tick_count_change)
             
             # 创建柱状图
-            fig_change = go.Figure()
+            fig_change = FigureSpec()
             
             # 获取x轴值（跳过第一次）
             x_values = change_df['调整序号'].iloc[1:]
@@ -1295,7 +1493,8 @@ with tab5:
                 negative_mask = y_values < 0
                 
                 if np.any(positive_mask):
-                    fig_change.add_trace(go.Bar(
+                    fig_change.add_trace(trace_spec(
+                        'bar',
                         x=x_values[positive_mask],
                         y=y_values[positive_mask],
                         name=indicator.replace('变化率(%)', '') + '(+)',
@@ -1308,7 +1507,8 @@ with tab5:
                     ))
                 
                 if np.any(negative_mask):
-                    fig_change.add_trace(go.Bar(
+                    fig_change.add_trace(trace_spec(
+                        'bar',
                         x=x_values[negative_mask],
                         y=y_values[negative_mask],
                         name=indicator.replace('变化率(%)', '') + '(-)',
@@ -1324,7 +1524,8 @@ with tab5:
             # 添加线图（收入转化率变化）
             y_values_conversion = change_df['收入转化率变化(百分点)'].iloc[1:].values
             
-            fig_change.add_trace(go.Scatter(
+            fig_change.add_trace(trace_spec(
+                'scatter',
                 x=x_values,
                 y=y_values_conversion,
                 mode='lines+markers',
@@ -1479,6 +1680,142 @@ with tab5:
                 - ⏰ **记录时间**: {best_conversion['记录时间']}
                 """)
 
+@page_fragment("月度现金流")
+def render_cash_flow_tab():
+    # 累计预扣法下的逐月到手
+    st.subheader("月度现金流 (累计预扣法)")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        performance_schedule = st.selectbox(
+            "绩效发放方式",
+            ["每月发放", "按季度发放"],
+            help="按季度发放时，3、6、9、12月各发放一个季度的绩效工资"
+        )
+    with col2:
+        bonus_month = st.slider("年终奖发放月份", 1, 12, 12)
+    
+    if performance_schedule == "按季度发放":
+        monthly_performance = np.where(WITHHOLDING_MONTHS % 3 == 0, performance_salary * 3, 0.0)
+    else:
+        monthly_performance = performance_salary
+    
+    cash_flow = calculate_withholding_schedule(
+        base_salary, monthly_performance, ss_base, hf_base, additional_deductions,
+        bonus=current_result['年终奖金额'], bonus_month=bonus_month, city=city
+    )
+    month_labels = [f"{m}月" for m in cash_flow['月份']]
+    
+    fig_cash_flow = FigureSpec()
+    for column, color in [('实发工资', theme_colors['primary']),
+                          ('当月预扣个税', theme_colors['danger']),
+                          ('年终奖个税', rgba_from_hex(theme_colors['danger'], 0.5)),
+                          ('社保公积金', theme_colors['secondary'])]:
+        fig_cash_flow.add_trace(trace_spec(
+            'bar',
+            x=month_labels,
+            y=cash_flow[column],
+            name=column,
+            marker_color=color,
+            hovertemplate=f'<b>{column}</b><br>%{{x}}: %{{y:,.0f}}元<extra></extra>'
+        ))
+    
+    fig_cash_flow.add_trace(trace_spec(
+        'scatter',
+        x=month_labels,
+        y=cash_flow['预扣率'],
+        mode='lines+markers',
+        name='预扣率',
+        line=dict(color=theme_colors['warning'], width=2, shape='hv'),
+        yaxis='y2',
+        hovertemplate='<b>预扣率</b><br>%{x}: %{y:.0%}<extra></extra>'
+    ))
+    
+    fig_cash_flow.update_layout(
+        template=chart_template,
+        height=chart_height,
+        barmode='stack',
+        title='逐月工资去向 (税前 = 实发 + 个税 + 社保公积金)',
+        xaxis=dict(tickfont=dict(color=text_color)),
+        yaxis=dict(
+            title="金额 (元)",
+            tickformat=',.0f',
+            tickfont=dict(color=text_color),
+            title_font=dict(color=text_color)
+        ),
+        yaxis2=dict(
+            title="预扣率",
+            tickformat=".0%",
+            overlaying='y',
+            side='right',
+            range=[0, 0.5],
+            tickfont=dict(color=text_color),
+            title_font=dict(color=text_color)
+        ),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color=text_color)),
+        paper_bgcolor=background_color,
+        font=dict(color=text_color),
+        title_font=dict(color=text_color)
+    )
+    
+    st.plotly_chart(fig_cash_flow, use_container_width=True)
+    
+    salary_paychecks = cash_flow['实发工资'] - cash_flow['年终奖'] + cash_flow['年终奖个税']
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("最高月到手 (不含年终奖)", f"{salary_paychecks.max():,.0f}元",
+                  f"{cash_flow['月份'][salary_paychecks.idxmax()]}月")
+    with col2:
+        st.metric("最低月到手 (不含年终奖)", f"{salary_paychecks.min():,.0f}元",
+                  f"{cash_flow['月份'][salary_paychecks.idxmin()]}月")
+    with col3:
+        st.metric("全年实发合计", f"{cash_flow['实发工资'].sum():,.0f}元")
+    
+    st.caption("累计预扣法下，随着累计应纳税所得额跨入更高预扣率，下半年每月预扣个税增加、到手减少；"
+               "全年预扣合计与年度应纳税额一致 (月度收入波动时可能多预扣，年度汇算时退还)")
+    
+    with st.expander("查看逐月明细"):
+        money_columns = [c for c in cash_flow.columns if c not in ('月份', '预扣率')]
+        st.dataframe(
+            cash_flow.style.format({**{c: '{:,.0f}' for c in money_columns}, '预扣率': '{:.0%}'}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+ANALYSIS_TABS = {
+    "综合曲线图": render_curve_tab,
+    "收入构成": render_income_tab,
+    "边际税率分析": render_marginal_tab,
+    "工资结构分解": render_structure_tab,
+    "历史趋势分析": render_history_tab,
+    "月度现金流": render_cash_flow_tab
+}
+# st.tabs 的 on_change/.open (按需执行) 从 Streamlit 1.55 起才有，比 requirements.txt 的最低版本新；
+# 按 st.tabs 的参数检测，旧版本用单选按钮切换视图，只执行选中的视图
+LAZY_TABS_SUPPORTED = 'on_change' in inspect.signature(st.tabs).parameters
+
+@contextmanager
+def tab_section(tab_name):
+    """渲染一个标签页：用时记入诊断面板和图表构建耗时指标"""
+    with perf_section(f"标签页「{tab_name}」", "图表构建"), \
+            FIGURE_BUILD_SECONDS.time(app='salary_optimizer_v2', figure=tab_name):
+        yield
+
+if not lazy_tab_rendering:
+    for tab, (tab_name, render) in zip(st.tabs(list(ANALYSIS_TABS)), ANALYSIS_TABS.items()):
+        with tab, tab_section(tab_name):
+            render()
+elif LAZY_TABS_SUPPORTED:
+    tabs = st.tabs(list(ANALYSIS_TABS), key="analysis_tab", on_change="rerun")
+    for tab, (tab_name, render) in zip(tabs, ANALYSIS_TABS.items()):
+        if tab.open:
+            with tab, tab_section(tab_name):
+                render()
+else:
+    selected_tab = st.radio("分析视图", list(ANALYSIS_TABS), horizontal=True, label_visibility="collapsed")
+    with tab_section(selected_tab):
+        ANALYSIS_TABS[selected_tab]()
+
 # ---------------------- 详细数据表格 ----------------------
 st.header("📋 详细数据表格")
 
@@ -1519,8 +1856,16 @@ with col2:
         bonus_base = current_result['基本工资']
         bonus_base_desc = f"基本工资({current_result['基本工资']:,.0f})"
     
+    # 年终奖死区检查
+    dead_zone = check_bonus_dead_zone(bonus_base, bonus_base_months, performance_multiplier).iloc[0]
+    if dead_zone['处于死区']:
+        dead_zone_desc = (f"处于死区 ({dead_zone['死区起点']:,.0f}-{dead_zone['死区终点']:,.0f}元)，"
+                          f"少发{dead_zone['可少发金额']:,.0f}元可多拿{dead_zone['税后损失']:,.0f}元")
+    else:
+        dead_zone_desc = "未落入死区"
+    
     bonus_details = pd.DataFrame({
-        '项目': ['计算方式', '基本月数', '绩效系数', '年终奖基数', '年终奖税前', '年终奖个税', '年终奖税后'],
+        '项目': ['计算方式', '基本月数', '绩效系数', '年终奖基数', '年终奖税前', '年终奖个税', '年终奖税后', '死区检查'],
         '数值': [
             current_result['年终奖计算方式'],
             f"{current_result['年终奖月数']}个月",
@@ -1528,22 +1873,29 @@ with col2:
             f"{bonus_base:,.0f}元 ({bonus_base_desc})",
             f"{current_result['年终奖金额']:,.0f}元",
             f"{calculate_tax_bonus(current_result['年终奖金额']):,.0f}元",
-            f"{current_result['年终奖金额'] - calculate_tax_bonus(current_result['年终奖金额']):,.0f}元"
+            f"{current_result['年终奖金额'] - calculate_tax_bonus(current_result['年终奖金额']):,.0f}元",
+            dead_zone_desc
         ]
     })
     
     st.dataframe(bonus_details, use_container_width=True)
+    
+    if dead_zone['处于死区']:
+        st.warning(f"⚠️ 年终奖落入死区：基本月数×绩效系数 在 "
+                   f"{dead_zone['系数起点']:.2f}-{dead_zone['系数终点']:.2f} 之间时，多发的年终奖反而减少税后收入。"
+                   f"建议将 基本月数×绩效系数 控制在 {dead_zone['系数起点']:.2f} 以内。")
 
 # ---------------------- 对比分析 ----------------------
 if enable_comparison:
     st.header("🔄 新旧工作对比分析")
     
     # 计算旧工作结果
-    old_result = calculate_one_scenario(
-        old_base_salary, old_performance_salary, old_bonus_months,
-        old_performance_multiplier, ss_base, hf_base, additional_deductions,
-        old_include_performance_in_bonus
-    )
+    with perf_section("对比方案", "calculate_one_scenario"):
+        old_result = calculate_one_scenario(
+            old_base_salary, old_performance_salary, old_bonus_months,
+            old_performance_multiplier, ss_base, hf_base, additional_deductions,
+            old_include_performance_in_bonus, city=city
+        )
     
     # 创建对比表格
     comparison_data = {
@@ -1591,7 +1943,7 @@ if enable_comparison:
     st.dataframe(comparison_df, use_container_width=True, hide_index=True)
     
     # 收入变化可视化
-    fig_comparison = go.Figure()
+    fig_comparison = FigureSpec()
     
     categories = ['税前年收入', '税后年收入', '月均到手(含年终奖)']
     old_values = [
@@ -1605,7 +1957,8 @@ if enable_comparison:
         current_result['月均到手(含年终奖)']
     ]
     
-    fig_comparison.add_trace(go.Bar(
+    fig_comparison.add_trace(trace_spec(
+        'bar',
         name='原工作',
         x=categories,
         y=old_values,
@@ -1615,7 +1968,8 @@ if enable_comparison:
         textfont=dict(color=text_color)
     ))
     
-    fig_comparison.add_trace(go.Bar(
+    fig_comparison.add_trace(trace_spec(
+        'bar',
         name='现工作',
         x=categories,
         y=new_values,
@@ -1640,68 +1994,73 @@ if enable_comparison:
     st.plotly_chart(fig_comparison, use_container_width=True)
 
 # ---------------------- 导出功能 ----------------------
-st.header("💾 数据导出")
-
-col1, col2 = st.columns(2)
-
-with col1:
-    # 导出当前方案数据
-    if st.button("📥 导出当前方案数据"):
-        export_data = {
-            '导出时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            '参数设置': {
-                '基本工资': base_salary,
-                '绩效工资': performance_salary,
-                '年终奖月数': bonus_base_months,
-                '绩效系数': performance_multiplier,
-                '社保基数': ss_base,
-                '公积金基数': hf_base,
-                '专项附加扣除': additional_deductions,
-                '城市预设': city_preset,
-                '年终奖包含绩效工资': include_performance_in_bonus
-            },
-            '计算结果': {
-                k: v for k, v in current_result.items() 
-                if k not in ['社保公积金详情']
-            },
-            '社保公积金详情': current_result['社保公积金详情']
-        }
-        
-        json_str = json.dumps(export_data, ensure_ascii=False, indent=2)
-        st.download_button(
-            label="下载JSON文件",
-            data=json_str,
-            file_name=f"薪资分析_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            mime="application/json"
-        )
+# 导出按钮只重跑本片段，不触发整页计算
+@page_fragment("数据导出")
+def render_export_section():
+    st.header("💾 数据导出")
     
-    # 导出历史记录数据
-    if st.session_state.salary_history:
-        if st.button("📊 导出历史记录数据"):
-            history_export = {
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # 导出当前方案数据
+        if st.button("📥 导出当前方案数据"):
+            export_data = {
                 '导出时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                '历史记录数量': len(st.session_state.salary_history),
-                '薪资调整历史': st.session_state.salary_history
+                '参数设置': {
+                    '基本工资': base_salary,
+                    '绩效工资': performance_salary,
+                    '年终奖月数': bonus_base_months,
+                    '绩效系数': performance_multiplier,
+                    '社保基数': ss_base,
+                    '公积金基数': hf_base,
+                    '专项附加扣除': additional_deductions,
+                    '城市预设': city_preset,
+                    '年终奖包含绩效工资': include_performance_in_bonus
+                },
+                '计算结果': {
+                    k: v for k, v in current_result.items() 
+                    if k not in ['社保公积金详情']
+                },
+                '社保公积金详情': current_result['社保公积金详情']
             }
             
-            history_json = json.dumps(history_export, ensure_ascii=False, indent=2)
+            json_str = json.dumps(export_data, ensure_ascii=False, indent=2)
             st.download_button(
-                label="下载历史记录JSON",
-                data=history_json,
-                file_name=f"薪资调整历史_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                label="下载JSON文件",
+                data=json_str,
+                file_name=f"薪资分析_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
+        
+        # 导出历史记录数据
+        if st.session_state.salary_history:
+            if st.button("📊 导出历史记录数据"):
+                history_export = {
+                    '导出时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    '历史记录数量': len(st.session_state.salary_history),
+                    '薪资调整历史': st.session_state.salary_history
+                }
+                
+                history_json = json.dumps(history_export, ensure_ascii=False, indent=2)
+                st.download_button(
+                    label="下载历史记录JSON",
+                    data=history_json,
+                    file_name=f"薪资调整历史_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                    mime="application/json"
+                )
+    
+    with col2:
+        # 导出图表数据
+        if st.button("📈 导出图表数据"):
+            csv_data = comprehensive_data.to_csv(index=False)
+            st.download_button(
+                label="下载CSV文件",
+                data=csv_data,
+                file_name=f"薪资分析数据_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
 
-with col2:
-    # 导出图表数据
-    if st.button("📈 导出图表数据"):
-        csv_data = comprehensive_data.to_csv(index=False)
-        st.download_button(
-            label="下载CSV文件",
-            data=csv_data,
-            file_name=f"薪资分析数据_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv"
-        )
+render_export_section()
 
 # ---------------------- 页脚 ----------------------
 st.divider()
@@ -1714,10 +2073,11 @@ st.caption("""
        - 不勾选：年终奖基数 = 基本工资
     4. 年终奖金额 = 年终奖基数 × 基本月数 × 绩效系数
     5. 月均收入分别显示包含和不包含年终奖的情况
-    6. 图表显示范围：月薪5,000-100,000元（个税起征点至10万月薪）
+    6. 图表显示范围：月薪5,000元起，上限可在"图表外观设置"中调整（最高100万月薪），曲线按税率档位、社保封顶和年终奖跳档的解析断点精确绘制
     7. 公积金设置：
        - 公积金基数可设置为0，表示不缴纳公积金
        - 城市预设中新增"不缴纳公积金"选项
+       - 选择城市后可按最低基数或按实际工资缴纳，实际工资按当地缴费基数上下限保底/封顶
     8. 薪资调整历史功能：
        - 点击"记录当前方案"保存当前参数和结果
        - 最多保存最近10次调整记录
@@ -1729,3 +2089,95 @@ st.caption("""
        - 蓝色调/暖色调：特色配色方案
     10. 数据仅供参考，实际纳税以税务机关规定为准
 """)
+
+cache_stats = RESULT_CACHE.stats()
+st.caption(f"⚡ 计算缓存：命中 {cache_stats['命中']} 次 / 未命中 {cache_stats['未命中']} 次 "
+           f"(命中率 {cache_stats['命中率']:.0%})，{cache_stats['条目数']} 条，"
+           f"占用 {cache_stats['占用(MB)']:.1f}/{cache_stats['上限(MB)']:.0f} MB")
+disk_stats = DISK_CACHE.stats()
+if disk_stats['启用']:
+    st.caption(f"💾 磁盘缓存：命中 {disk_stats['命中']} 次 / 写入 {disk_stats['写入']} 次，"
+               f"占用 {disk_stats['占用(MB)']:.1f}/{disk_stats['上限(MB)']:.0f} MB")
+shared_stats = SHARED_CURVES.stats()
+st.caption(f"📦 共享预计算曲线：已就绪 {shared_stats['已就绪']}/{shared_stats['总数']} 条，"
+           f"占用 {shared_stats['占用(MB)']:.1f} MB，命中 {shared_stats['命中']} 次 / 未命中 {shared_stats['未命中']} 次"
+           + (f"，{shared_stats['失败']} 条预热失败 (按精确曲线计算)" if shared_stats['失败'] else ""))
+
+# ---------------------- 相邻参数预取 ----------------------
+# 记录最近操作过的控件 (最近的在前)，页面运行结束时在后台预取它们前后 1~2 步的结果；
+# 每次运行都会取消本会话上一轮还没开始的预取，关闭开关时只取消不提交
+PREFETCH_CONTROLS = {  # 参数名 -> (步长, 下限, 上限)，与侧边栏控件一致
+    'base_salary': (500, 0, 100000),
+    'bonus_base_months': (0.5, 0.0, 12.0),
+    'performance_multiplier': (0.1, 0.0, 5.0)
+}
+if 'prefetch_session' not in st.session_state:
+    st.session_state.prefetch_session = uuid.uuid4().hex
+    st.session_state.prefetch_recent_controls = []
+previous_inputs = st.session_state.get('prefetch_last_inputs')
+recent_controls = st.session_state.prefetch_recent_controls
+for control in PREFETCH_CONTROLS:
+    if previous_inputs is not None and previous_inputs[control] != scenario_inputs[control]:
+        if control in recent_controls:
+            recent_controls.remove(control)
+        recent_controls.insert(0, control)
+st.session_state.prefetch_last_inputs = dict(scenario_inputs)
+
+prefetcher = get_prefetcher()
+prefetch_tasks = [
+    (scenario, curve_salary_min, curve_salary_max)
+    for scenario in neighbour_scenarios(scenario_inputs, PREFETCH_CONTROLS, recent_controls)
+] if prefetch_neighbours else []
+prefetch_submitted = prefetcher.schedule(st.session_state.prefetch_session, prefetch_scenario, prefetch_tasks)
+if prefetcher.enabled:
+    prefetch_stats = prefetcher.stats()
+    st.caption(f"🔮 相邻参数预取：本次提交 {prefetch_submitted} 个，累计完成 {prefetch_stats['完成']} 个 / "
+               f"取消 {prefetch_stats['取消']} 个 (每个会话最多排队 {prefetcher.max_tasks} 个)")
+
+# 片段调试面板：列出本次整页运行中各片段的执行情况 (片段局部重跑时在片段内显示)
+if show_fragment_debug:
+    with fragment_debug_panel.container(border=True):
+        st.caption(f"🧩 第 {st.session_state.page_run_id} 次整页运行的片段执行情况"
+                   f"{'' if FRAGMENTS_SUPPORTED else ' (当前 Streamlit 不支持 st.fragment，控件变化时整页重跑)'}")
+        st.dataframe(
+            pd.DataFrame(st.session_state.fragment_log).style.format({'用时(ms)': '{:.1f}'}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+# 性能诊断面板：本次整页运行各部分的用时、内存峰值和会话状态大小 (片段局部重跑的用时在片段内显示)
+if perf_panel_enabled:
+    run_elapsed = time.perf_counter() - perf_run_started
+    traced_peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+    if _perf_started_tracing:
+        tracemalloc.stop()
+    state_sizes = session_state_sizes()
+    
+    with st.container(border=True):
+        st.subheader("⏱️ 性能诊断")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("本次运行用时", f"{run_elapsed * 1000:.0f} ms")
+        col2.metric("内存峰值 (tracemalloc)", "-" if traced_peak is None else f"{traced_peak / 2**20:.1f} MB",
+                    help="进程级统计：其他会话同时运行时会计入它们的分配；开启跟踪本身会让运行变慢")
+        col3.metric("session_state 大小", f"{sum(state_sizes.values()) / 1024:.1f} KB")
+        
+        st.dataframe(
+            pd.DataFrame(st.session_state.perf_log).style.format({'用时(ms)': '{:.1f}'}),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption("会话状态中最大的几项")
+        largest = sorted(state_sizes.items(), key=lambda item: item[1], reverse=True)[:8]
+        st.dataframe(
+            pd.DataFrame([(key, size / 1024) for key, size in largest], columns=['键', '大小(KB)'])
+            .style.format({'大小(KB)': '{:.1f}'}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+# 记录整页运行耗时并按 SALARY_METRICS_FILE / SALARY_METRICS_PORT 导出指标
+RERUN_SECONDS.observe(time.perf_counter() - perf_run_started, app='salary_optimizer_v2')
+export_metrics()
+
+# 首次页面运行结束时打印各模块导入耗时 (SALARY_IMPORT_REPORT=1 时)
+print_import_report()
@@ -0,0 +1,331 @@
+"""两个 Streamlit 应用的端到端重跑延迟测试：不开浏览器，用 streamlit.testing 的 AppTest 按脚本操作控件
+
+每个操作 (拖动滑块、切换城市、连续记录 10 条历史、开关对比分析) 触发一次整页重跑，记录：
+重跑耗时 (p50/p95/p99)、峰值内存 (tracemalloc) 和图表载荷大小 (Plotly spec 与 matplotlib 图片字节数)。
+--sessions 可模拟同一服务进程内的多个并发会话 (每个会话一个线程，计算缓存和共享曲线在会话间共享)，
+观察重跑延迟随用户数的变化：
+
+    python salary_rerun_harness.py                          # 两个应用，单会话
+    python salary_rerun_harness.py --app v2 --sessions 1 4 8
+    python salary_rerun_harness.py --rounds 3 --output rerun_results.json
+
+注意：AppTest 只做整页重跑，不执行 st.fragment 的局部重跑；tracemalloc 会让耗时偏高，纯计时可加 --no-memory。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+from streamlit.runtime import Runtime
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APPS = {
+    'v2': 'salary_optimizer_v2.py',
+    'app': 'salary_app.py'
+}
+RUN_TIMEOUT_SECONDS = 120
+DRAG_POSITIONS = 10  # 一次拖动经过的滑块位置数 (每个位置一次重跑)
+HISTORY_ENTRIES = 10
+PERCENTILES = (50, 95, 99)
+
+# ---------------------- 对 Streamlit 的替换 ----------------------
+# 以下三处替换只在 streamlit_patches() 的 with 块内生效，退出时恢复 Streamlit 的原实现
+
+# 服务进程中所有会话共用一份 ScriptCache，脚本只编译一次；AppTest 每次重跑都新建 ScriptCache 重新编译，
+# 多个线程同时编译还会触发 CPython 3.11 的 AST 线程安全问题。这里让所有会话共用同一份字节码，与服务端一致
+_SHARED_BYTECODE = {}
+_BYTECODE_LOCK = threading.Lock()
+_original_get_bytecode = ScriptCache.get_bytecode
+
+def _shared_get_bytecode(self, script_path):
+    with _BYTECODE_LOCK:
+        if script_path not in _SHARED_BYTECODE:
+            _SHARED_BYTECODE[script_path] = _original_get_bytecode(self, script_path)
+        return _SHARED_BYTECODE[script_path]
+
+# 服务进程只有一个 Runtime；AppTest 每次重跑开始时设置全局 Runtime、结束时清空，并发会话会互相清掉对方正在用的。
+# 全局 Runtime 被清空后沿用最近一次设置的 (媒体文件按内容寻址，会话共用不影响结果)
+_last_runtime = None
+
+def _current_runtime():
+    global _last_runtime
+    if Runtime._instance is not None:
+        _last_runtime = Runtime._instance
+    return _last_runtime
+
+def _shared_runtime_instance(cls):
+    runtime = _current_runtime()
+    if runtime is None:
+        raise RuntimeError("Runtime hasn't been created!")
+    return runtime
+
+def _shared_runtime_exists(cls):
+    return _current_runtime() is not None
+
+# st.pyplot 的图片存放在媒体文件存储里，页面上只有 URL；按文件 id 记下每张图片的字节数
+_MEDIA_SIZES = {}
+_original_load_and_get_id = MemoryMediaFileStorage.load_and_get_id
+
+def _recording_load_and_get_id(self, path_or_data, mimetype, kind, filename=None):
+    file_id = _original_load_and_get_id(self, path_or_data, mimetype, kind, filename)
+    if isinstance(path_or_data, bytes):
+        _MEDIA_SIZES[file_id] = len(path_or_data)
+    return file_id
+
+_PATCHES = [
+    (ScriptCache, 'get_bytecode', _shared_get_bytecode),
+    (Runtime, 'instance', classmethod(_shared_runtime_instance)),
+    (Runtime, 'exists', classmethod(_shared_runtime_exists)),
+    (MemoryMediaFileStorage, 'load_and_get_id', _recording_load_and_get_id)
+]
+
+@contextmanager
+def streamlit_patches():
+    """在 with 块内安装上述替换 (共用字节码、共用 Runtime、记录图片字节数)，退出时恢复原实现并清空记录"""
+    global _last_runtime
+    originals = [(owner, name, owner.__dict__[name]) for owner, name, _ in _PATCHES]
+    for owner, name, replacement in _PATCHES:
+        setattr(owner, name, replacement)
+    try:
+        yield
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+        _SHARED_BYTECODE.clear()
+        _MEDIA_SIZES.clear()
+        _last_runtime = None
+
+# ---------------------- 图表载荷 ----------------------
+def _walk(node):
+    yield node
+    for child in getattr(node, 'children', {}).values():
+        yield from _walk(child)
+
+def figure_payload_bytes(at):
+    """本次重跑页面上所有图表的载荷：Plotly 图为 spec JSON 长度，matplotlib 图为 PNG 字节数"""
+    total = 0
+    for node in _walk(at._tree):
+        kind = getattr(node, 'type', None)
+        if kind == 'plotly_chart':
+            total += len(node.proto.spec)
+        elif kind == 'image':
+            for img in node.proto.imgs:
+                file_id = os.path.splitext(os.path.basename(img.url))[0]
+                total += _MEDIA_SIZES.get(file_id, 0)
+    return total
+
+# ---------------------- 操作脚本 ----------------------
+# 每个操作是一个生成器：修改一次控件就 yield 一次，由调用方执行重跑并计时；控件每次都从最新的页面树里取
+def _widget(at, kind, label):
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"页面上没有 {kind} 控件 {label!r}")
+
+def drag(kind, label, positions=DRAG_POSITIONS):
+    """把滑块从最小值拖到最大值，经过 positions 个位置"""
+    def steps(at):
+        widget = _widget(at, kind, label)
+        cast = type(widget.value)
+        for value in np.linspace(widget.min, widget.max, positions):
+            value = round(round(value / widget.step) * widget.step, 6)
+            _widget(at, kind, label).set_value(cast(value))
+            yield
+    return steps
+
+def nudge(label, clicks=5):
+    """连续点击数字输入框的 + 号 clicks 次"""
+    def steps(at):
+        for _ in range(clicks):
+            _widget(at, 'number_input', label).increment()
+            yield
+    return steps
+
+def cycle_options(label):
+    """依次切换到下拉框的每个选项，最后回到第一个"""
+    def steps(at):
+        options = _widget(at, 'selectbox', label).options
+        for option in options[1:] + options[:1]:
+            _widget(at, 'selectbox', label).set_value(option)
+            yield
+    return steps
+
+def click(label, times):
+    def steps(at):
+        for _ in range(times):
+            _widget(at, 'button', label).click()
+            yield
+    return steps
+
+def switch_on_off(label):
+    """勾选复选框后再取消"""
+    def steps(at):
+        for value in (True, False):
+            _widget(at, 'checkbox', label).set_value(value)
+            yield
+    return steps
+
+SCENARIOS = {
+    'v2': [
+        ('拖动: 绩效系数', drag('slider', '绩效系数')),
+        ('拖动: 基本月数', drag('slider', '基本月数')),
+        ('调整: 基本工资', nudge('基本工资 (元)')),
+        ('切换城市', cycle_options('选择城市预设')),
+        (f'记录 {HISTORY_ENTRIES} 条历史', click('💾 记录当前方案', HISTORY_ENTRIES)),
+        ('开关对比分析', switch_on_off('启用对比分析')),
+    ],
+    'app': [
+        ('拖动: 月度税前工资', drag('slider', '月度税前工资 (元)')),
+        ('拖动: 年终奖月数', drag('slider', '年终奖 (月数)')),
+        ('切换城市', cycle_options('选择城市 (快速设置基数)')),
+        ('开关对比分析', switch_on_off('启用对比分析')),
+    ]
+}
+
+# ---------------------- 运行 ----------------------
+def _timed_run(at, trace_memory):
+    """执行一次重跑，返回 (耗时秒数, 峰值内存字节数或 None)"""
+    if trace_memory:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    at.run(timeout=RUN_TIMEOUT_SECONDS)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if at.exception:
+        raise RuntimeError(f"应用运行出错: {at.exception[0].value}")
+    if not at.main.children:
+        raise RuntimeError("应用没有输出任何内容 (脚本未能执行)")
+    return elapsed, peak
+
+def run_session(app, session_id, rounds=1, trace_memory=True):
+    """一个会话：首次加载后按脚本依次操作 rounds 轮，返回每次重跑的记录 (在 streamlit_patches() 内调用)"""
+    at = AppTest.from_file(os.path.join(APP_DIR, APPS[app]), default_timeout=RUN_TIMEOUT_SECONDS)
+    samples = []
+    
+    def record(step, elapsed, peak):
+        samples.append({
+            'app': app,
+            'session': session_id,
+            'step': step,
+            'seconds': elapsed,
+            'peak_bytes': peak,
+            'figure_bytes': figure_payload_bytes(at)
+        })
+    
+    record('首次加载', *_timed_run(at, trace_memory))
+    for _ in range(rounds):
+        for step, steps in SCENARIOS[app]:
+            for _ in steps(at):
+                record(step, *_timed_run(at, trace_memory))
+    return samples
+
+def run_concurrent(app, sessions, rounds=1, trace_memory=True):
+    """在同一进程中并发运行 sessions 个会话 (各占一个线程，同时开始)，返回全部重跑记录
+    
+    多会话时各重跑的内存峰值互相重叠，只统计整段运行的进程峰值。
+    """
+    with streamlit_patches():
+        if sessions == 1:
+            return run_session(app, 0, rounds, trace_memory)
+        return _run_threads(app, sessions, rounds, trace_memory)
+
+def _run_threads(app, sessions, rounds, trace_memory):
+    barrier = threading.Barrier(sessions)
+    results, errors = [None] * sessions, []
+    
+    def worker(session_id):
+        try:
+            barrier.wait()
+            results[session_id] = run_session(app, session_id, rounds, trace_memory=False)
+        except Exception as exc:
+            errors.append(exc)
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(sessions)]
+    if trace_memory:
+        tracemalloc.reset_peak()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    samples = [sample for session_samples in results for sample in session_samples]
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        for sample in samples:
+            sample['peak_bytes'] = peak
+    return samples
+
+# ---------------------- 统计 ----------------------
+def summarize(samples):
+    """按操作汇总：次数、p50/p95/p99 耗时、峰值内存和平均图表载荷；最后一行为全部重跑"""
+    steps = list(dict.fromkeys(sample['step'] for sample in samples))
+    groups = [(step, [s for s in samples if s['step'] == step]) for step in steps] + [('全部重跑', samples)]
+    summary = []
+    for step, group in groups:
+        seconds = np.array([s['seconds'] for s in group])
+        peaks = [s['peak_bytes'] for s in group if s['peak_bytes'] is not None]
+        row = {'step': step, 'count': len(group)}
+        row.update({f'p{q}_ms': float(np.percentile(seconds, q) * 1000) for q in PERCENTILES})
+        row['max_ms'] = float(seconds.max() * 1000)
+        row['peak_mb'] = max(peaks) / 2**20 if peaks else None
+        row['figure_kb'] = float(np.mean([s['figure_bytes'] for s in group]) / 1024)
+        summary.append(row)
+    return summary
+
+def print_summary(title, summary, log=print):
+    log(f"\n{title}")
+    log(f"{'操作':<22}{'次数':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'最大(ms)':>10}"
+        f"{'峰值内存(MB)':>14}{'图表载荷(KB)':>14}")
+    for row in summary:
+        peak = '-' if row['peak_mb'] is None else f"{row['peak_mb']:.1f}"
+        log(f"{row['step']:<22}{row['count']:>6}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+            f"{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}{peak:>14}{row['figure_kb']:>14.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit 应用端到端重跑延迟测试 (无浏览器)")
+    parser.add_argument('--app', choices=['v2', 'app', 'all'], default='all',
+                        help="v2 = salary_optimizer_v2.py，app = salary_app.py")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1], help="并发会话数，可给多个值比较扩展性")
+    parser.add_argument('--rounds', type=int, default=1, help="每个会话把操作脚本重复几轮")
+    parser.add_argument('--no-memory', action='store_true', help="不用 tracemalloc 统计内存 (计时更准)")
+    parser.add_argument('--output', help="把原始记录和汇总保存为 JSON")
+    args = parser.parse_args(argv)
+    
+    trace_memory = not args.no_memory
+    if trace_memory:
+        tracemalloc.start()
+    apps = list(APPS) if args.app == 'all' else [args.app]
+    report = []
+    for app in apps:
+        for sessions in args.sessions:
+            started = time.perf_counter()
+            samples = run_concurrent(app, sessions, args.rounds, trace_memory)
+            summary = summarize(samples)
+            print_summary(f"{APPS[app]}：{sessions} 个并发会话，{len(samples)} 次重跑，"
+                          f"用时 {time.perf_counter() - started:.1f} 秒", summary)
+            report.append({'app': APPS[app], 'sessions': sessions, 'summary': summary, 'samples': samples})
+    
+    if len(args.sessions) > 1:
+        print("\n并发扩展性 (全部重跑)：")
+        for entry in report:
+            overall = entry['summary'][-1]
+            print(f"{entry['app']:<26}{entry['sessions']:>4} 会话  p50 {overall['p50_ms']:8.1f} ms  "
+                  f"p95 {overall['p95_ms']:8.1f} ms  p99 {overall['p99_ms']:8.1f} ms")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""测试直接从仓库根目录导入 salary_core 等模块；不读写磁盘缓存"""
+import os
+import sys
+
+os.environ.setdefault('SALARY_DISK_CACHE_MAX_MB', '0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
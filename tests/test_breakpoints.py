@@ -0,0 +1,59 @@
+"""按解析断点生成的精确曲线与密集网格上的逐点计算一致"""
+import numpy as np
+import pytest
+
+from salary_core import calculate_scenarios_batch, find_salary_breakpoints, generate_breakpoint_data
+
+CASES = [
+    # (基本工资, 绩效工资, 年终奖月数, 绩效系数, 社保基数, 公积金基数, 专项附加扣除, 年终奖含绩效, 城市)
+    (20000, 3000, 1.0, 1.5, 4775, 2520, 0, True, None),
+    (15000, 5000, 3.0, 2.0, 30000, 0, 2000, False, None),
+    (23000, 0, 2.0, 1.0, 4775, 2520, 1000, True, '北京'),
+    (30000, 10000, 0.0, 1.0, 35000, 35000, 0, True, '上海')
+]
+SALARY_MIN, SALARY_MAX = 5000, 100000
+# 精确曲线的列 -> 由逐点计算结果得到该列的方式
+COLUMNS = {
+    '税后年收入': lambda direct: direct['税后年收入'],
+    '月度个税': lambda direct: direct['个人所得税'] / 12,
+    '月度社保公积金': lambda direct: direct['社保公积金(年)'] / 12,
+    '税前月收入': lambda direct: direct['月度总工资']
+}
+
+def _dense_grid(salary_min, salary_max):
+    # 偏开整数，网格点不会恰好落在断点上
+    return np.arange(salary_min + 0.37, salary_max, 3.0)
+
+def _direct(case, salary):
+    base, perf, months, multiplier, ss, hf, deductions, include_perf, city = case
+    share = salary / (base + perf)
+    return calculate_scenarios_batch(base * share, perf * share, months, multiplier, ss, hf,
+                                     deductions, include_perf, city=city)
+
+@pytest.mark.parametrize('case', CASES)
+def test_exact_curve_interpolates_dense_grid(case):
+    exact = generate_breakpoint_data(*case[:8], SALARY_MIN, SALARY_MAX, city=case[8])
+    vertices = exact['月薪'].to_numpy()
+    assert np.all(np.diff(vertices) >= 0)
+
+    grid = _dense_grid(SALARY_MIN, SALARY_MAX)
+    direct = _direct(case, grid)
+    # 相邻两个不同月薪的顶点之间线性：左端取该月薪的最后一行 (右极限)，右端取下一月薪的第一行 (左极限)
+    hi = np.searchsorted(vertices, grid, side='right')
+    lo = hi - 1
+    weight = (grid - vertices[lo]) / (vertices[hi] - vertices[lo])
+    for column, expected in COLUMNS.items():
+        values = exact[column].to_numpy()
+        interpolated = values[lo] + weight * (values[hi] - values[lo])
+        np.testing.assert_allclose(interpolated, expected(direct), rtol=0, atol=1e-6, err_msg=column)
+
+@pytest.mark.parametrize('case', CASES)
+def test_breakpoints_cover_every_jump_on_the_grid(case):
+    """密集网格上边际税率或年终奖个税变化的每个区间内都有一个解析断点"""
+    breakpoints = find_salary_breakpoints(*case[:8], SALARY_MIN, SALARY_MAX, city=case[8])['月薪'].to_numpy()
+    grid = _dense_grid(SALARY_MIN, SALARY_MAX)
+    direct = _direct(case, grid)
+    bonus_rate = direct['年终奖个税'].to_numpy() / np.maximum(direct['年终奖金额'].to_numpy(), 1)
+    changed = (np.diff(direct['边际税率'].to_numpy()) != 0) | ~np.isclose(np.diff(bonus_rate), 0, atol=1e-3)
+    for left, right in zip(grid[:-1][changed], grid[1:][changed]):
+        assert np.any((breakpoints > left) & (breakpoints <= right)), (left, right)
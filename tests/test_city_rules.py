@@ -0,0 +1,37 @@
+"""城市社保公积金规则：缴费基数按北京的上下限夹取、失业保险按北京比例，与手算结果一致"""
+import numpy as np
+import pytest
+
+from salary_core import calculate_social_security
+
+# 北京：社保基数 6326~33891，公积金基数 2770~33891；养老 8%、医疗 2%、失业 0.5%、公积金 5%
+# 申报基数 35000 高于封顶，封顶取 33891
+@pytest.mark.parametrize('monthly_salary, ss_base, hf_base, expected', [
+    # 月薪低于下限：社保按 6326、公积金按 2770 缴纳
+    (2000, 35000, 35000, {'养老保险': 506.08, '医疗保险': 126.52, '失业保险': 31.63, '公积金': 138.5}),
+    # 月薪在区间内：按月薪缴纳
+    (20000, 35000, 35000, {'养老保险': 1600.0, '医疗保险': 400.0, '失业保险': 100.0, '公积金': 1000.0}),
+    # 月薪高于封顶：按 33891 缴纳
+    (50000, 35000, 35000, {'养老保险': 2711.28, '医疗保险': 677.82, '失业保险': 169.455, '公积金': 1694.55}),
+    # 申报基数低于下限时抬到下限；公积金基数为 0 表示不缴纳
+    (20000, 4775, 0, {'养老保险': 506.08, '医疗保险': 126.52, '失业保险': 31.63, '公积金': 0.0})
+])
+def test_beijing_matches_hand_computed_values(monthly_salary, ss_base, hf_base, expected):
+    monthly_total = sum(expected.values())
+    for salary in (monthly_salary, np.array([monthly_salary], dtype=float)):
+        monthly_ss, annual_ss, detail = calculate_social_security(salary, ss_base, hf_base, city='北京')
+        for item, value in expected.items():
+            assert np.asarray(detail[item]).item() == pytest.approx(value, abs=1e-9), (salary, item)
+        assert np.asarray(monthly_ss).item() == pytest.approx(monthly_total, abs=1e-9)
+        assert np.asarray(annual_ss).item() == pytest.approx(monthly_total * 12, abs=1e-9)
+
+def test_per_row_city_array_mixed_with_none():
+    """逐行城市数组中 None 的行按 min(申报基数, 月薪) 和税务规则的默认比例 (失业 0.2%) 计算"""
+    salary = np.array([2000.0, 2000.0, 50000.0, 50000.0])
+    city = np.array(['北京', None, '北京', None], dtype=object)
+    monthly_ss, annual_ss, detail = calculate_social_security(salary, 35000, 35000, city=city)
+
+    np.testing.assert_allclose(detail['失业保险'], [31.63, 4.0, 169.455, 70.0], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(detail['公积金'], [138.5, 100.0, 1694.55, 1750.0], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(monthly_ss, [802.73, 304.0, 5253.105, 5320.0], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(annual_ss, monthly_ss * 12, rtol=0, atol=1e-9)
@@ -0,0 +1,46 @@
+"""年终奖死区的解析解与逐元穷举一致"""
+import numpy as np
+
+from salary_core import calculate_bonus_dead_zones, calculate_tax_bonus, check_bonus_dead_zone
+
+# 覆盖全部档位上限 (最高 960000) 之后的一段，步长 1 元
+BONUS_GRID = np.arange(0.0, 1_200_000.0, 1.0)
+
+def _brute_force():
+    """多发反而少拿：税后金额低于任何更少年终奖的税后金额；返回 (是否在死区, 相对之前最高税后的损失)"""
+    net = BONUS_GRID - calculate_tax_bonus(BONUS_GRID)
+    best_before = np.concatenate([[-np.inf], np.maximum.accumulate(net)[:-1]])
+    return net < best_before - 1e-6, np.maximum(best_before - net, 0), np.abs(net - best_before) < 1e-6
+
+def test_dead_zones_match_brute_force():
+    in_zone, loss, ambiguous = _brute_force()
+    check = check_bonus_dead_zone(BONUS_GRID, 1, 1)
+    np.testing.assert_array_equal(check['处于死区'].to_numpy()[~ambiguous], in_zone[~ambiguous])
+    np.testing.assert_allclose(check['税后损失'].to_numpy()[in_zone], loss[in_zone], rtol=0, atol=1e-6)
+    np.testing.assert_allclose(check['可少发金额'].to_numpy()[in_zone],
+                               BONUS_GRID[in_zone] - check['死区起点'].to_numpy()[in_zone], rtol=0, atol=0)
+
+def test_dead_zone_bounds_and_max_loss():
+    zones = calculate_bonus_dead_zones()
+    start, end = zones['死区起点'].to_numpy(), zones['死区终点'].to_numpy()
+    assert np.all(start < end) and np.all(end[:-1] < start[1:])
+
+    def net(bonus):
+        return bonus - calculate_tax_bonus(bonus)
+
+    # 死区两端税后相等；刚越过起点时的损失即最大损失
+    np.testing.assert_allclose(net(start), net(end), rtol=0, atol=1e-6)
+    np.testing.assert_allclose(net(start) - net(np.nextafter(start, np.inf)), zones['最大税后损失'], rtol=0, atol=1e-6)
+
+    in_zone, _, _ = _brute_force()
+    edges = np.flatnonzero(np.diff(in_zone.astype(int)))
+    np.testing.assert_allclose(BONUS_GRID[edges[::2]], np.floor(start), atol=1)
+    np.testing.assert_allclose(BONUS_GRID[edges[1::2] + 1], np.ceil(end), atol=1)
+
+def test_scaled_by_bonus_base():
+    """同一年终奖拆成 基数 × 月数 × 绩效系数 时，死区判断只取决于年终奖金额；系数起点为不落入死区的最大系数"""
+    check = check_bonus_dead_zone([20000, 20000, 20000], [2.0, 2.0, 1.0], [0.95, 0.9, 1.0])
+    assert check['处于死区'].tolist() == [True, False, False]
+    start_factor = check['系数起点'].iloc[0]
+    assert start_factor * 20000 == check['死区起点'].iloc[0] == 36000
+    assert not check_bonus_dead_zone(20000, 1.0, start_factor)['处于死区'].iloc[0]
@@ -0,0 +1,59 @@
+"""磁盘结果缓存：往返命中、按修改时间淘汰、损坏文件按未命中处理并删除、规则指纹变化后旧条目失效"""
+import os
+import stat
+
+import numpy as np
+
+from salary_core import DiskCache, rules_fingerprint
+
+def test_round_trip_hit(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache'), 10**6, 'fp')
+    value = {'税后年收入': np.arange(5, dtype=float), '城市': '北京'}
+    assert cache.get(('k', 1.0)) == (False, None)
+    cache.put(('k', 1.0), value)
+
+    hit, loaded = DiskCache(str(tmp_path / 'cache'), 10**6, 'fp').get(('k', 1.0))
+    assert hit and loaded['城市'] == '北京'
+    np.testing.assert_array_equal(loaded['税后年收入'], value['税后年收入'])
+    assert cache.stats()['写入'] == 1 and cache.stats()['未命中'] == 1
+    if os.name != 'nt':
+        assert stat.S_IMODE(os.stat(tmp_path / 'cache').st_mode) & 0o077 == 0
+
+def test_eviction_by_mtime_under_byte_budget(tmp_path):
+    cache = DiskCache(str(tmp_path), 7000, 'fp')
+    payload = os.urandom(2000)  # 不可压缩，每个文件约 2 KB，上限内最多容纳三个
+    for i, key in enumerate('abc'):
+        cache.put(key, payload)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    assert cache.get('a')[0]  # 命中刷新修改时间，b 成为最久未用
+
+    cache.put('d', payload)
+    assert cache.evictions == 1
+    assert not os.path.exists(cache._path('b'))
+    assert all(os.path.exists(cache._path(key)) for key in 'acd')
+
+def test_truncated_or_corrupt_file_is_a_miss_and_removed(tmp_path):
+    cache = DiskCache(str(tmp_path), 10**6, 'fp')
+    for key, damage in (('truncated', lambda data: data[:len(data) // 2]), ('corrupt', lambda data: b'not zlib')):
+        cache.put(key, list(range(1000)))
+        path = cache._path(key)
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(damage(data))
+
+        assert cache.get(key) == (False, None)
+        assert not os.path.exists(path)
+        assert cache.get_or_compute(key, lambda: 'recomputed') == 'recomputed'
+        assert cache.get(key) == (True, 'recomputed')
+    assert cache.stats()['错误'] == 2
+
+def test_rules_fingerprint_change_invalidates_entries(tmp_path):
+    rules = tmp_path / 'rules.json'
+    rules.write_text('{"basic_deduction": 60000}', encoding='utf-8')
+    directory = str(tmp_path / 'cache')
+    DiskCache(directory, 10**6, rules_fingerprint([rules])).put('k', 'old')
+    assert DiskCache(directory, 10**6, rules_fingerprint([rules])).get('k') == (True, 'old')
+
+    rules.write_text('{"basic_deduction": 72000}', encoding='utf-8')
+    assert DiskCache(directory, 10**6, rules_fingerprint([rules])).get('k') == (False, None)
@@ -0,0 +1,37 @@
+"""指标导出：Prometheus 文本格式的 HELP/TYPE 行、带标签的累计直方图桶，以及 collector 样本的合并"""
+from salary_core import MetricsRegistry
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    latency = registry.histogram('page_seconds', "页面耗时 (秒)", buckets=(1.0, 0.1))
+    for value in (0.05, 0.1, 0.5, 5.0):  # 恰好等于桶上限的观测计入该桶 (le 为闭区间)
+        latency.observe(value, page='main')
+    latency.observe(0.5, page='detail')
+    runs = registry.counter('runs_total', "运行次数")
+    runs.inc(page='main')
+    runs.inc(2, page='main')
+    assert registry.counter('runs_total', "另一个说明") is runs
+    registry.gauge('rows_per_second', "吞吐").set(12.5)
+    registry.register_collector(lambda: [('runs_total', 'counter', "运行次数", [({'page': 'a"b'}, 4)])])
+
+    assert registry.render().splitlines() == [
+        '# HELP page_seconds 页面耗时 (秒)',
+        '# TYPE page_seconds histogram',
+        'page_seconds_bucket{page="main",le="0.1"} 2',
+        'page_seconds_bucket{page="main",le="1.0"} 3',
+        'page_seconds_bucket{page="main",le="+Inf"} 4',
+        'page_seconds_sum{page="main"} 5.65',
+        'page_seconds_count{page="main"} 4',
+        'page_seconds_bucket{page="detail",le="0.1"} 0',
+        'page_seconds_bucket{page="detail",le="1.0"} 1',
+        'page_seconds_bucket{page="detail",le="+Inf"} 1',
+        'page_seconds_sum{page="detail"} 0.5',
+        'page_seconds_count{page="detail"} 1',
+        '# HELP runs_total 运行次数',
+        '# TYPE runs_total counter',
+        'runs_total{page="main"} 3',
+        'runs_total{page="a\\"b"} 4',
+        '# HELP rows_per_second 吞吐',
+        '# TYPE rows_per_second gauge',
+        'rows_per_second 12.5'
+    ]
@@ -0,0 +1,87 @@
+"""固定年薪总包的月薪/年终奖最优拆分与按 1 元步长穷举月薪的结果一致"""
+import numpy as np
+import pytest
+
+from salary_core import (
+    calculate_social_security, calculate_tax_bonus, calculate_tax_salary, optimize_package_split,
+    optimize_package_split_batch
+)
+
+# 税后收入关于月薪的斜率不超过 12 (每月多 1 元、年终奖少 12 元)，网格最优与精确最优之差不超过 12 元
+GRID_SLACK = 12.0
+
+def _after_tax(package, salary, ss_base, hf_base, deductions=0, city=None):
+    """逐点计算：月薪 salary 发 12 个月，其余作为年终奖"""
+    _, annual_ss, _ = calculate_social_security(salary, ss_base, hf_base, city=city)
+    salary_tax = calculate_tax_salary(np.maximum(0, salary * 12 - 60000 - annual_ss - deductions * 12))
+    bonus = package - 12 * salary
+    bonus_tax = np.where(bonus > 0, calculate_tax_bonus(np.maximum(bonus, 0)), 0.0)
+    return package - annual_ss - salary_tax - bonus_tax
+
+def _brute_force(package, ss_base, hf_base, deductions=0, min_monthly_salary=0, city=None):
+    low = min(min_monthly_salary, package / 12)
+    salary = np.append(np.arange(np.ceil(low), package / 12, 1.0), package / 12)
+    return salary, _after_tax(package, salary, ss_base, hf_base, deductions, city)
+
+CASES = [
+    # (年薪总包, 社保基数, 公积金基数, 专项附加扣除, 月薪下限, 城市)
+    (300_000, 4775, 2520, 0, 0, None),
+    (500_000, 35000, 35000, 1000, 5000, None),
+    (1_000_000, 10000, 0, 0, 0, None),
+    (2_000_000, 4775, 2520, 3000, 20000, '北京'),
+    (180_000, 4775, 2520, 0, 10000, '上海')
+]
+
+@pytest.mark.parametrize('case', CASES)
+def test_optimum_matches_brute_force(case):
+    package, ss, hf, deductions, min_salary, city = case
+    result = optimize_package_split(package, ss, hf, deductions, min_salary, city=city)
+    salary, value = _brute_force(package, ss, hf, deductions, min_salary, city)
+
+    best = result['最优税后年收入']
+    assert -1e-6 <= best - value.max() <= GRID_SLACK
+    assert result['最优月薪'] >= min(min_salary, package / 12)
+    assert result['最优月薪'] + result['最优年终奖'] / 12 == pytest.approx(package / 12)
+    # 推荐方案确实取得最优值
+    assert _after_tax(package, result['最优月薪'], ss, hf, deductions, city) == pytest.approx(best, abs=1e-6)
+
+def test_tied_optimum_interval():
+    """工资和年终奖都在 3% 档、社保封顶时，多发月薪和多发年终奖的税一样，最优是一整段区间"""
+    package, ss, hf = 120_000, 2000, 2000
+    result = optimize_package_split(package, ss, hf)
+    salary, value = _brute_force(package, ss, hf)
+    tied = salary[value >= value.max() - 1e-6]
+
+    (lo, hi), = result['并列最优区间']
+    assert hi - lo > 1000
+    assert result['最优月薪'] == hi
+    assert tied.min() == pytest.approx(lo, abs=1) and tied.max() == pytest.approx(hi, abs=1)
+    assert result['最优税后年收入'] == pytest.approx(value.max(), abs=1e-6)
+
+    batch = optimize_package_split_batch(package, ss, hf)
+    assert batch['最优月薪(最小)'].iloc[0] == pytest.approx(lo) and batch['最优月薪(最大)'].iloc[0] == hi
+
+    # 月薪下限落在并列区间内时，区间从下限开始
+    bounded = optimize_package_split(package, ss, hf, min_monthly_salary=lo + 500)
+    assert bounded['并列最优区间'] == [(lo + 500, hi)]
+    assert bounded['最优税后年收入'] == pytest.approx(result['最优税后年收入'], abs=1e-6)
+
+def test_package_too_small_for_a_bonus():
+    """总包不足 12 个月的月薪下限时，全部按月薪发放，没有年终奖"""
+    result = optimize_package_split(60_000, 4775, 2520, min_monthly_salary=8000)
+    assert result['最优月薪'] == 5000 and result['最优年终奖'] == 0
+    assert result['并列最优区间'] == [(5000.0, 5000.0)]
+    assert result['最优税后年收入'] == pytest.approx(_after_tax(60_000, 5000.0, 4775, 2520), abs=1e-6)
+
+def test_batch_matches_single_calls():
+    rng = np.random.default_rng(5)
+    package = rng.uniform(50_000, 3_000_000, 40).round()
+    ss = rng.choice([4775.0, 35000.0], 40)
+    min_salary = rng.choice([0.0, 8000.0], 40)
+    batch = optimize_package_split_batch(package, ss, 2520, 0, min_salary)
+    for i in range(len(package)):
+        single = optimize_package_split(package[i], ss[i], 2520, 0, min_salary[i])
+        assert batch['最优月薪'].iloc[i] == single['最优月薪']
+        assert batch['最优税后年收入'].iloc[i] == pytest.approx(single['最优税后年收入'], abs=1e-9)
+        _, value = _brute_force(package[i], ss[i], 2520, 0, min_salary[i])
+        assert -1e-6 <= single['最优税后年收入'] - value.max() <= GRID_SLACK
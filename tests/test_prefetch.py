@@ -0,0 +1,49 @@
+"""相邻参数预取：每个会话最多排队 max_tasks 个任务，同一会话的新一轮预取取消上一轮还没开始的任务"""
+import threading
+import time
+
+from salary_core import Prefetcher
+
+def _wait_until_idle(prefetcher, *sessions, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while any(prefetcher.pending(session) for session in sessions):
+        assert time.monotonic() < deadline, "预取任务没有按时完成"
+        time.sleep(0.005)
+
+def test_new_round_cancels_unstarted_tasks_of_the_same_session():
+    prefetcher = Prefetcher(workers=1, max_tasks=3)
+    started, release = threading.Event(), threading.Event()
+    done = []
+
+    def task(name):
+        if name == 'blocking':
+            started.set()
+            release.wait(5)
+        done.append(name)
+
+    # 超出上限的部分直接丢弃；唯一的工作线程卡在第一个任务上，其余任务都还没开始
+    assert prefetcher.schedule('a', task, [('blocking',), ('a1',), ('a2',), ('a3',), ('a4',)]) == 3
+    assert started.wait(5)
+    assert prefetcher.schedule('b', task, [('b1',)]) == 1
+    assert prefetcher.pending('a') == 3
+
+    # 会话 a 的新一轮只取消 a1、a2，正在执行的任务和会话 b 的任务不受影响
+    assert prefetcher.schedule('a', task, [('a5',), ('a6',)]) == 2
+    assert prefetcher.stats()['取消'] == 2 and prefetcher.pending('b') == 1
+
+    release.set()
+    _wait_until_idle(prefetcher, 'a', 'b')
+    assert sorted(done) == ['a5', 'a6', 'b1', 'blocking']
+    assert prefetcher.stats() == {'启用': True, '提交': 6, '完成': 4, '取消': 2, '失败': 0}
+
+def test_cancel_and_disabled_prefetcher():
+    prefetcher = Prefetcher(workers=1, max_tasks=2)
+    started, release = threading.Event(), threading.Event()
+    assert prefetcher.schedule('a', lambda: started.set() or release.wait(5), [(), (), ()]) == 2
+    assert started.wait(5)
+    assert prefetcher.cancel('a') == 1
+    assert prefetcher.cancel('a') == 0
+    release.set()
+
+    disabled = Prefetcher(workers=0)
+    assert not disabled.enabled and disabled.schedule('a', print, [(1,)]) == 0
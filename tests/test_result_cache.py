@@ -0,0 +1,82 @@
+"""结果缓存：参数规范化为同一个键，命中返回的对象与缓存互不影响"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from salary_core import ResultCache, _canonical_param, cached_result
+
+def test_numeric_parameters_share_one_key():
+    keys = {_canonical_param(v) for v in (5000, 5000.0, np.int64(5000), np.float64(5000), np.float32(5000))}
+    assert len(keys) == 1
+    assert _canonical_param([1, np.float64(2.5), '北京', None]) == (1.0, 2.5, '北京', None)
+    assert _canonical_param(np.bool_(True)) is True
+
+def test_arrays_are_keyed_by_dtype_shape_and_content():
+    a = np.arange(6, dtype=float)
+    assert _canonical_param(a) == _canonical_param(a.copy())
+    assert _canonical_param(a) != _canonical_param(a.astype(np.float32))
+    assert _canonical_param(a) != _canonical_param(a.reshape(2, 3))
+    assert _canonical_param(a) != _canonical_param(a + 1)
+    frame = pd.DataFrame({'a': [1, 2], 'b': [3.0, 4.0]})
+    assert _canonical_param(frame) == _canonical_param(frame.copy())
+    assert _canonical_param(frame) != _canonical_param(frame.assign(b=[3.0, 5.0]))
+
+def test_equivalent_calls_hit_one_entry():
+    calls = []
+
+    @cached_result
+    def scenario_for_cache_key_test(salary, months=1.0, city=None):
+        calls.append((salary, months, city))
+        return {'税后': salary * months}
+
+    assert scenario_for_cache_key_test(5000) == {'税后': 5000}
+    assert scenario_for_cache_key_test(5000.0, 1) == {'税后': 5000}
+    assert scenario_for_cache_key_test(np.int64(5000), months=1.0) == {'税后': 5000}
+    assert scenario_for_cache_key_test(salary=5000, city=None) == {'税后': 5000}
+    assert len(calls) == 1
+    scenario_for_cache_key_test(5000, city='北京')
+    assert len(calls) == 2
+    with pytest.raises(TypeError):
+        scenario_for_cache_key_test(months=2.0)
+    with pytest.raises(TypeError):
+        scenario_for_cache_key_test(5000, unknown=1)
+
+def test_cache_hits_do_not_alias():
+    @cached_result
+    def nested_result_for_alias_test(n):
+        return {
+            'values': np.arange(n, dtype=float),
+            'detail': {'养老保险': 1.0, 'items': [1, 2]},
+            'frame': pd.DataFrame({'x': np.arange(n, dtype=float)})
+        }
+
+    first = nested_result_for_alias_test(3)
+    first['values'][0] = 99
+    first['detail']['养老保险'] = 99
+    first['detail']['items'].append(3)
+    first['frame'].loc[0, 'x'] = 99
+    first['extra'] = True
+
+    second = nested_result_for_alias_test(3)
+    second['values'] += 1
+    third = nested_result_for_alias_test(3)
+    for hit in (second, third):
+        assert hit['detail'] == {'养老保险': 1.0, 'items': [1, 2]}
+        assert hit['frame']['x'].tolist() == [0.0, 1.0, 2.0]
+        assert 'extra' not in hit
+    np.testing.assert_array_equal(third['values'], [0.0, 1.0, 2.0])
+
+def test_lru_and_ttl_eviction():
+    cache = ResultCache(max_bytes=10**6, ttl_seconds=3600)
+    payload = np.zeros(50_000)  # 约 400 KB，最多容纳两个
+    for key in 'abc':
+        cache.get_or_compute(key, lambda: payload)
+    assert cache.stats()['条目数'] == 2 and cache.evictions == 1
+    computed = []
+    cache.get_or_compute('a', lambda: computed.append('a') or payload)
+    assert computed == ['a']
+
+    expired = ResultCache(max_bytes=10**6, ttl_seconds=-1)
+    expired.get_or_compute('k', lambda: 1)
+    expired.get_or_compute('k', lambda: computed.append('k') or 1)
+    assert computed[-1] == 'k' and expired.hits == 0
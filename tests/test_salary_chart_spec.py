@@ -0,0 +1,50 @@
+"""FigureSpec 直接组装的 spec 与 go.Figure 校验后的 to_dict() 一致"""
+import copy
+
+import numpy as np
+import pytest
+
+go = pytest.importorskip('plotly.graph_objects')
+
+from salary_chart_spec import FigureSpec, trace_spec
+
+def _build(fig, scatter):
+    """同一组调用分别作用于 FigureSpec 和 go.Figure (参数与 salary_optimizer_v2 中的图表相同)"""
+    salaries = np.arange(5000, 50001, 500, dtype=float)
+    fig.add_trace(scatter(
+        x=salaries, y=salaries * 0.8, mode='lines', name='税后年收入',
+        line=dict(color='#4CAF50', width=3), line_dash='dot', yaxis='y2',
+        hovertemplate='月薪: %{x:,.0f}元<extra></extra>'
+    ))
+    fig.add_trace(scatter(x=[23000], y=[78.5], mode='markers+text', text=['78.5%'], textposition='top center',
+                          marker=dict(size=16, symbol='star', line=dict(width=2, color='white'))))
+    fig.add_hline(y=80, line_dash='dash', line_color='gray', annotation_text='80%', annotation_position='bottom right')
+    fig.add_vrect(x0=36000, x1=38000, fillcolor='red', opacity=0.1, line_width=0,
+                  annotation_text='死区', annotation_position='top left')
+    fig.update_layout(
+        title=dict(text='薪资分析曲线', x=0.5), xaxis_title='月薪 (元)',
+        yaxis=dict(title='收入转化率 (%)', tickfont=dict(color='#333'), range=[60, 100]),
+        yaxis2=dict(title=dict(text='税后年收入', font=dict(size=14)), overlaying='y', side='right'),
+        template='plotly_dark', height=600, hovermode='x unified', paper_bgcolor='#111',
+        legend=dict(orientation='h', y=1.02, font=dict(color='#eee')), margin=dict(t=80, b=80, l=80, r=100)
+    )
+    fig.update_layout(title_font=dict(size=20), showlegend=True)
+    fig.add_annotation(x=0.02, y=1.05, xref='paper', yref='paper', text='💡 收入转化率', showarrow=False)
+    fig.add_vline(x=23000, line_dash='solid', line_width=2, annotation_text='当前月薪: 23,000元',
+                  annotation_position='top right', annotation_font=dict(size=12))
+    return fig
+
+def test_figure_spec_matches_validated_figure():
+    spec = _build(FigureSpec(), lambda **props: trace_spec('scatter', **props)).to_dict()
+    expected = _build(go.Figure(), lambda **props: go.Scatter(**props)).to_dict()
+    assert spec == expected
+
+def test_bar_trace_and_deepcopy():
+    spec = FigureSpec().add_trace(trace_spec('bar', x=['一月', '二月'], y=np.array([1.5, 2.5]), marker_color='#2196F3'))
+    expected = go.Figure().add_trace(go.Bar(x=['一月', '二月'], y=np.array([1.5, 2.5]), marker_color='#2196F3'))
+    assert spec.to_dict() == expected.to_dict()
+
+    clone = copy.deepcopy(spec)
+    clone.add_hline(y=2)
+    assert 'shapes' not in spec.to_dict()['layout']
+    assert clone.to_dict()['layout']['template'] is spec.to_dict()['layout']['template']
@@ -0,0 +1,41 @@
+"""salary_app 收入分析图的渲染缓存"""
+import os
+import warnings
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('PIL')
+
+from salary_figures import FigureRenderer
+
+def test_slider_above_50k_reuses_static_panels():
+    """拖动月薪滑块 (包括超过曲线原范围 50000 的部分) 只渲染一次静态面板，之后每步只渲染饼图"""
+    renderer = FigureRenderer(workers=0)
+    salaries = [45000, 50000, 50500, 60000, 80000, 100000]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # 测试环境缺中文字体时的缺字警告
+        for salary in salaries:
+            png = renderer.render(salary, 1.0, 4775, 2520, 0, None, (salary * 10, salary, salary * 2))
+            assert png.startswith(b'\x89PNG')
+
+    stats = renderer.stats()
+    assert stats['静态面板'] == 1
+    assert stats['命中'] == len(salaries) - 1
+    assert stats['渲染'] == 1 + len(salaries)
+
+def test_broken_pool_is_rebuilt_and_render_falls_back_in_process():
+    """渲染进程意外退出后，本次渲染在当前进程内完成，进程池重建后继续使用"""
+    renderer = FigureRenderer(workers=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            renderer._executor.submit(os._exit, 1).result()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            png = renderer.render(23000, 1.0, 4775, 2520, 0, None, (230000, 23000, 46000))
+        assert png.startswith(b'\x89PNG')
+        assert renderer.stats()['进程池重建'] == 1
+        assert renderer._executor.submit(os.getpid).result() != os.getpid()
+    finally:
+        renderer._executor.shutdown()
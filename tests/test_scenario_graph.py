@@ -0,0 +1,61 @@
+"""增量计算图：任意顺序修改输入后的结果与从头计算一致，且只重算受影响的节点"""
+import numpy as np
+import pandas as pd
+
+from salary_core import ScenarioGraph, calculate_one_scenario, calculate_scenarios_batch
+
+INITIAL = dict(base_salary=20000, performance_salary=3000, bonus_base_months=1.0, performance_multiplier=1.5,
+               ss_base=4775, hf_base=2520, additional_deductions=0, include_performance_in_bonus=True,
+               tax_year=None, city=None)
+CHOICES = {
+    'base_salary': [3000, 20000, 23000.5, 60000, 150000],
+    'performance_salary': [0, 3000, 12000],
+    'bonus_base_months': [0.0, 1.0, 2.5, 6.0],
+    'performance_multiplier': [0.8, 1.0, 1.5, 2.0],
+    'ss_base': [4775, 10000, 35000],
+    'hf_base': [0, 2520, 35000],
+    'additional_deductions': [0, 1000, 3000],
+    'include_performance_in_bonus': [True, False],
+    'city': [None, '北京', '上海']
+}
+
+def test_random_updates_match_fresh_computation():
+    rng = np.random.default_rng(3)
+    graph = ScenarioGraph(**INITIAL)
+    inputs = dict(INITIAL)
+    assert graph.result() == calculate_one_scenario(**inputs)
+    for _ in range(300):
+        names = rng.choice(list(CHOICES), size=rng.integers(1, 3), replace=False)
+        changes = {name: CHOICES[name][rng.integers(len(CHOICES[name]))] for name in names}
+        inputs.update(changes)
+        assert graph.update(**changes).result() == calculate_one_scenario(**inputs), changes
+
+def test_unchanged_inputs_recompute_nothing():
+    graph = ScenarioGraph(**INITIAL)
+    graph.result()
+    assert graph.update(base_salary=20000, city=None).dirty_nodes() == []
+    # 数值相等但类型不同视为修改 (结果的类型随输入)
+    assert graph.update(base_salary=20000.0).dirty_nodes()
+    graph.result()
+    dirty = graph.update(performance_multiplier=2.0).dirty_nodes()
+    assert 'bonus' in dirty and 'social_security' not in dirty and 'salary_tax' not in dirty
+
+def test_batch_graph_matches_batch_computation():
+    rng = np.random.default_rng(4)
+    n = 50
+    inputs = dict(INITIAL, base_salary=rng.uniform(3000, 80000, n).round(),
+                  performance_salary=rng.choice([0.0, 3000.0, 12000.0], n))
+    graph = ScenarioGraph(**inputs)
+    pd.testing.assert_frame_equal(graph.frame(), calculate_scenarios_batch(**inputs))
+    for name, value in [('bonus_base_months', 3.0), ('ss_base', rng.choice([4775.0, 35000.0], n)), ('city', '北京')]:
+        inputs[name] = value
+        pd.testing.assert_frame_equal(graph.update(**{name: value}).frame(), calculate_scenarios_batch(**inputs))
+
+def test_what_if_restores_the_original_input():
+    graph = ScenarioGraph(**INITIAL)
+    before = graph.result()
+    trial = graph.what_if('performance_multiplier', [1.0, 2.0], columns=['税后年收入'])
+    for value in (1.0, 2.0):
+        expected = calculate_one_scenario(**dict(INITIAL, performance_multiplier=value))['税后年收入']
+        assert trial.loc[value, '税后年收入'].iloc[0] == expected
+    assert graph.result() == before
@@ -0,0 +1,35 @@
+"""共享预计算曲线：查询结果与直接精确计算的曲线一致，单个配置预热失败不影响其余配置"""
+import pandas as pd
+
+from salary_core import CURVE_SALARY_MIN, SharedCurveStore, _shared_curve_key, generate_comprehensive_data
+
+CONFIGS = [
+    # (年终奖/月薪, 社保基数, 公积金基数, 城市, 曲线上限)
+    (1.5, 4775, 2520, None, 50000),
+    (2.0, 4775, 2520, '不存在的城市', 50000),
+    (3.0, 6326, 2770, '北京', 50000)
+]
+
+def test_failed_config_is_counted_and_warmup_continues():
+    store = SharedCurveStore(CONFIGS).warm(background=False)
+    stats = store.stats()
+    assert stats['失败'] == 1 and stats['已就绪'] == 2 and stats['总数'] == 3
+    assert stats['预热耗时(秒)'] is not None
+
+def test_lookup_matches_direct_exact_computation():
+    store = SharedCurveStore(CONFIGS).warm(background=False)
+    for args in [
+        # (基本工资, 绩效工资, 年终奖月数, 绩效系数, 社保基数, 公积金基数, 城市)
+        (20000, 3000, 1.0, 1.5, 4775, 2520, None),
+        (8000, 0, 2.0, 1.5, 6326, 2770, '北京')
+    ]:
+        *scenario, ss_base, hf_base, city = args
+        key = _shared_curve_key(*scenario, ss_base, hf_base, 0, True, CURVE_SALARY_MIN, 50000, None, city)
+        shared = store.get(key)
+        assert shared is not None
+        direct = generate_comprehensive_data.uncached(*scenario, ss_base, hf_base, 0, True,
+                                                      salary_min=CURVE_SALARY_MIN, salary_max=50000,
+                                                      exact=True, city=city)
+        pd.testing.assert_frame_equal(shared, direct)
+    assert store.get(_shared_curve_key(20000, 0, 2.0, 1.0, 4775, 2520, 0, True, CURVE_SALARY_MIN, 50000, None,
+                                       '不存在的城市')) is None
@@ -0,0 +1,50 @@
+"""目标到手反推税前工资的解析解与逐元穷举一致"""
+import numpy as np
+import pytest
+
+from salary_core import TARGET_METRICS, calculate_scenarios_batch, solve_base_salary, solve_base_salary_batch
+
+BASE_GRID = np.arange(0.0, 200_000.0, 1.0)
+CASES = [
+    # (绩效工资/基本工资, 年终奖月数, 绩效系数, 社保基数, 公积金基数, 专项附加扣除, 年终奖含绩效, 目标指标, 城市)
+    (0.2, 2.0, 1.5, 4775, 2520, 0, True, '月均到手(含年终奖)', None),
+    (0.5, 3.0, 2.0, 30000, 0, 2000, False, '月均到手(含年终奖)', None),
+    (0.0, 1.0, 1.0, 4775, 2520, 1000, True, '税后年收入', '北京'),
+    (0.3, 0.0, 1.0, 35000, 35000, 0, True, '税后年收入', '上海')
+]
+
+def _first_on_grid(case, targets):
+    """网格上第一个达到目标的基本工资 (逐元计算全部网格点)"""
+    ratio, months, multiplier, ss, hf, deductions, include_perf, metric, city = case
+    take_home = calculate_scenarios_batch(BASE_GRID, BASE_GRID * ratio, months, multiplier, ss, hf, deductions,
+                                          include_perf, city=city)[metric].to_numpy()
+    reached = take_home[None, :] >= np.asarray(targets)[:, None]
+    return BASE_GRID[reached.argmax(axis=1)]
+
+@pytest.mark.parametrize('case', CASES)
+def test_solved_salary_matches_brute_force(case):
+    metric = case[7]
+    scale = 1 if metric == '税后年收入' else 1 / TARGET_METRICS['月均到手(含年终奖)']
+    targets = np.array([60_000, 120_000, 250_000, 400_000, 800_000, 1_500_000]) * scale
+    solved = solve_base_salary_batch(targets, *case[:7], target_metric=metric, city=case[8])
+
+    # 解达到目标，且不晚于网格上第一个达标点、不早于它前一个网格点
+    assert np.all(solved[metric].to_numpy() >= targets - 1e-6)
+    first = _first_on_grid(case, targets)
+    base = solved['所需基本工资'].to_numpy()
+    assert np.all(base <= first + 1e-6)
+    assert np.all(base > first - 1)
+
+def test_target_right_after_bonus_dead_zone():
+    """目标落在年终奖跳档造成的跳降区间时，解跳过整段死区，不会停在跳降前的月薪上"""
+    case = CASES[0]
+    ratio, months, multiplier, ss, hf, deductions, include_perf, metric, _ = case
+    # 年终奖基数 = 月度总工资 = 1.2 × 基本工资；年终奖 = 3 × 月度总工资，在 36000 处跳档
+    jump_base = 36000 / (months * multiplier) / (1 + ratio)
+    before = calculate_scenarios_batch(jump_base, jump_base * ratio, months, multiplier, ss, hf,
+                                       deductions, include_perf)[metric].iloc[0]
+    target = before + 1.0
+    first = _first_on_grid(case, [target])[0]
+    result = solve_base_salary(target, *case[:7], target_metric=metric)
+    assert first - 1 < result['所需基本工资'] <= first + 1e-6
+    assert result['所需基本工资'] > jump_base + 1
@@ -0,0 +1,148 @@
+"""表驱动的个税/社保计算 (标量快速路径与 NumPy 向量路径) 与最初的逐档 if/elif 公式一致"""
+import numpy as np
+import pytest
+
+from salary_core import (
+    calculate_marginal_rate, calculate_one_scenario, calculate_scenarios_batch, calculate_social_security,
+    calculate_tax_bonus, calculate_tax_salary, next_salary_bracket
+)
+
+# ---------------------- 最初版本的公式 (对照用) ----------------------
+def reference_tax_salary(taxable_income):
+    if taxable_income <= 36000:
+        return taxable_income * 0.03
+    elif taxable_income <= 144000:
+        return taxable_income * 0.10 - 2520
+    elif taxable_income <= 300000:
+        return taxable_income * 0.20 - 16920
+    elif taxable_income <= 420000:
+        return taxable_income * 0.25 - 31920
+    elif taxable_income <= 660000:
+        return taxable_income * 0.30 - 52920
+    elif taxable_income <= 960000:
+        return taxable_income * 0.35 - 85920
+    else:
+        return taxable_income * 0.45 - 181920
+
+def reference_tax_bonus(bonus):
+    avg_monthly = bonus / 12
+    if avg_monthly <= 3000:
+        return bonus * 0.03
+    elif avg_monthly <= 12000:
+        return bonus * 0.10 - 210
+    elif avg_monthly <= 25000:
+        return bonus * 0.20 - 1410
+    elif avg_monthly <= 35000:
+        return bonus * 0.25 - 2660
+    elif avg_monthly <= 55000:
+        return bonus * 0.30 - 4410
+    elif avg_monthly <= 80000:
+        return bonus * 0.35 - 7160
+    else:
+        return bonus * 0.45 - 15160
+
+def reference_marginal_rate(taxable_income):
+    for threshold, rate in ((960000, 0.45), (660000, 0.35), (420000, 0.30), (300000, 0.25),
+                            (144000, 0.20), (36000, 0.10)):
+        if taxable_income > threshold:
+            return rate
+    return 0.03
+
+def reference_social_security(monthly_salary, ss_base, hf_base):
+    pension = min(ss_base, monthly_salary) * 0.08
+    medical = min(ss_base, monthly_salary) * 0.02
+    unemployment = min(ss_base, monthly_salary) * 0.002
+    housing_fund = min(hf_base, monthly_salary) * 0.05 if hf_base > 0 else 0
+    monthly_ss = pension + medical + unemployment + housing_fund
+    return monthly_ss, monthly_ss * 12
+
+def reference_scenario(base_salary, performance_salary, bonus_base_months, performance_multiplier,
+                       ss_base, hf_base, additional_deductions=0, include_performance_in_bonus=True):
+    monthly_salary = base_salary + performance_salary
+    annual_salary = monthly_salary * 12
+    bonus_base = monthly_salary if include_performance_in_bonus else base_salary
+    bonus = bonus_base * bonus_base_months * performance_multiplier
+    _, annual_ss = reference_social_security(monthly_salary, ss_base, hf_base)
+    total_income = annual_salary + bonus
+    taxable_income = max(0, annual_salary - 60000 - annual_ss - additional_deductions * 12)
+    total_tax = reference_tax_salary(taxable_income) + (reference_tax_bonus(bonus) if bonus > 0 else 0)
+    after_tax_income = total_income - annual_ss - total_tax
+    return {
+        '年终奖金额': bonus,
+        '税前年收入': total_income,
+        '社保公积金(年)': annual_ss,
+        '应纳税所得额': taxable_income,
+        '个人所得税': total_tax,
+        '税后年收入': after_tax_income,
+        '收入转化率': after_tax_income / total_income if total_income > 0 else 0,
+        '边际税率': reference_marginal_rate(taxable_income)
+    }
+
+# 各档位上限及其两侧、0 和远超最高档的值
+SALARY_UPPERS = [36000, 144000, 300000, 420000, 660000, 960000]
+TAXABLE_VALUES = [0.0, 1.0, 35999.99, 2e6] + [u + d for u in SALARY_UPPERS for d in (-0.01, 0.0, 0.01)]
+BONUS_VALUES = [0.0, 1.0, 5e6] + [u * 12 + d for u in (3000, 12000, 25000, 35000, 55000, 80000)
+                                  for d in (-0.01, 0.0, 0.01)]
+
+@pytest.mark.parametrize('value', TAXABLE_VALUES)
+def test_salary_tax_and_marginal_rate_match_reference(value):
+    assert calculate_tax_salary(value) == pytest.approx(reference_tax_salary(value), abs=1e-9)
+    assert calculate_marginal_rate(value) == reference_marginal_rate(value)
+
+@pytest.mark.parametrize('value', BONUS_VALUES)
+def test_bonus_tax_matches_reference(value):
+    assert calculate_tax_bonus(value) == pytest.approx(reference_tax_bonus(value), abs=1e-9)
+
+@pytest.mark.parametrize('value, expected', [
+    (0.0, (0.10, 36000.0)), (36000.0, (0.10, 0.0)), (36000.01, (0.20, 107999.99)),
+    (188643.0, (0.25, 111357.0)), (960000.0, (0.45, 0.0)), (960000.01, None), (2e6, None)
+])
+def test_next_salary_bracket(value, expected):
+    result = next_salary_bracket(value)
+    if expected is None:
+        assert result is None
+    else:
+        assert result[0] == expected[0] and result[1] == pytest.approx(expected[1], abs=1e-6)
+        # 补足差额后恰好到达档位上限，再多 1 分即适用下一档税率
+        assert calculate_marginal_rate(value + result[1] + 0.01) == expected[0]
+
+def test_vectorized_tax_matches_scalar_path():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([TAXABLE_VALUES, BONUS_VALUES, rng.uniform(0, 2e6, 2000)])
+    np.testing.assert_allclose(calculate_tax_salary(values), [calculate_tax_salary(float(v)) for v in values],
+                               rtol=0, atol=1e-9)
+    np.testing.assert_allclose(calculate_tax_bonus(values), [calculate_tax_bonus(float(v)) for v in values],
+                               rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(calculate_marginal_rate(values),
+                                  [calculate_marginal_rate(float(v)) for v in values])
+
+@pytest.mark.parametrize('monthly_salary, ss_base, hf_base', [
+    (23000, 4775, 2520), (3000, 4775, 2520), (23000, 30000, 0), (50000, 35000, 35000), (np.float64(8000), 8000, 8000)
+])
+def test_social_security_matches_reference(monthly_salary, ss_base, hf_base):
+    monthly_ss, annual_ss, _ = calculate_social_security(monthly_salary, ss_base, hf_base)
+    expected_monthly, expected_annual = reference_social_security(monthly_salary, ss_base, hf_base)
+    assert monthly_ss == pytest.approx(expected_monthly, abs=1e-9)
+    assert annual_ss == pytest.approx(expected_annual, abs=1e-9)
+
+def test_scenarios_match_reference_formulas():
+    rng = np.random.default_rng(1)
+    n = 300
+    params = {
+        'base_salary': rng.choice([3000, 10000, 23000, 40000, 80000], n) + rng.uniform(0, 5000, n).round(),
+        'performance_salary': rng.choice([0, 2000, 8000], n).astype(float),
+        'bonus_base_months': rng.choice([0, 0.5, 1, 2, 3, 6], n).astype(float),
+        'performance_multiplier': rng.choice([0.8, 1.0, 1.5, 2.0], n),
+        'ss_base': rng.choice([4775, 10000, 35000], n).astype(float),
+        'hf_base': rng.choice([0, 2520, 35000], n).astype(float),
+        'additional_deductions': rng.choice([0, 1000, 3000], n).astype(float),
+        'include_performance_in_bonus': rng.random(n) < 0.5
+    }
+    batch = calculate_scenarios_batch(**params)
+    for i in range(n):
+        row = {name: values[i].item() for name, values in params.items()}
+        expected = reference_scenario(**row)
+        result = calculate_one_scenario(**row)
+        for column, value in expected.items():
+            assert result[column] == pytest.approx(value, abs=1e-6), (row, column)
+            assert batch[column].iloc[i] == pytest.approx(value, abs=1e-6), (row, column)
@@ -0,0 +1,55 @@
+"""累计预扣法：全年预扣合计与按年度计算的个税一致，多预扣部分等于汇算应退税额"""
+import numpy as np
+import pytest
+
+from salary_core import (
+    calculate_one_scenario, calculate_social_security, calculate_tax_bonus, calculate_tax_salary,
+    calculate_withholding_batch, calculate_withholding_schedule
+)
+
+@pytest.mark.parametrize('base_salary, ss_base, hf_base, deductions, city', [
+    (23000, 4775, 2520, 0, None), (8000, 4775, 2520, 1000, None), (60000, 35000, 35000, 3000, '北京'), (3000, 4775, 0, 0, None)
+])
+def test_constant_salary_withholds_exactly_the_annual_tax(base_salary, ss_base, hf_base, deductions, city):
+    schedule = calculate_withholding_schedule(base_salary, 2000, ss_base, hf_base, deductions, bonus=30000, city=city)
+    annual = calculate_one_scenario(base_salary, 2000, 0, 1.0, ss_base, hf_base, deductions, city=city)
+    assert schedule['当月预扣个税'].sum() == pytest.approx(annual['个人所得税'], abs=1e-6)
+    assert schedule['社保公积金'].sum() == pytest.approx(annual['社保公积金(年)'], abs=1e-6)
+    assert np.all(schedule['当月预扣个税'] >= 0)
+    assert schedule['年终奖个税'].sum() == pytest.approx(calculate_tax_bonus(30000.0), abs=1e-9)
+    assert schedule['年终奖'].tolist() == [0] * 11 + [30000]
+
+def test_uneven_performance_refund_equals_over_withholding():
+    """前高后低的绩效会多预扣，多出的部分正好是汇算应退税额"""
+    rng = np.random.default_rng(2)
+    n = 200
+    base = rng.uniform(3000, 80000, n).round()
+    performance = np.where(np.arange(12) < 3, 1, 0) * rng.uniform(0, 200000, (n, 1)).round()
+    ss_base, hf_base = rng.choice([4775, 20000, 35000], n), rng.choice([0, 2520, 35000], n)
+    deductions = rng.choice([0, 1000, 3000], n)
+    schedule = calculate_withholding_batch(base, performance, ss_base, hf_base, deductions)
+
+    gross = base[:, None] + performance
+    monthly_ss, _, _ = calculate_social_security(gross, ss_base[:, None], hf_base[:, None])
+    annual_taxable = np.maximum(0, gross.sum(axis=1) - 60000 - monthly_ss.sum(axis=1) - deductions * 12)
+    annual_tax = calculate_tax_salary(annual_taxable)
+
+    withheld = schedule['当月预扣个税'].sum(axis=1)
+    np.testing.assert_allclose(schedule['全年工资个税'], annual_tax, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(withheld - schedule['汇算应退税额'], annual_tax, rtol=0, atol=1e-6)
+    assert np.all(schedule['汇算应退税额'] >= -1e-9)
+    assert np.any(schedule['汇算应退税额'] > 1)
+    assert np.all(schedule['当月预扣个税'] >= 0)
+    np.testing.assert_allclose(
+        schedule['实发工资'].sum(axis=1), gross.sum(axis=1) - monthly_ss.sum(axis=1) - withheld, rtol=0, atol=1e-6
+    )
+
+def test_batch_rows_match_single_schedules():
+    base = np.array([12000.0, 30000.0, 45000.0])
+    performance = np.array([0.0, 5000.0, 10000.0])
+    batch = calculate_withholding_batch(base, performance, 4775, 2520, 0, bonus=[0, 50000, 100000], bonus_month=[12, 6, 1])
+    for i in range(len(base)):
+        single = calculate_withholding_schedule(base[i], performance[i], 4775, 2520, 0,
+                                                bonus=[0, 50000, 100000][i], bonus_month=[12, 6, 1][i])
+        for column in ('当月预扣个税', '年终奖个税', '实发工资'):
+            np.testing.assert_allclose(batch[column][i], single[column], rtol=0, atol=1e-9)